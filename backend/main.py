@@ -4,10 +4,12 @@ from src.config.config import settings
 
 # Service Provider importieren
 # Die Service-Instanzen werden automatisch erstellt beim Import
-from src.services.serviceProvider import llm_service, product_search
+from src.services.serviceProvider import llm_service, product_search, catalog_reloader
+from src.utils.httpClient import get_http_client
+from src.utils.embeddingCache import get_embedding_cache
 
 # Routes importieren
-from src.routes import chat, health, product
+from src.routes import admin, chat, health, product
 
 # Hauptanwendung initialisieren
 app = FastAPI()
@@ -25,6 +27,24 @@ app.add_middleware(
 app.include_router(chat.router)
 app.include_router(health.router)
 app.include_router(product.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+async def startup():
+    """Starte bei Bedarf die Überwachung der Produkt-CSV für automatische Reloads und die Health-Checks der LLM-Backends"""
+    if settings.CATALOG_WATCH:
+        catalog_reloader.start_watcher()
+    llm_service.pool.start_health_checks()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Beende die Katalog-Überwachung, schliesse HTTP-Verbindungspools und Such-Pool und sichere den Embedding-Cache beim Herunterfahren"""
+    catalog_reloader.stop_watcher()
+    await llm_service.pool.aclose()
+    await get_http_client().aclose()
+    get_embedding_cache().flush()
+    if product_search.worker_pool is not None:
+        product_search.worker_pool.shutdown()
 
 # Hauptausführungsblock für lokalen Entwicklungsserver
 if __name__ == "__main__":
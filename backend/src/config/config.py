@@ -23,6 +23,48 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "llama3.2:3B"
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: Optional[int] = 512
+    LLM_KEEP_ALIVE: str = "30m"  # Wie lange Ollama das Modell nach einer Anfrage geladen hält
+    LLM_CONTEXT_REUSE: bool = True  # Ollama-"context" je Sitzung wiederverwenden statt den Verlauf neu zu senden
+    LLM_CONTEXT_MAX_TOKENS: int = 1536  # Darüber wieder mit vollem Prompt beginnen (unter num_ctx bleiben)
+
+    # HTTP-Client-Konfiguration fuer LLM-Anfragen
+    LLM_REQUEST_TIMEOUT: float = 120.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_MAX_CONCURRENCY: int = 4  # Gleichzeitige Generierungen (Zulassungskontrolle im LLMScheduler)
+    LLM_MAX_QUEUE: int = 32  # Wartende Anfragen, darüber sofort 503
+    LLM_QUEUE_DEADLINE_SECONDS: float = 30.0  # Höchste Wartezeit bis zum Start der Generierung
+    LLM_LOW_PRIORITY_QUEUE_SHARE: float = 0.5  # Anteil der Warteschlange für Empfehlungen, darüber 429
+    LLM_RETRY_AFTER_SECONDS: int = 5
+    CLIENT_DISCONNECT_POLL_SECONDS: float = 0.5  # Wie oft /api/chat und /api/recommendation auf einen Verbindungsabbruch prüfen
+
+    # Mehrere LLM-Backends (Lastverteilung, Umschalten bei Ausfall, kleines Modell für einfache Anfragen)
+    # Kommagetrennt "url|modell|stufe", Stufe "large" oder "small"; leer: nur LLM_API_URL mit LLM_MODEL
+    LLM_BACKENDS: str = ""
+    LLM_ROUTING: str = "least_outstanding"  # "least_outstanding" oder "latency" (erwartete Fertigstellung)
+    LLM_SMALL_MODEL_MAX_CHARS: int = 200  # Kürzere allgemeine Chat-Nachrichten gehen an die Stufe "small"
+    LLM_BREAKER_FAILURES: int = 3  # Aufeinanderfolgende Fehler, nach denen ein Backend ausgeschlossen wird
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0  # Danach wird es mit einer einzelnen Anfrage erneut geprüft
+    LLM_HEALTH_CHECK_INTERVAL_SECONDS: float = 15.0  # 0 deaktiviert die periodischen Health-Checks
+    LLM_HEALTH_CHECK_TIMEOUT: float = 2.0
+
+    # Absichtserkennung: wählt die Prompt-Vorlage je Nachricht (z.B. Bestellhinweise statt Produktdetails)
+    INTENT_ROUTING: bool = True
+    INTENT_EMBEDDING_FALLBACK: bool = False  # Ohne Regeltreffer nächster Zentroid der Beispielanfragen (ein Embedding je Nachricht)
+    INTENT_CENTROID_MIN_SIMILARITY: float = 0.35
+    INTENT_EXAMPLES_PATH: Path = DATA_DIR / "intentExamples.json"
+
+    # Token-Budget für den Prompt (Schätzung über Zeichen pro Token)
+    PROMPT_TOKEN_BUDGET: int = 1536  # Gesamter Prompt; 0: bisheriges Verhalten (letzte 4 Einträge, ohne Zusammenfassung)
+    PROMPT_HISTORY_TOKENS: int = 300  # Höchstens so viel davon für Verlauf und Zusammenfassung
+    PROMPT_SUMMARY_TOKENS: int = 80  # Fortlaufende Zusammenfassung älterer Einträge
+    PROMPT_CHARS_PER_TOKEN: float = 4.0
+
+    # Prompt-Vorlagen-Konfiguration
+    TEMPLATE_CACHE_DIR: Path = DB_DIR / "template_cache"
+    TEMPLATE_AUTO_RELOAD: bool = True
     
     # Server-Konfiguration
     HOST: str = "0.0.0.0"
@@ -31,11 +73,72 @@ class Settings(BaseSettings):
     # Datenbank-Konfiguration
     DB_PATH: Path = DB_DIR / "chromadb_store"
     COLLECTION_NAME: str = "hardware_products"
+    # HNSW-Index der Collection (gilt beim Anlegen einer Collection, z.B. beim Blue/Green-Reload)
+    HNSW_SPACE: str = "cosine"  # "cosine", "ip" oder "l2"; MiniLM-Embeddings sind für Kosinus ausgelegt
+    HNSW_CONSTRUCTION_EF: int = 100
+    HNSW_SEARCH_EF: int = 10
+    HNSW_M: int = 16
+    PRODUCT_RECORDS_PATH: Path = DB_DIR / "product_records.json"
+    ACTIVE_COLLECTION_PATH: Path = DB_DIR / "active_collection.json"  # Zeiger auf die aktive Collection-Version
+    CATALOG_KEEP_VERSIONS: int = 2  # Anzahl Collection-Versionen, die für ein Rollback behalten werden
+    CATALOG_WATCH: bool = False  # PRODUCT_DATA_PATH überwachen und bei Änderungen neu laden
+    CATALOG_WATCH_INTERVAL_SECONDS: float = 5.0
+    WATCHER_LOCK_PATH: Path = DB_DIR / "catalog_watcher.lock"  # Nur der Worker mit dieser Sperre überwacht die CSV
+    VECTOR_STORE_BACKEND: str = "chroma"  # "chroma" oder "numpy" (prozessinterne Matrix)
+    VECTOR_STORE_DIR: Path = DB_DIR / "vectors"
+    VECTOR_STORE_DTYPE: str = "float32"  # "float32", "float16" (halber Speicher) oder "int8" (Viertel, mit float32-Nachsortierung)
+    VECTOR_STORE_RERANK_FACTOR: int = 4  # int8: Kandidaten je Treffer, die exakt nachsortiert werden
+    ADMIN_TOKEN: Optional[str] = None  # Admin-Endpunkte erwarten es im Header X-Admin-Token; nicht gesetzt: Endpunkte abgeschaltet (404)
+
+    # Konversationsspeicher-Konfiguration
+    CONVERSATION_STORE_BACKEND: str = "memory"  # "memory" oder "sqlite" (für mehrere Worker)
+    CONVERSATION_DB_PATH: Path = DB_DIR / "conversations.sqlite3"
+    CONVERSATION_MAX_ENTRIES: int = 10
+    CONVERSATION_MAX_SESSIONS: int = 10000
+    CONVERSATION_MAX_BYTES: int = 64 * 1024 * 1024
+    CONVERSATION_TTL_SECONDS: int = 3600
     
     # Produktsuche-Konfiguration
     PRODUCT_DATA_PATH: Path = DATA_DIR / "itHardware.csv"
+    IMPORT_ENCODE_BATCH_SIZE: int = 64
+    IMPORT_UPSERT_CHUNK_SIZE: int = 1000
     SEARCH_LIMIT: int = 5
+    SEARCH_EXECUTOR: str = "thread"  # "thread" oder "process"
+    SEARCH_WORKERS: int = 4
+    SEARCH_MAX_PENDING: int = 32
+    SEARCH_RETRY_AFTER_SECONDS: int = 1
+    SEARCH_EXTRACT_FILTERS: bool = True  # Preisgrenzen/Betriebssystem usw. aus der Anfrage erkennen
+    SEARCH_RETRIEVAL: str = "hybrid"  # "vector", "lexical" (BM25) oder "hybrid" (Reciprocal Rank Fusion)
+    SEARCH_HYBRID_CANDIDATES: int = 20  # Kandidaten je Verfahren vor der Fusion
+    SEARCH_RRF_K: int = 60
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
     MODEL_NAME: str = "all-MiniLM-L6"
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # SentenceTransformer für Anfragen; Teil der Schlüssel im persistenten Embedding-Cache
+
+    # Ergebnis-Cache für /api/recommendation (Schlüssel: normalisierte Anfrage + Katalogversion)
+    RECOMMENDATION_CACHE_SIZE: int = 1000  # 0 deaktiviert den Cache
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = 900
+    RECOMMENDATION_CACHE_SEMANTIC: bool = False  # Auch sehr ähnliche Anfragen aus dem Cache beantworten
+    RECOMMENDATION_CACHE_SIMILARITY: float = 0.95  # Mindest-Kosinusähnlichkeit für einen semantischen Treffer
+
+    # Auswahl ohne LLM, wenn ein Produkt klar vorne liegt
+    RECOMMENDATION_FAST_PATH: bool = True
+    RECOMMENDATION_FAST_PATH_MIN_SIMILARITY: float = 0.45  # Mindestähnlichkeit des besten Produkts
+    RECOMMENDATION_FAST_PATH_MARGIN: float = 0.08  # Mindestabstand zum zweitbesten Produkt
+    RECOMMENDATION_EXPLANATION: str = "llm"  # "llm" (kurzer Aufruf, je Produkt gecacht) oder "template"
+    RECOMMENDATION_EXPLANATION_MAX_TOKENS: int = 96
+
+    # Embedding-Cache-Konfiguration
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_PERSIST: bool = True
+    EMBEDDING_CACHE_PATH: Path = DB_DIR / "embedding_cache"
+    EMBEDDING_CACHE_DISK_ENTRIES: int = 100000
+
+    # Micro-Batching der Embedding-Berechnung über gleichzeitige Anfragen hinweg
+    EMBEDDING_BATCHING: bool = True
+    EMBEDDING_BATCH_WINDOW_MS: float = 2.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
 
     # Debug-Konfiguration
     DEBUG: bool = True
@@ -0,0 +1,161 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter
+import threading
+import numpy as np
+from src.database.productRecords import ProductRecordStore
+from src.utils.bm25Index import BM25Index
+
+# Felder, für die Facetten (Wert -> Anzahl) geführt werden
+FACET_FIELDS = ("manufacturer", "type", "os", "qualification")
+
+def _record_field(record: Dict[str, Any], field: str) -> Any:
+    """Liest ein Facettenfeld aus einem strukturierten Produktdatensatz"""
+    if field in ("manufacturer", "type"):
+        return record.get("header", {}).get(field)
+    if field == "os":
+        return record.get("specifications", {}).get("os")
+    if field == "qualification":
+        return record.get("target_audience", {}).get("qualification")
+    if field == "price":
+        return record.get("header", {}).get("price")
+    return None
+
+def _as_price(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def record_price(record: Dict[str, Any]) -> Optional[float]:
+    """Preis eines Produktdatensatzes als Zahl (None bei "N/A", "PCLCM" usw.)"""
+    return _as_price(_record_field(record, "price"))
+
+def filter_fit(record: Dict[str, Any], filters: Dict[str, Any]) -> float:
+    """
+    Anteil der angewendeten Filterbedingungen, die ein Produktdatensatz erfüllt (1.0 ohne Filter).
+
+    :param record: Strukturierter Produktdatensatz.
+    :param filters: Filter in der Form von QueryFilterBuilder.build (Wertelisten, min_price/max_price).
+    """
+    checks = [_record_field(record, field) in values for field, values in filters.items() if field in FACET_FIELDS]
+    if "min_price" in filters or "max_price" in filters:
+        price = record_price(record)
+        checks.append(
+            price is not None
+            and price >= filters.get("min_price", float("-inf"))
+            and price <= filters.get("max_price", float("inf"))
+        )
+    return sum(checks) / len(checks) if checks else 1.0
+
+class CatalogIndex:
+    """
+    In-Memory-Index über den Produktkatalog.
+
+    Wird einmal beim Start aus den vorberechneten Produktdatensätzen aufgebaut und nach einem
+    Import neu aufgebaut. Bietet ID-Zugriff in O(1), Facettenzählungen, ein sortiertes Preisarray
+    und einen BM25-Index, der nach einem Import nur die geänderten Dokumente neu indiziert.
+    """
+
+    def __init__(self, record_store: ProductRecordStore):
+        self.record_store = record_store
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.facets: Dict[str, Dict[str, int]] = {}
+        self.prices = np.empty(0, dtype=np.float64)  # Aufsteigend sortiert
+        self.price_ids: List[str] = []  # Produkt-IDs in derselben Reihenfolge wie self.prices
+        self.version: Optional[str] = None
+        self.lexical = BM25Index()  # Volltextindex über die Produktdokumente
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def refresh(self) -> bool:
+        """
+        Baut den Index neu auf, falls seit dem letzten Aufbau ein Import stattgefunden hat.
+
+        :return: True, wenn der Index neu aufgebaut wurde.
+        """
+        changed = self.record_store.reload_if_changed()
+        if changed or self.version != self.record_store.version:
+            self.rebuild()
+            return True
+        return False
+
+    def rebuild(self) -> None:
+        """Baut alle Strukturen aus dem aktuellen Stand der Produktdatensätze auf"""
+        with self._lock:
+            # Ein Stand der Datensätze für Facetten, Preise, Version und BM25
+            snapshot = self.record_store.snapshot
+            records = snapshot.records
+
+            facets = {field: Counter() for field in FACET_FIELDS}
+            priced: List[Tuple[float, str]] = []
+            for product_id, record in records.items():
+                for field in FACET_FIELDS:
+                    value = _record_field(record, field)
+                    if value and value != "N/A":
+                        facets[field][value] += 1
+                price = _as_price(_record_field(record, "price"))
+                if price is not None:
+                    priced.append((price, product_id))
+
+            priced.sort()
+
+            # Alle Strukturen gemeinsam austauschen, damit Leser einen konsistenten Stand sehen
+            self.products = records
+            self.facets = {field: dict(counter.most_common()) for field, counter in facets.items()}
+            self.prices = np.array([price for price, _ in priced], dtype=np.float64)
+            self.price_ids = [product_id for _, product_id in priced]
+            self.version = snapshot.version
+
+            changes = self.lexical.sync(snapshot.documents)
+            if any(changes.values()):
+                print(f"BM25-Index aktualisiert: {changes}")
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Gibt den Datensatz eines Produkts zurück (O(1))"""
+        return self.products.get(product_id)
+
+    def unique_values(self, field: str) -> set:
+        """Gibt alle eindeutigen Werte eines Facettenfeldes in Kleinbuchstaben zurück"""
+        return {str(value).lower() for value in self.facets.get(field, {})}
+
+    def ids_in_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[str]:
+        """Gibt die Produkt-IDs im Preisbereich per binärer Suche zurück"""
+        start = 0 if min_price is None else int(np.searchsorted(self.prices, min_price, side="left"))
+        end = len(self.prices) if max_price is None else int(np.searchsorted(self.prices, max_price, side="right"))
+        return self.price_ids[start:end]
+
+    def filter_ids(self, filters: Dict[str, Any]) -> Optional[set]:
+        """
+        Gibt die Produkt-IDs zurück, die die angewendeten Filter erfüllen (None ohne Filter).
+
+        :param filters: Filter in der Form von QueryFilterBuilder.build (Wertelisten, min_price/max_price).
+        """
+        categorical = {field: set(values) for field, values in filters.items() if field in FACET_FIELDS}
+        has_price = "min_price" in filters or "max_price" in filters
+        if not categorical and not has_price:
+            return None
+
+        products = self.products
+        ids = set(self.ids_in_price_range(filters.get("min_price"), filters.get("max_price"))) if has_price else set(products)
+        for field, values in categorical.items():
+            ids = {product_id for product_id in ids if _record_field(products.get(product_id, {}), field) in values}
+        return ids
+
+    def describe(self) -> Dict[str, Any]:
+        """Facetten und Preisspanne für die Filteroberfläche"""
+        price = {"count": int(len(self.prices))}
+        if len(self.prices):
+            price.update({
+                "min": float(self.prices[0]),
+                "max": float(self.prices[-1]),
+                "median": float(np.median(self.prices))
+            })
+        return {
+            "total": len(self.products),
+            "version": self.version,
+            "facets": self.facets,
+            "price": price
+        }
+
+    def __len__(self) -> int:
+        return len(self.products)
@@ -1,18 +1,181 @@
 from src.config.config import settings  # Absolute Import verwenden
+from src.database.productRecords import ProductRecordStore
+from src.database.catalogIndex import CatalogIndex
+from src.database.vectorStore import create_vector_store
 import chromadb
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, NamedTuple, Optional, List
 from pathlib import Path
+import json
+import logging
+import os
+import threading
+
+def hnsw_metadata(
+    space: str = settings.HNSW_SPACE,
+    construction_ef: int = settings.HNSW_CONSTRUCTION_EF,
+    search_ef: int = settings.HNSW_SEARCH_EF,
+    m: int = settings.HNSW_M
+) -> Dict[str, Any]:
+    """HNSW-Parameter als Collection-Metadaten für ChromaDB"""
+    if space not in ("cosine", "ip", "l2"):
+        raise ValueError(f"Unbekannte Distanzmetrik: {space}")
+    return {
+        "hnsw:space": space,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+        "hnsw:M": m
+    }
+
+def max_batch_size(client, default: int = settings.IMPORT_UPSERT_CHUNK_SIZE) -> int:
+    """
+    Grösster Batch, den der ChromaDB-Client in einem Aufruf annimmt.
+
+    chromadb 0.4.x bietet dafür die Eigenschaft max_batch_size, neuere Versionen get_max_batch_size().
+    """
+    getter = getattr(client, "get_max_batch_size", None)
+    if callable(getter):
+        return getter()
+    return getattr(client, "max_batch_size", None) or default
+
+def get_or_create_collection(client, name: str):
+    """
+    Holt eine Collection oder legt sie mit den konfigurierten HNSW-Parametern an.
+
+    Metrik und Indexparameter einer bestehenden Collection lassen sich nicht mehr ändern;
+    Abweichungen werden nur gemeldet und greifen nach dem nächsten Blue/Green-Reload.
+    """
+    try:
+        collection = client.get_collection(name=name)
+    except Exception:
+        return client.create_collection(name=name, metadata=hnsw_metadata())
+
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    if space != settings.HNSW_SPACE:
+        logging.warning(f"Collection {name} verwendet die Metrik {space} statt {settings.HNSW_SPACE}")
+    return collection
+
+def read_active_collection(path: Path = settings.ACTIVE_COLLECTION_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Liest den Zeiger auf die aktive Collection-Version.
+
+    :return: {"collection", "records_path", "version"} oder None, solange kein Blue/Green-Reload stattfand.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_active_collection(pointer: Dict[str, Any], path: Path = settings.ACTIVE_COLLECTION_PATH) -> None:
+    """Schreibt den Zeiger auf die aktive Collection atomar (alle Prozesse sehen alt oder neu)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pointer, f)
+    os.replace(tmp_path, path)
+
+class CatalogState(NamedTuple):
+    """Aktive Collection mit den zugehörigen Produktdatensätzen und dem Katalogindex; wird nur als Ganzes ausgetauscht"""
+    collection_name: str
+    collection: Any
+    record_store: ProductRecordStore
+    catalog_index: CatalogIndex
 
 class ChromaDBClient:
     def __init__(self):
         # Initialisiert den ChromaDB-Client mit einem persistenten Speicherpfad
         self.client = chromadb.PersistentClient(path=str(settings.DB_PATH))
-        
-        # Erstellt oder holt eine Collection für Hardware-Produkte
-        self.collection = self.client.get_or_create_collection(
-            name="hardware_products"
+        self._swap_lock = threading.Lock()
+
+        # Aktive Collection-Version bestimmen (ohne Zeiger: die klassische Collection)
+        pointer = read_active_collection()
+        self._pointer_mtime = self._stat_pointer()
+        collection_name = pointer["collection"] if pointer else settings.COLLECTION_NAME
+        records_path = Path(pointer["records_path"]) if pointer else settings.PRODUCT_RECORDS_PATH
+
+        # Collection für Hardware-Produkte, vorberechnete Produktdatensätze und In-Memory-Katalogindex
+        record_store = ProductRecordStore(records_path)
+        self.state = CatalogState(
+            collection_name,
+            get_or_create_collection(self.client, collection_name),
+            record_store,
+            CatalogIndex(record_store)
         )
+
+        # Austauschbare Vektorsuche (ChromaDB oder NumPy-Matrix)
+        self.vector_store = create_vector_store(self)
+
+    # Zugriff auf den aktuellen Stand; wer mehrere Teile zusammen braucht, liest einmal self.state
+    @property
+    def collection_name(self) -> str:
+        return self.state.collection_name
+
+    @property
+    def collection(self):
+        return self.state.collection
+
+    @property
+    def record_store(self) -> ProductRecordStore:
+        return self.state.record_store
+
+    @property
+    def catalog_index(self) -> CatalogIndex:
+        return self.state.catalog_index
+
+    @staticmethod
+    def _stat_pointer() -> Optional[float]:
+        try:
+            return os.stat(settings.ACTIVE_COLLECTION_PATH).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def activate(self, collection_name: str, records_path: Path) -> None:
+        """
+        Schaltet atomar auf eine andere, vollständig aufgebaute Collection-Version um.
+
+        Collection, Datensätze und Katalogindex werden nebenher vollständig aufgebaut und dann mit
+        einer einzigen Zuweisung als neuer CatalogState veröffentlicht; Leser brauchen keine Sperre
+        und sehen entweder den alten oder den neuen Stand. Laufende Suchen arbeiten mit dem Stand
+        weiter, den sie bereits halten.
+
+        :param collection_name: Name der neuen Collection.
+        :param records_path: Datensatzdatei, die zu dieser Collection gehört.
+        """
+        with self._swap_lock:
+            collection = self.client.get_collection(name=collection_name)
+            record_store = ProductRecordStore(records_path)
+            self.state = CatalogState(collection_name, collection, record_store, CatalogIndex(record_store))
+            logging.info(f"Aktive Collection: {collection_name}")
+
+    def sync_active_collection(self) -> bool:
+        """
+        Übernimmt eine Umschaltung, die ein anderer Prozess oder Thread vorgenommen hat.
+
+        Kostet im Normalfall nur einen stat()-Aufruf auf die Zeigerdatei.
+
+        :return: True, wenn auf eine neue Collection umgeschaltet wurde.
+        """
+        mtime = self._stat_pointer()
+        if mtime == self._pointer_mtime:
+            return False
+        self._pointer_mtime = mtime
+        pointer = read_active_collection()
+        if not pointer or pointer["collection"] == self.collection_name:
+            return False
+        self.activate(pointer["collection"], Path(pointer["records_path"]))
+        return True
     
+    def catalog_version(self) -> str:
+        """
+        Kennung des aktuellen Katalogstands, ändert sich mit jedem Import und jeder Umschaltung.
+
+        :return: "<collection>@<version der Produktdatensätze>"
+        """
+        self.sync_active_collection()
+        state = self.state
+        state.record_store.reload_if_changed()
+        return f"{state.collection_name}@{state.record_store.version}"
+
     def get_unique_values(self, field: str) -> set:
         """
         Gibt alle eindeutigen Werte für ein bestimmtes Feld zurück.
@@ -20,29 +183,55 @@ class ChromaDBClient:
         :param field: Der Name des Feldes, für das die eindeutigen Werte abgerufen werden sollen.
         :return: Eine Menge von eindeutigen Werten (in Kleinbuchstaben).
         """
-        results = self.collection.get()
+        self.sync_active_collection()
+        state = self.state
+        state.catalog_index.refresh()
+        if len(state.catalog_index):
+            return state.catalog_index.unique_values(field)
+
+        # Fallback ohne Katalogindex: nur die Metadaten laden
+        results = state.collection.get(include=["metadatas"])
         return {
             str(metadata.get(field, "")).lower() 
             for metadata in results["metadatas"] 
             if field in metadata and metadata[field]
         }
 
-    def search_products(self, query_embedding: List[float], limit: int = 5):
+    def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Gibt ein Produkt anhand seiner ID zurück, ohne ChromaDB abzufragen.
+
+        :param product_id: Die ID des Produkts.
+        :return: Der strukturierte Produktdatensatz oder None.
+        """
+        self.sync_active_collection()
+        self.catalog_index.refresh()
+        return self.catalog_index.get(product_id)
+
+    def search_products(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        state: Optional[CatalogState] = None
+    ):
         """
         Sucht Produkte basierend auf Vektorähnlichkeit.
         
         :param query_embedding: Der Vektor, der für die Suche verwendet wird.
         :param limit: Die maximale Anzahl der zurückzugebenden Ergebnisse.
-        :return: Suchergebnisse aus der ChromaDB-Collection.
+        :param where: Optionaler Metadatenfilter, der vor der Nächste-Nachbarn-Suche angewendet wird.
+        :param state: Katalogstand, den die aufrufende Suche bereits verwendet (Standard: der aktive).
+        :return: Suchergebnisse im ChromaDB-Ergebnisformat (ids, metadatas, distances).
         """
         try:
-            print("Abfrage der ChromaDB-Collection...")
-            result = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit
-            )
-            print(f"{len(result.get('ids', [[]])[0])} Ergebnisse gefunden")
+            if state is None:
+                self.sync_active_collection()
+                state = self.state
+            logging.debug(f"Abfrage der Collection {state.collection_name} ({settings.VECTOR_STORE_BACKEND})... (Filter: {where})")
+            result = self.vector_store.search(query_embedding, limit, where, source=state)
+            logging.debug(f"{len(result.get('ids', [[]])[0])} Ergebnisse gefunden")
             return result
         except Exception as e:
-            print(f"ChromaDB-Suchfehler: {e}")
+            logging.error(f"Vektorsuchfehler: {e}")
             raise
\ No newline at end of file
@@ -0,0 +1,101 @@
+from src.config.config import settings  # Absolute Import verwenden
+from typing import Dict, Any, NamedTuple, Optional
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+class RecordSnapshot(NamedTuple):
+    """Ein geladener Stand der Datensatzdatei; wird nur als Ganzes ausgetauscht"""
+    records: Dict[str, Dict[str, Any]]
+    documents: Dict[str, str]  # Durchsuchbarer Text je Produkt (für den BM25-Index)
+    version: Optional[str]  # Zeitstempel des Imports, der die Datei geschrieben hat
+
+class ProductRecordStore:
+    """
+    Seitentabelle mit fertig strukturierten Produktdatensätzen, nach Produkt-ID indiziert.
+
+    Die Datensätze werden einmal beim Import erzeugt. Der Suchpfad liest sie nur noch per
+    Dictionary-Zugriff aus, statt die Metadaten bei jeder Anfrage erneut zu parsen.
+    """
+
+    def __init__(self, path: Path = settings.PRODUCT_RECORDS_PATH):
+        self.path = Path(path)
+        # Datensätze, Dokumente und Version hängen an einer Referenz; wer mehrere davon braucht,
+        # liest einmal self.snapshot und sieht so nie Datensätze der einen mit der Version der anderen Datei
+        self.snapshot = RecordSnapshot({}, {}, None)
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+
+    @property
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        return self.snapshot.records
+
+    @property
+    def documents(self) -> Dict[str, str]:
+        return self.snapshot.documents
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.snapshot.version
+
+    @staticmethod
+    def _read(path: Path) -> RecordSnapshot:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return RecordSnapshot(data.get("records", {}), data.get("documents", {}), data.get("version"))
+
+    def reload_if_changed(self) -> bool:
+        """
+        Lädt die Datensätze neu, wenn die Datei seit dem letzten Laden geändert wurde.
+
+        :return: True, wenn neu geladen wurde.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            # Neuen Stand vollständig laden und mit einer Zuweisung veröffentlichen
+            self.snapshot = self._read(self.path)
+            self._mtime = mtime
+            print(f"{len(self.records)} Produktdatensätze geladen (Version {self.version})")
+            return True
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Gibt den strukturierten Datensatz eines Produkts zurück.
+
+        :param product_id: Die ID des Produkts.
+        :return: Der Datensatz (nur lesend verwenden) oder None, falls unbekannt.
+        """
+        return self.snapshot.records.get(product_id)
+
+    def save(self, records: Dict[str, Dict[str, Any]], version: Optional[str] = None, documents: Optional[Dict[str, str]] = None) -> None:
+        """
+        Schreibt alle Datensätze atomar in die Datei.
+
+        :param records: Datensätze nach Produkt-ID.
+        :param version: Versionskennung, standardmässig der aktuelle Zeitstempel (auf Millisekunden).
+        :param documents: Durchsuchbarer Text nach Produkt-ID.
+        """
+        if version is None:
+            # Millisekunden, damit auch zwei Importe innerhalb einer Sekunde verschiedene Versionen erhalten
+            now = time.time()
+            version = time.strftime("%Y%m%d%H%M%S", time.localtime(now)) + f"{int(now * 1000) % 1000:03d}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(f"{self.path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "records": records, "documents": documents or {}}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)  # Atomar ersetzen, laufende Leser sehen alte oder neue Datei
+        self.reload_if_changed()
+
+    def __len__(self) -> int:
+        return len(self.records)
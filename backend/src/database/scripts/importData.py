@@ -8,9 +8,16 @@ os.environ["CUDA_VISIBLE_DEVICES"] = "0"  # Nur die erste GPU verwenden
 project_root = Path(__file__).resolve().parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+import hashlib
+import json
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 from sentence_transformers import SentenceTransformer
-from src.database.chromadbClient import ChromaDBClient
+from src.database.chromadbClient import ChromaDBClient, max_batch_size
+from src.database.productRecords import ProductRecordStore
+from src.utils.productFormatter import ProductFormatter
 from src.config.config import settings
 
 def clean_csv_value(value):
@@ -39,20 +46,8 @@ def clean_text(text):
     return ' '.join(cleaned.split())
 
 def parse_tech_specs(tech_specs_str: str) -> dict:
-    """Parst technische Spezifikationen aus einem String in ein strukturiertes Dictionary"""
-    specs = {}
-    if not tech_specs_str:
-        return specs
-
-    # Spezifikations-String in einzelne Komponenten aufteilen
-    parts = [p.strip() for p in tech_specs_str.split(',')]
-    
-    for part in parts:
-        if ':' in part:
-            key, value = [p.strip() for p in part.split(':', 1)]
-            specs[key.lower()] = value  # Schlüssel in Kleinbuchstaben umwandeln
-    
-    return specs
+    """Parst technische Spezifikationen mit demselben Parser wie der Suchpfad (kanonische Schlüssel)"""
+    return ProductFormatter.parse_tech_specs(tech_specs_str)
 
 def tech_specs_to_string(specs: dict) -> str:
     """Konvertiert technische Spezifikationen aus einem Dictionary in einen formatierten String"""
@@ -103,109 +98,213 @@ def read_csv_file(file_path: Path) -> pd.DataFrame:
         print(f"iconv -f ISO-8859-1 -t UTF-8 {file_path} > {file_path}.utf8")
         raise
 
-def import_csv_to_chromadb():
-    """Importiert Daten aus einer CSV-Datei in ChromaDB"""
+# Spalten, die in der CSV erwartet werden
+TEXT_COLUMNS = [
+    'user_profile', 'ideal_for', 'not_recommended_for',
+    'qualification', 'type', 'manufacturer', 'model',
+    'os', 'tech_specs', 'link'
+]
+NUMERIC_COLUMNS = ['price_chf']
+
+def clean_text_series(series: pd.Series) -> pd.Series:
+    """Vektorisierte Variante von clean_text für eine ganze Spalte"""
+    cleaned = series.fillna("").astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    for char, replacement in (('/', ' / '), ('-', ' - '), ('_', ' '), ('.', '. '), (',', ', ')):
+        cleaned = cleaned.str.replace(char, replacement, regex=False)
+    return cleaned.str.replace(r"\s+", " ", regex=True).str.strip()
+
+def parse_price_series(series: pd.Series) -> pd.Series:
+    """Wandelt die Preisspalte vektorisiert um (PCLCM -> 0, ungültige Werte -> 0, fehlende bleiben NaN)"""
+    parsed = pd.to_numeric(series.str.replace('PCLCM', '0', regex=False), errors='coerce')
+    return parsed.where(series.isna() | parsed.notna(), 0.0)
+
+def content_hash(document: str, metadata: dict) -> str:
+    """Stabiler Hash über Dokument, Metadaten und Modell, um unveränderte Zeilen zu erkennen"""
+    # settings.EMBEDDING_MODEL fliesst ein, damit ein Modellwechsel alle Produkte neu kodiert
+    payload = json.dumps([settings.EMBEDDING_MODEL, document, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def prepare_rows(df: pd.DataFrame) -> Tuple[List[str], List[str], List[dict], int]:
+    """
+    Bereinigt den DataFrame spaltenweise und erzeugt IDs, Dokumente und Metadaten.
+
+    :return: (IDs, Dokumente, Metadaten, Anzahl übersprungener Zeilen)
+    """
+    # Überprüfen, ob alle erforderlichen Spalten vorhanden sind
+    missing_columns = [col for col in ['id'] + TEXT_COLUMNS + NUMERIC_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Fehlende erforderliche Spalten: {missing_columns}")
+
+    # Zeilen ohne gültige ID überspringen
+    numeric_ids = pd.to_numeric(df['id'], errors='coerce')
+    valid = numeric_ids.notna()
+    skipped = int((~valid).sum())
+    if skipped:
+        print(f"Überspringe {skipped} Zeilen ohne gültige ID")
+    df = df[valid].copy()
+    df['id'] = numeric_ids[valid].astype(int).astype(str)
+
+    # Textspalten einmal und vektorisiert bereinigen
+    for col in TEXT_COLUMNS:
+        df[col] = clean_text_series(df[col])
+    prices = parse_price_series(df['price_chf'])
+
+    ids, documents, metadatas = [], [], []
+    for row, price in zip(df.to_dict("records"), prices):
+        metadata = {col: row[col] for col in TEXT_COLUMNS if col != 'tech_specs'}
+        # Analysierte technische Spezifikationen zu Metadaten als String hinzufügen
+        metadata['tech_specs'] = tech_specs_to_string(parse_tech_specs(row['tech_specs']))
+        if pd.notna(price):
+            metadata['price_chf'] = float(price)
+
+        document = create_searchable_text(row)
+        metadata['content_hash'] = content_hash(document, metadata)
+
+        ids.append(row['id'])
+        documents.append(document)
+        metadatas.append(metadata)
+
+    return ids, documents, metadatas, skipped
+
+def get_existing_products(collection, include_embeddings: bool = False) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Liest die Inhalts-Hashes (und optional die Embeddings) aller Produkte einer Collection.
+
+    :return: (Hash nach ID, Embedding nach ID)
+    """
+    include = ["metadatas", "embeddings"] if include_embeddings else ["metadatas"]
+    existing = collection.get(include=include)
+    hashes = {
+        product_id: (metadata or {}).get('content_hash', '')
+        for product_id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+    embeddings = dict(zip(existing["ids"], existing["embeddings"])) if include_embeddings else {}
+    return hashes, embeddings
+
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+def import_csv_to_chromadb(
+    csv_path: Optional[Path] = None,
+    db_client: Optional[ChromaDBClient] = None,
+    model: Optional[SentenceTransformer] = None,
+    target_collection=None,
+    target_record_store: Optional[ProductRecordStore] = None
+) -> Dict[str, Any]:
+    """
+    Importiert Daten inkrementell aus einer CSV-Datei in ChromaDB.
+
+    Ohne Ziel wird die aktive Collection aktualisiert: nur neue oder geänderte Produkte werden
+    kodiert und per Upsert geschrieben, entfernte Produkte werden gelöscht.
+    Mit Ziel (Blue/Green-Reload) wird eine neue, leere Collection vollständig befüllt; die
+    Embeddings unveränderter Produkte werden dabei aus der aktiven Collection übernommen.
+
+    :return: Zusammenfassung des Imports.
+    """
     try:
-        csv_path = settings.PRODUCT_DATA_PATH
+        started = time.perf_counter()
+        csv_path = csv_path or settings.PRODUCT_DATA_PATH
         print(f"Lese CSV aus: {csv_path}")
         
         df = read_csv_file(csv_path)
-        print(f"{len(df)} Datensätze erfolgreich aus CSV geladen")
-        
-        # Spalten, die in der CSV erwartet werden
-        text_columns = [
-            'user_profile', 'ideal_for', 'not_recommended_for',
-            'qualification', 'type', 'manufacturer', 'model',
-            'os', 'tech_specs', 'link'
+        total_rows = len(df)
+        print(f"{total_rows} Datensätze erfolgreich aus CSV geladen")
+
+        ids, documents, metadatas, skipped = prepare_rows(df)
+        if not ids:
+            raise ValueError("Keine gültigen Datensätze zum Importieren")
+
+        db_client = db_client or ChromaDBClient()
+        in_place = target_collection is None
+        collection = db_client.collection if in_place else target_collection
+        record_store = target_record_store if target_record_store is not None else db_client.record_store
+
+        # Änderungen anhand der Inhalts-Hashes gegenüber der aktiven Collection bestimmen
+        existing_hashes, existing_embeddings = get_existing_products(db_client.collection, include_embeddings=not in_place)
+        changed = [
+            i for i, product_id in enumerate(ids)
+            if existing_hashes.get(product_id) != metadatas[i]['content_hash']
         ]
-        numeric_columns = ['price_chf']
-        
-        # Überprüfen, ob alle erforderlichen Spalten vorhanden sind
-        missing_columns = [col for col in text_columns + numeric_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Fehlende erforderliche Spalten: {missing_columns}")
-        
-        # Textspalten bereinigen
-        for col in text_columns:
-            df[col] = df[col].apply(clean_text)
+        new_count = sum(1 for i in changed if ids[i] not in existing_hashes)
+        removed_ids = sorted(set(existing_hashes) - set(ids))
+        print(f"Neu: {new_count}, geändert: {len(changed) - new_count}, unverändert: {len(ids) - len(changed)}, entfernt: {len(removed_ids)}")
 
-        # Embedding-Modell und Datenbank initialisieren
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        db_client = ChromaDBClient()
-        
-        # Bestehende Daten in der Datenbank löschen
-        try:
-            db_client.collection.delete(db_client.collection.get()["ids"])
-            print("Bestehende Daten gelöscht")
-        except Exception as e:
-            print(f"Keine bestehenden Daten zum Löschen: {e}")
-
-        # Daten für den Import vorbereiten
-        embeddings = []
-        documents = []
-        metadatas = []
-        ids = []
+        # Eine neue Collection braucht alle Produkte, die aktive nur die geänderten
+        to_write = changed if in_place else list(range(len(ids)))
+        vectors: Dict[int, Any] = {}
+        if not in_place:
+            changed_set = set(changed)
+            vectors.update({i: existing_embeddings[ids[i]] for i in to_write if i not in changed_set})
 
-        total_rows = len(df)
-        for idx, row in df.iterrows():
-            try:
-                if pd.isna(row['id']):
-                    print(f"Überspringe Zeile {idx}: Fehlende ID")
-                    continue
-
-                search_text = create_searchable_text(row)
-                product_name = f"{row['manufacturer']} {row['model']}"
-
-                # Basis-Metadaten erstellen
-                metadata = {
-                    col: clean_text(str(row[col]))
-                    for col in text_columns
-                    if col != 'tech_specs' and pd.notna(row[col])
-                }
-                
-                # Analysierte technische Spezifikationen zu Metadaten als String hinzufügen
-                if pd.notna(row['tech_specs']):
-                    parsed_specs = parse_tech_specs(row['tech_specs'])
-                    metadata['tech_specs'] = tech_specs_to_string(parsed_specs)
-                else:
-                    metadata['tech_specs'] = ""
-
-                # Numerische Felder hinzufügen
-                if pd.notna(row['price_chf']):
-                    try:
-                        metadata['price_chf'] = float(str(row['price_chf']).replace('PCLCM', '0'))
-                    except:
-                        metadata['price_chf'] = 0
-
-                embeddings.append(model.encode(search_text).tolist())
-                documents.append(search_text)
-                metadatas.append(metadata)
-                ids.append(str(int(row['id'])))
-                
-                print(f"Verarbeite Datensatz {idx+1}/{total_rows}: {product_name}")
-
-            except Exception as e:
-                print(f"Fehler bei der Verarbeitung von Zeile {idx}: {e}")
-                continue
-
-        # Daten in ChromaDB importieren
-        if embeddings:
-            db_client.collection.add(
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
+        if changed:
+            # Nur neue und geänderte Produkte in grossen Batches kodieren
+            model = model or SentenceTransformer(settings.EMBEDDING_MODEL)
+            embeddings = model.encode(
+                [documents[i] for i in changed],
+                batch_size=settings.IMPORT_ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False
             )
-            print("\nImport-Zusammenfassung:")
-            print(f"Gesamtanzahl Datensätze: {total_rows}")
-            print(f"Erfolgreich importiert: {len(ids)}")
-            print(f"Fehlgeschlagen/Übersprungen: {total_rows - len(ids)}")
-        else:
-            raise ValueError("Keine gültigen Datensätze zum Importieren")
+            vectors.update(zip(changed, embeddings))
+
+        # In Blöcken schreiben, bestehende Einträge werden ersetzt
+        chunk_size = min(settings.IMPORT_UPSERT_CHUNK_SIZE, max_batch_size(db_client.client))
+        for start, chunk in chunked(to_write, chunk_size):
+            collection.upsert(
+                ids=[ids[i] for i in chunk],
+                embeddings=np.asarray([vectors[i] for i in chunk], dtype=np.float32).tolist(),
+                documents=[documents[i] for i in chunk],
+                metadatas=[metadatas[i] for i in chunk]
+            )
+            print(f"Geschrieben: {start + len(chunk)}/{len(to_write)}")
+
+        if in_place:
+            for _, chunk in chunked(removed_ids, chunk_size):
+                collection.delete(ids=chunk)
+
+        # Strukturierte Produktdatensätze für den Suchpfad speichern
+        records = {
+            product_id: ProductFormatter.format_product(metadata, product_id)
+            for product_id, metadata in zip(ids, metadatas)
+        }
+        record_store.save(records, documents=dict(zip(ids, documents)))
+        print(f"{len(records)} Produktdatensätze gespeichert: {record_store.path}")
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            "total_rows": total_rows,
+            "imported": len(ids),
+            "new": new_count,
+            "changed": len(changed) - new_count,
+            "unchanged": len(ids) - len(changed),
+            "removed": len(removed_ids),
+            "skipped": skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+        print("\nImport-Zusammenfassung:")
+        print(f"Gesamtanzahl Datensätze: {summary['total_rows']}")
+        print(f"Erfolgreich importiert: {summary['imported']} (neu: {summary['new']}, geändert: {summary['changed']}, unverändert: {summary['unchanged']})")
+        print(f"Entfernt: {summary['removed']}")
+        print(f"Fehlgeschlagen/Übersprungen: {summary['skipped']}")
+        print(f"Dauer: {summary['seconds']:.2f}s ({summary['rows_per_second']:.1f} Zeilen/s)")
+        return summary
 
     except Exception as e:
         print(f"Import-Fehler: {e}")
         raise
 
 if __name__ == "__main__":
-    import_csv_to_chromadb()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Produktdaten aus der CSV in ChromaDB importieren")
+    parser.add_argument("--csv", type=Path, default=None, help="Pfad der CSV-Datei (Standard: PRODUCT_DATA_PATH)")
+    parser.add_argument("--blue-green", action="store_true", help="In eine neue, versionierte Collection importieren und danach umschalten")
+    args = parser.parse_args()
+
+    if args.blue_green:
+        from src.services.catalogReloader import CatalogReloader
+        CatalogReloader().reload(args.csv)
+    else:
+        import_csv_to_chromadb(args.csv)
\ No newline at end of file
@@ -0,0 +1,366 @@
+from src.config.config import settings  # Absolute Import verwenden
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+# Felder mit vorberechneten booleschen Masken (Gleichheits-/Mengenfilter)
+MASK_FIELDS = ("type", "manufacturer", "os", "qualification")
+# Numerische Felder für Bereichsfilter
+NUMERIC_FIELDS = ("price_chf",)
+
+# Speicherformat der Matrix; bei "int8" bleibt float32 auf der Festplatte für das exakte Nachsortieren
+_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.float32}
+
+def _empty_result(count: int = 1) -> Dict[str, Any]:
+    return {
+        "ids": [[] for _ in range(count)],
+        "metadatas": [[] for _ in range(count)],
+        "distances": [[] for _ in range(count)]
+    }
+
+class VectorStore(ABC):
+    """Basisklasse für die Vektorsuche hinter ChromaDBClient.search_products"""
+
+    @abstractmethod
+    def search(self, query_embedding: List[float], limit: int = 5, where: Optional[Dict[str, Any]] = None, source=None) -> Dict[str, Any]:
+        """
+        Nächste Nachbarn im ChromaDB-Ergebnisformat (ids/metadatas/distances je Anfrage).
+
+        source: fester Katalogstand (CatalogState) statt des aktuellen Stands der Quelle.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Gib Kennzahlen zum Index zurück"""
+        pass
+
+class ChromaVectorStore(VectorStore):
+    """Vektorsuche über die aktive ChromaDB-Collection"""
+
+    def __init__(self, source):
+        self.source = source  # Objekt mit .collection (ChromaDBClient), die Collection kann umgeschaltet werden
+
+    def search(self, query_embedding: List[float], limit: int = 5, where: Optional[Dict[str, Any]] = None, source=None) -> Dict[str, Any]:
+        query_args = {"query_embeddings": [query_embedding], "n_results": limit}
+        if where:
+            query_args["where"] = where
+        return (source or self.source).collection.query(**query_args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"engine": "chroma", "count": self.source.collection.count()}
+
+class NumpyVectorIndex:
+    """
+    Zusammenhängende, normalisierte Embedding-Matrix mit Top-k-Suche per Matrix-Vektor-Produkt.
+
+    Die Matrix liegt als memory-mapped Datei vor (float32 oder float16). Metadatenfilter werden
+    über vorberechnete boolesche Masken je Feldwert und numerische Arrays ausgewertet.
+
+    Optional (quantized) wird zuerst über int8-Codes mit einem Skalierungsfaktor pro Vektor per
+    Ganzzahl-Skalarprodukt vorsortiert; nur die besten Kandidaten werden danach mit den
+    float32-Vektoren exakt bewertet. Von der float32-Matrix werden so nur diese Zeilen eingelesen.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+        version: Optional[str] = None,
+        quantized: Optional[tuple] = None,
+        rerank_factor: int = settings.VECTOR_STORE_RERANK_FACTOR,
+        space: str = "l2"
+    ):
+        self.ids = list(ids)
+        self.matrix = embeddings
+        self.metadatas = metadatas
+        self.version = version
+        self.codes, self.scales = quantized if quantized is not None else (None, None)
+        self.rerank_factor = rerank_factor
+        self.space = space  # Distanzmetrik der Quell-Collection, damit die Distanzen vergleichbar bleiben
+        self.masks: Dict[str, Dict[Any, np.ndarray]] = {}
+        self.numeric: Dict[str, np.ndarray] = {}
+        self._build_masks()
+
+    @staticmethod
+    def normalize(embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def quantize(embeddings: np.ndarray) -> tuple:
+        """
+        Symmetrische int8-Quantisierung mit einem Skalierungsfaktor pro Vektor.
+
+        :return: (int8-Codes, float32-Skalierungsfaktoren), Vektor ≈ Codes * Faktor.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        scales = np.maximum(np.abs(embeddings).max(axis=-1), 1e-12) / 127.0
+        codes = np.clip(np.rint(embeddings / scales[..., None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _build_masks(self) -> None:
+        count = len(self.ids)
+        for field in MASK_FIELDS:
+            values: Dict[Any, np.ndarray] = {}
+            for row, metadata in enumerate(self.metadatas):
+                value = metadata.get(field)
+                if value is None:
+                    continue
+                if value not in values:
+                    values[value] = np.zeros(count, dtype=bool)
+                values[value][row] = True
+            self.masks[field] = values
+        for field in NUMERIC_FIELDS:
+            self.numeric[field] = np.array(
+                [metadata.get(field, np.nan) if isinstance(metadata.get(field), (int, float)) else np.nan for metadata in self.metadatas],
+                dtype=np.float64
+            )
+
+    def _field_values(self, field: str) -> np.ndarray:
+        """Feldwerte als Objekt-Array für Felder ohne vorberechnete Maske"""
+        return np.array([metadata.get(field) for metadata in self.metadatas], dtype=object)
+
+    def _condition_mask(self, field: str, condition: Any) -> np.ndarray:
+        count = len(self.ids)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(count, dtype=bool)
+        for operator, operand in condition.items():
+            if operator in ("$eq", "$in", "$ne", "$nin"):
+                values = operand if isinstance(operand, list) else [operand]
+                if field in self.masks:
+                    matched = np.zeros(count, dtype=bool)
+                    for value in values:
+                        value_mask = self.masks[field].get(value)
+                        if value_mask is not None:
+                            matched |= value_mask
+                else:
+                    matched = np.isin(self._field_values(field), values)
+                mask &= ~matched if operator in ("$ne", "$nin") else matched
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                numbers = self.numeric.get(field)
+                if numbers is None:
+                    numbers = np.array([v if isinstance(v, (int, float)) else np.nan for v in self._field_values(field)], dtype=np.float64)
+                with np.errstate(invalid="ignore"):
+                    if operator == "$gt":
+                        mask &= numbers > operand
+                    elif operator == "$gte":
+                        mask &= numbers >= operand
+                    elif operator == "$lt":
+                        mask &= numbers < operand
+                    else:
+                        mask &= numbers <= operand
+            else:
+                raise ValueError(f"Nicht unterstützter Filteroperator: {operator}")
+        return mask
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Übersetzt eine ChromaDB-where-Klausel in eine boolesche Zeilenmaske (None ohne Filter)"""
+        if not where:
+            return None
+        masks = []
+        for key, value in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self.mask(clause) for clause in value]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self.mask(clause) for clause in value]))
+            else:
+                masks.append(self._condition_mask(key, value))
+        return np.logical_and.reduce(masks)
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Kosinus-Ähnlichkeiten (Anfragen x Zeilen); float16 wird blockweise in float32 gerechnet"""
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if matrix.dtype == np.float32:
+            return queries @ matrix.T
+        block = 8192
+        return np.concatenate(
+            [queries @ np.asarray(matrix[start:start + block], dtype=np.float32).T for start in range(0, len(matrix), block)],
+            axis=1
+        ) if len(matrix) else np.empty((len(queries), 0), dtype=np.float32)
+
+    def distances(self, similarities: np.ndarray) -> np.ndarray:
+        """Rechnet Kosinus-Ähnlichkeiten in die Distanzen um, die ChromaDB für die Metrik liefert"""
+        if self.space == "l2":
+            return 2.0 - 2.0 * similarities  # Quadrierte L2-Distanz normalisierter Vektoren
+        return 1.0 - similarities  # "cosine" und "ip"
+
+    def _quantized_scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Näherungsweise Ähnlichkeiten aus int8-Skalarprodukten (int32-Akkumulation)"""
+        codes = self.codes if rows is None else self.codes[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+        query_codes, _ = self.quantize(queries)
+        # Der Faktor der Anfrage ist je Zeile konstant und ändert die Reihenfolge nicht
+        return np.einsum("qd,nd->qn", query_codes, codes, dtype=np.int32) * scales
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> tuple:
+        """Spaltenindizes und Werte der k besten Scores je Zeile, absteigend sortiert"""
+        # Nur die k besten Spalten teilweise sortieren, danach diese k exakt ordnen
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def search_batch(self, query_embeddings: List[List[float]], limit: int = 5, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Top-k-Suche für mehrere Anfragen in einem Matrixprodukt.
+
+        :return: Ergebnis im ChromaDB-Format; Distanzen in der Metrik der Quell-Collection (normalisierte Vektoren).
+        """
+        queries = self.normalize(np.atleast_2d(query_embeddings))
+        mask = self.mask(where)
+        rows = None if mask is None else np.flatnonzero(mask)
+        candidates = len(self.ids) if rows is None else len(rows)
+        k = min(limit, candidates)
+        if k <= 0:
+            return _empty_result(len(queries))
+
+        if self.codes is None:
+            top, top_scores = self._top_k(self._scores(queries, rows), k)
+        else:
+            # Vorauswahl über int8, danach exakte Bewertung der Kandidaten in float32
+            shortlist, _ = self._top_k(self._quantized_scores(queries, rows), min(k * self.rerank_factor, candidates))
+            shortlist_rows = shortlist if rows is None else rows[shortlist]
+            exact = np.einsum("qd,qcd->qc", queries, np.asarray(self.matrix[shortlist_rows.ravel()], dtype=np.float32).reshape(*shortlist.shape, -1))
+            best, top_scores = self._top_k(exact, k)
+            top = np.take_along_axis(shortlist, best, axis=1)
+
+        result = _empty_result(len(queries))
+        for query_row in range(len(queries)):
+            matrix_rows = top[query_row] if rows is None else rows[top[query_row]]
+            result["ids"][query_row] = [self.ids[row] for row in matrix_rows]
+            result["metadatas"][query_row] = [self.metadatas[row] for row in matrix_rows]
+            result["distances"][query_row] = self.distances(top_scores[query_row]).tolist()
+        return result
+
+    def save(self, path_prefix: Path, dtype: str = "float32") -> None:
+        """Schreibt Matrix (.npy) und Metadaten (.json) atomar"""
+        path_prefix.parent.mkdir(parents=True, exist_ok=True)
+        matrix_path = Path(f"{path_prefix}.npy")
+        meta_path = Path(f"{path_prefix}.json")
+        tmp_matrix = Path(f"{path_prefix}.tmp.npy")
+        tmp_meta = Path(f"{path_prefix}.json.tmp")
+        np.save(tmp_matrix, np.asarray(self.matrix, dtype=_DTYPES[dtype]))
+        if dtype == "int8":
+            codes, scales = self.quantize(self.matrix)
+            for name, array in (("codes", codes), ("scales", scales)):
+                # Nicht in bestehende Dateien schreiben, andere Prozesse haben sie eingeblendet
+                np.save(Path(f"{path_prefix}.{name}.tmp.npy"), array)
+                os.replace(Path(f"{path_prefix}.{name}.tmp.npy"), Path(f"{path_prefix}.{name}.npy"))
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "ids": self.ids, "metadatas": self.metadatas, "dtype": dtype}, f, ensure_ascii=False)
+        os.replace(tmp_matrix, matrix_path)
+        os.replace(tmp_meta, meta_path)  # Zuletzt ersetzen: die Metadaten markieren einen vollständigen Index
+
+    @classmethod
+    def load(cls, path_prefix: Path, space: str = "l2") -> "NumpyVectorIndex":
+        """Lädt den Index, die Matrizen werden nur eingeblendet (mmap) statt kopiert"""
+        with open(f"{path_prefix}.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(f"{path_prefix}.npy", mmap_mode="r")
+        quantized = None
+        if meta.get("dtype") == "int8":
+            quantized = (
+                np.load(f"{path_prefix}.codes.npy", mmap_mode="r"),
+                np.load(f"{path_prefix}.scales.npy", mmap_mode="r")
+            )
+        return cls(meta["ids"], matrix, meta["metadatas"], meta.get("version"), quantized, space=space)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes, die bei jeder Anfrage vollständig gelesen werden"""
+        if self.codes is not None:
+            return int(self.codes.nbytes + self.scales.nbytes)
+        return int(self.matrix.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class NumpyVectorStore(VectorStore):
+    """
+    Prozessinterne Vektorsuche über eine memory-mapped NumPy-Matrix.
+
+    Die Matrix wird aus der aktiven ChromaDB-Collection exportiert und neu aufgebaut, sobald ein
+    Import eine neue Version der Produktdatensätze geschrieben oder auf eine andere Collection
+    umgeschaltet wurde. ChromaDB bleibt damit die Quelle der Daten.
+    """
+
+    def __init__(self, source, directory: Path = settings.VECTOR_STORE_DIR, dtype: str = settings.VECTOR_STORE_DTYPE):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unbekannter Datentyp für den Vektorindex: {dtype}")
+        self.source = source  # ChromaDBClient (collection, collection_name, record_store)
+        self.directory = Path(directory)
+        self.dtype = dtype
+        self.index: Optional[NumpyVectorIndex] = None
+        self._index_key: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_key(source) -> tuple:
+        return (source.collection_name, source.record_store.version)
+
+    def _ensure_current(self, source=None) -> NumpyVectorIndex:
+        source = source or self.source
+        key = self._current_key(source)
+        if self.index is not None and self._index_key == key:
+            return self.index
+        with self._lock:
+            if self.index is None or self._index_key != key:
+                self.index = self._load_or_build(source, *key)
+                self._index_key = key
+        return self.index
+
+    def _load_or_build(self, source, collection_name: str, version: Optional[str]) -> NumpyVectorIndex:
+        path_prefix = self.directory / f"{collection_name}.{self.dtype}"
+        space = (source.collection.metadata or {}).get("hnsw:space", "l2")
+        try:
+            index = NumpyVectorIndex.load(path_prefix, space)
+            if index.version == version:
+                return index
+        except FileNotFoundError:
+            pass
+
+        # Aus der Collection exportieren (einmal pro Import bzw. Umschaltung)
+        data = source.collection.get(include=["embeddings", "metadatas"])
+        embeddings = NumpyVectorIndex.normalize(data["embeddings"]) if len(data["ids"]) else np.empty((0, 0), dtype=np.float32)
+        NumpyVectorIndex(data["ids"], embeddings, data["metadatas"], version).save(path_prefix, self.dtype)
+        logging.info(f"NumPy-Vektorindex aufgebaut: {collection_name} ({len(data['ids'])} Vektoren, {self.dtype})")
+        return NumpyVectorIndex.load(path_prefix, space)
+
+    def search(self, query_embedding: List[float], limit: int = 5, where: Optional[Dict[str, Any]] = None, source=None) -> Dict[str, Any]:
+        return self._ensure_current(source).search_batch([query_embedding], limit, where)
+
+    def search_batch(self, query_embeddings: List[List[float]], limit: int = 5, where: Optional[Dict[str, Any]] = None, source=None) -> Dict[str, Any]:
+        return self._ensure_current(source).search_batch(query_embeddings, limit, where)
+
+    def stats(self) -> Dict[str, Any]:
+        index = self.index
+        return {
+            "engine": "numpy",
+            "dtype": self.dtype,
+            "count": len(index) if index is not None else 0,
+            "bytes": index.nbytes if index is not None else 0,
+            "version": self._index_key
+        }
+
+def create_vector_store(source, backend: Optional[str] = None) -> VectorStore:
+    """Erstelle die konfigurierte Vektorsuche"""
+    backend = backend or settings.VECTOR_STORE_BACKEND
+    if backend == "numpy":
+        return NumpyVectorStore(source)
+    if backend == "chroma":
+        return ChromaVectorStore(source)
+    raise ValueError(f"Unbekannte Vektorsuche: {backend}")
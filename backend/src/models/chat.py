@@ -5,4 +5,8 @@ class ChatRequest(BaseModel):
     message: str
     context: Optional[Dict[str, Any]] = None
     history: Optional[List[Dict[str, str]]] = None
-    role_type: Optional[str] = None
\ No newline at end of file
+    role_type: Optional[str] = None
+    session_id: Optional[str] = None  # Trennt den Gesprächsverlauf pro Benutzer/Chat
+
+class ResetChatRequest(BaseModel):
+    session_id: Optional[str] = None
\ No newline at end of file
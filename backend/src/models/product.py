@@ -1,8 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 
 class ProductQuery(BaseModel):
     query: str
     include_advice: Optional[bool] = False
     filters: Optional[Dict[str, Any]] = None
-    single_product: Optional[bool] = True
\ No newline at end of file
+    single_product: Optional[bool] = True
+    session_id: Optional[str] = None
+    retrieval: Optional[Literal["vector", "lexical", "hybrid"]] = None  # Standard: SEARCH_RETRIEVAL
\ No newline at end of file
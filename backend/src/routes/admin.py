@@ -0,0 +1,40 @@
+from typing import Optional
+import hmac
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse
+from src.config.config import settings
+from src.services.catalogReloader import CatalogReloader, CatalogReloadInProgressError
+from src.services.serviceProvider import get_catalog_reloader
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Prüft das Admin-Token; ohne konfiguriertes ADMIN_TOKEN sind die Admin-Endpunkte abgeschaltet"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# Erstelle einen Router mit dem Prefix "/api/admin" und dem Tag "admin"
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(_require_admin)]
+)
+
+@router.post("/reload-catalog")
+async def reload_catalog(catalog_reloader: CatalogReloader = Depends(get_catalog_reloader)):
+    """
+    Startet einen Blue/Green-Reload des Produktkatalogs im Hintergrund.
+    Die Suche bedient weiter die aktive Collection, bis die neue Version validiert ist.
+    """
+    try:
+        catalog_reloader.reload_in_background()
+    except CatalogReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=202, content={"status": "started", **catalog_reloader.stats()})
+
+@router.get("/reload-catalog")
+async def reload_catalog_status(catalog_reloader: CatalogReloader = Depends(get_catalog_reloader)):
+    """
+    Status des letzten Katalog-Reloads und die aktive Collection.
+    """
+    return catalog_reloader.stats()
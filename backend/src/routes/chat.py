@@ -1,39 +1,98 @@
-from fastapi import APIRouter, HTTPException, Depends
-from src.models.chat import ChatRequest
+from typing import Optional
+from contextlib import aclosing
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from src.models.chat import ChatRequest, ResetChatRequest
+from src.utils.clientDisconnect import CLIENT_CLOSED_REQUEST, ClientDisconnectedError, cancel_on_disconnect, get_cancellation_tracker
+from src.utils.llmScheduler import LLMOverloadedError
 from src.utils.llmService import LLMService
+from src.utils.streaming import format_sse, SSE_HEADERS
 from src.services.serviceProvider import get_llm_service
 
 router = APIRouter(tags=["chat"])
 
+def _overloaded(error: LLMOverloadedError) -> HTTPException:
+    """Antwort, wenn das LLM die Anfrage nicht annehmen kann"""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def _build_chat_context(request: ChatRequest) -> dict:
+    """Erstelle den LLM-Kontext aus der Chat-Anfrage"""
+    # Kontext initialisieren
+    context = {"history": request.history if request.history else []}
+
+    # Produktkontext hinzufügen, falls verfügbar
+    if request.context and "product" in request.context:
+        context["product"] = request.context["product"]
+
+    return context
+
 @router.post("/api/chat")
-async def chat(request: ChatRequest, llm_service: LLMService = Depends(get_llm_service)):
+async def chat(request: ChatRequest, http_request: Request, llm_service: LLMService = Depends(get_llm_service)):
     """Handle chat requests with optional product context"""
     try:
         # Kontext und Rollentyp initialisieren
-        context = {"history": request.history if request.history else []}
+        context = _build_chat_context(request)
         role_type = request.role_type if request.role_type else "general"
-        
-        # Produktkontext hinzufügen, falls verfügbar
-        if request.context and "product" in request.context:
-            product = request.context["product"]
-            context["product"] = product
-            
-        # LLM-Antwort generieren
-        response = await llm_service.generate_response(
+
+        # LLM-Antwort generieren (abbrechen, sobald der Client die Verbindung trennt)
+        response = await cancel_on_disconnect(http_request, llm_service.generate_response(
             message=request.message,
             role_type=role_type,
-            context=context
-        )
-            
+            context=context,
+            session_id=request.session_id
+        ), endpoint="chat")
+
         return response
-    
+
+    except ClientDisconnectedError:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, llm_service: LLMService = Depends(get_llm_service)):
+    """Stream chat responses token by token as Server-Sent Events"""
+    context = _build_chat_context(request)
+    role_type = request.role_type if request.role_type else "general"
+    try:
+        # Ablehnen, solange noch ein Statuscode gesendet werden kann
+        llm_service.scheduler.ensure_capacity("interactive")
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
+
+    async def event_stream():
+        chunks = []
+        try:
+            # aclosing: beim Verbindungsabbruch wird die Generierung sofort beendet, nicht erst beim Aufräumen
+            async with aclosing(llm_service.generate_response_stream(
+                message=request.message,
+                role_type=role_type,
+                context=context,
+                session_id=request.session_id
+            )) as tokens:
+                async for token in tokens:
+                    chunks.append(token)
+                    yield format_sse({"token": token}, event="token")
+            yield format_sse({"response": "".join(chunks).strip()}, event="done")
+        except (asyncio.CancelledError, GeneratorExit):
+            get_cancellation_tracker().record("chat_stream")
+            raise
+        except Exception as e:
+            yield format_sse({"error": f"Error generating response: {str(e)}"}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/api/reset-chat")
-async def reset_chat(llm_service: LLMService = Depends(get_llm_service)):
-    """Reset the chat conversation history"""
+async def reset_chat(request: Optional[ResetChatRequest] = None, llm_service: LLMService = Depends(get_llm_service)):
+    """Reset the chat conversation history of one session"""
     try:
-        return llm_service.reset_conversation()
+        return llm_service.reset_conversation(request.session_id if request else None)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
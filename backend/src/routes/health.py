@@ -1,6 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from ..config.config import settings
+from ..utils.clientDisconnect import get_cancellation_tracker
+from ..utils.llmService import LLMService
+from ..utils.productSearch import ProductSearch
+from ..utils.resultCache import ResultCache
+from ..utils.recommendationSelector import RecommendationSelector
+from ..services.serviceProvider import get_llm_service, get_product_search, get_recommendation_cache, get_recommendation_selector
 
 # Erstelle einen Router mit dem Prefix "/api" und dem Tag "health"
 router = APIRouter(
@@ -18,4 +24,34 @@ async def health_check():
         "status": "ok",  # Status der API
         "version": settings.APP_VERSION,  # Aktuelle Version der Anwendung
         "environment": "development" if settings.DEBUG else "production"  # Umgebung (Entwicklung oder Produktion)
-    })
\ No newline at end of file
+    })
+
+@router.get("/metrics")
+async def metrics(
+    product_search: ProductSearch = Depends(get_product_search),
+    llm_service: LLMService = Depends(get_llm_service),
+    recommendation_cache: ResultCache = Depends(get_recommendation_cache),
+    selector: RecommendationSelector = Depends(get_recommendation_selector)
+):
+    """
+    Laufzeitkennzahlen der Caches und Speicher fuer das Monitoring.
+    """
+    batcher = product_search.text_analyzer.batcher
+    return JSONResponse({
+        "embedding_cache": product_search.text_analyzer.embedding_cache.stats(),
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "vector_store": product_search.db_client.vector_store.stats(),
+        "search_pool": product_search.worker_pool.stats() if product_search.worker_pool is not None else None,
+        "conversation_store": llm_service.conversation_store.stats(),
+        "llm_context": llm_service.context_stats(),
+        "llm_scheduler": llm_service.scheduler.stats(),
+        "llm_pool": llm_service.pool.stats(),
+        "intent_router": llm_service.intent_router.stats(),
+        "client_disconnects": get_cancellation_tracker().stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "recommendation_selector": selector.stats(),
+        "coalescing": {
+            "search": product_search.single_flight.stats(),
+            "llm": llm_service.single_flight.stats()
+        }
+    })
@@ -1,104 +1,267 @@
-from fastapi import APIRouter, HTTPException, Depends
+from contextlib import aclosing
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from src.config.config import settings
 from src.models.product import ProductQuery
+from src.utils.clientDisconnect import CLIENT_CLOSED_REQUEST, ClientDisconnectedError, cancel_on_disconnect, get_cancellation_tracker
+from src.utils.llmScheduler import LLMOverloadedError
 from src.utils.llmService import LLMService
 from src.utils.productSearch import ProductSearch
-from src.services.serviceProvider import get_llm_service, get_product_search
+from src.utils.recommendationSelector import RecommendationSelector
+from src.utils.resultCache import ResultCache
+from src.utils.searchWorkerPool import SearchOverloadedError
+from src.utils.streaming import format_sse, SSE_HEADERS, SELECTED_PRODUCT_PATTERN, SelectedProductParser
+from src.services.serviceProvider import get_llm_service, get_product_search, get_recommendation_cache, get_recommendation_selector
 
 router = APIRouter(tags=["products"])
 
+RECOMMENDATION_MESSAGE = "Which product would you recommend and why? Start your response with 'SELECTED_PRODUCT_ID: X' where X is the product number you recommend."
+
+def _overloaded(error: Exception) -> HTTPException:
+    """Antwort, wenn der Such-Pool oder das LLM ausgelastet ist (503, bei abgewiesener niedriger Priorität 429)"""
+    return HTTPException(
+        status_code=getattr(error, "status_code", 503),
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @router.post("/api/search")
 async def search(
-    query: ProductQuery, 
+    query: ProductQuery,
     product_search: ProductSearch = Depends(get_product_search)
 ):
     """Search for products with optional advice"""
     try:
         if query.include_advice:
             # Änderung hier: single_product=True explizit übergeben
-            return product_search.search_with_advice(query.query, single_product=True)
-        return product_search.search(query.query)
+            return await product_search.asearch_with_advice(query.query, single_product=True, filters=query.filters, retrieval=query.retrieval)
+        return await product_search.asearch(query.query, filters=query.filters, retrieval=query.retrieval)
+    except SearchOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/products/{product_id}")
+async def get_product(
+    product_id: str,
+    product_search: ProductSearch = Depends(get_product_search)
+):
+    """Get a single product by id from the in-memory catalog index"""
+    product = product_search.get_product(product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} not found.")
+    return product
+
+@router.get("/api/facets")
+async def get_facets(product_search: ProductSearch = Depends(get_product_search)):
+    """Get filter facets (value counts per field) and the price range of the catalog"""
+    return product_search.get_facets()
+
+async def _find_candidates(query: ProductQuery, product_search: ProductSearch) -> dict:
+    """Produkte samt Distanzen abrufen und auf die Kandidaten für die Auswahl beschränken"""
+    try:
+        ranked = await product_search.asearch_ranked(query.query, filters=query.filters, retrieval=query.retrieval)
+    except SearchOverloadedError as e:
+        raise _overloaded(e)
+
+    if not ranked["products"]:
+        raise HTTPException(status_code=404, detail="No products found.")
+
+    # Top 3-5 Produkte auswählen, aus denen das LLM wählen kann
+    return {**ranked, "products": ranked["products"][:3], "distances": ranked["distances"][:3]}  # Auf 3 Optionen beschränken
+
+async def _find_top_products(query: ProductQuery, product_search: ProductSearch) -> list:
+    """Produkte aus ChromaDB abrufen und die Kandidaten für das LLM auswählen"""
+    return (await _find_candidates(query, product_search))["products"]
+
+def _build_recommendation_context(query: ProductQuery, top_products: list) -> dict:
+    """Produkte für den Prompt formatieren und den LLM-Kontext vorbereiten"""
+    formatted_products = []
+    for i, p in enumerate(top_products):
+        product_name = f"{p['header'].get('manufacturer', 'Unknown')} {p['header'].get('model', 'Unknown')}"
+        product_id = i  # Index als Produkt-ID verwenden
+
+        formatted_products.append(
+            f"Product {product_id}: {product_name} - "
+            f"{p['specifications']['system'].get('ram', '')}, "
+            f"{p['specifications']['system'].get('cpu', '')}, "
+            f"{p['specifications']['system'].get('storage', '')} | "
+            f"{p['header'].get('price', 'N/A')}€, {p['header'].get('type', 'N/A')}"
+        )
+
+    return {
+        "user_requirements": query.query,
+        "available_products": "\n".join(formatted_products),
+        "history": "",
+        "message": RECOMMENDATION_MESSAGE,
+        "single_product": True
+    }
+
 @router.post("/api/recommendation")
 async def recommend(
     query: ProductQuery,
+    request: Request,
     product_search: ProductSearch = Depends(get_product_search),
-    llm_service: LLMService = Depends(get_llm_service)
+    llm_service: LLMService = Depends(get_llm_service),
+    recommendation_cache: ResultCache = Depends(get_recommendation_cache),
+    selector: RecommendationSelector = Depends(get_recommendation_selector)
 ):
     try:
+        # Trennt der Client die Verbindung, werden Suche und LLM-Aufruf abgebrochen
+        return await cancel_on_disconnect(
+            request,
+            _recommend(query, product_search, llm_service, recommendation_cache, selector),
+            endpoint="recommendation"
+        )
+    except ClientDisconnectedError:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+async def _recommend(
+    query: ProductQuery,
+    product_search: ProductSearch,
+    llm_service: LLMService,
+    recommendation_cache: ResultCache,
+    selector: RecommendationSelector
+) -> dict:
+    """Empfehlung ermitteln: Cache, Auswahl ohne LLM oder Auswahl und Begründung durch das LLM"""
+    try:
+        # 0. Dieselbe Anfrage wurde gegen denselben Katalogstand schon beantwortet
+        catalog_version = product_search.db_client.catalog_version()
+        cache_args = {}
+        if recommendation_cache.enabled:
+            embedding = None
+            if recommendation_cache.semantic:
+                # Landet im Embedding-Cache und wird von der Suche danach wiederverwendet
+                embedding = await asyncio.to_thread(product_search.text_analyzer.get_embedding, query.query)
+            cache_args = {
+                "version": catalog_version,
+                "params": (query.filters, query.retrieval or settings.SEARCH_RETRIEVAL),
+                "embedding": embedding
+            }
+            cached = recommendation_cache.get(query.query, **cache_args)
+            if cached is not None:
+                llm_service.add_to_history(query.session_id, RECOMMENDATION_MESSAGE, cached["llm_response"])
+                return cached
+
         # 1. Produkte aus ChromaDB abrufen
-        search_result = product_search.search(query.query)
-        products = search_result["products"]
-
-        if not products:
-            raise HTTPException(status_code=404, detail="No products found.")
-
-        # Top 3-5 Produkte auswählen, aus denen das LLM wählen kann
-        top_products = products[:3]  # Auf 3 Optionen für das LLM beschränken
-        
-        # 2. Produkte für den Prompt formatieren
-        formatted_products = []
-        for i, p in enumerate(top_products):
-            product_name = f"{p['header'].get('manufacturer', 'Unknown')} {p['header'].get('model', 'Unknown')}"
-            product_id = i  # Index als Produkt-ID verwenden
-            
-            formatted_products.append(
-                f"Product {product_id}: {product_name} - "
-                f"{p['specifications']['system'].get('ram', '')}, "
-                f"{p['specifications']['system'].get('cpu', '')}, "
-                f"{p['specifications']['system'].get('storage', '')} | "
-                f"{p['header'].get('price', 'N/A')}€, {p['header'].get('type', 'N/A')}"
-            )
-        
-        formatted_products_text = "\n".join(formatted_products)
-
-        # 3. LLM-Kontext vorbereiten
-        context = {
-            "user_requirements": query.query,
-            "available_products": formatted_products_text,
-            "history": "",
-            "message": "Which product would you recommend and why? Start your response with 'SELECTED_PRODUCT_ID: X' where X is the product number you recommend.",
-            "single_product": True
-        }
+        candidates = await _find_candidates(query, product_search)
+        top_products = candidates["products"]
+
+        # Liegt ein Produkt klar vorne, ohne LLM auswählen und nur die Begründung nachladen
+        selected = selector.select(candidates) if settings.RECOMMENDATION_FAST_PATH else None
+        if selected is not None:
+            explanation = await selector.explain(top_products[selected], catalog_version)
+            llm_service.add_to_history(query.session_id, RECOMMENDATION_MESSAGE, explanation)
+            result = {
+                "recommended_products": [top_products[selected]],
+                "llm_response": explanation
+            }
+            if recommendation_cache.enabled:
+                recommendation_cache.put(query.query, payload=result, **cache_args)
+            return result
 
-        # 4. LLM-Antwort generieren
+        # 2./3. Produkte formatieren und LLM-Kontext vorbereiten
+        context = _build_recommendation_context(query, top_products)
+
+        # 4. LLM-Antwort generieren (identische gleichzeitige Empfehlungen teilen sich einen LLM-Aufruf)
         response = await llm_service.generate_response(
             message=context["message"],
             role_type="recommendation",
-            context=context
+            context=context,
+            session_id=query.session_id,
+            coalesce=True,
+            priority="recommendation",  # Chat-Anfragen haben Vorrang
+            # Gecachte Antworten werden allen Sitzungen ausgeliefert und dürfen keinen Verlauf enthalten
+            use_history=not recommendation_cache.enabled
         )
 
         if "error" in response:
             raise HTTPException(status_code=500, detail=response["error"])
 
         llm_response = response["response"]
-        
+
         # 5. Ausgewählte Produkt-ID aus der LLM-Antwort extrahieren
         selected_product_id = 0  # Standardmässig erstes Produkt
-        
+
         # Nach dem SELECTED_PRODUCT_ID-Muster suchen
-        import re
-        pattern = r"SELECTED_PRODUCT_ID:\s*(\d+)"
-        match = re.search(pattern, llm_response)
-        
+        match = SELECTED_PRODUCT_PATTERN.search(llm_response)
+
         if match:
             try:
                 selected_product_id = int(match.group(1))
                 # Sicherstellen, dass es im gültigen Bereich liegt
                 selected_product_id = min(selected_product_id, len(top_products) - 1)
                 # SELECTED_PRODUCT_ID-Zeile aus der Antwort entfernen
-                llm_response = re.sub(pattern, "", llm_response).strip()
+                llm_response = SELECTED_PRODUCT_PATTERN.sub("", llm_response).strip()
             except:
                 pass  # Bei Konvertierungsfehler Standard verwenden
-        
+
         # 6. Nur das ausgewählte Produkt zurückgeben
         selected_product = top_products[selected_product_id]
-        
-        return {
+
+        result = {
             "recommended_products": [selected_product],  # Nur das Produkt zurückgeben, das das LLM beschrieben hat
             "llm_response": llm_response
         }
+        if recommendation_cache.enabled:
+            recommendation_cache.put(query.query, payload=result, **cache_args)
+        return result
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         print("[ERROR] ❌ Empfehlung fehlgeschlagen:", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/recommendation/stream")
+async def recommend_stream(
+    query: ProductQuery,
+    product_search: ProductSearch = Depends(get_product_search),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """Stream the recommendation as Server-Sent Events: first the selected product, then the explanation tokens"""
+    top_products = await _find_top_products(query, product_search)
+    context = _build_recommendation_context(query, top_products)
+    try:
+        # Nach Beginn des Streams lässt sich kein Statuscode mehr senden
+        llm_service.scheduler.ensure_capacity("recommendation")
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
+
+    async def event_stream():
+        parser = SelectedProductParser(len(top_products))
+        chunks = []
+
+        def emit(selected_id, text):
+            # Sobald das Praefix erkannt ist, zuerst das ausgewählte Produkt senden
+            if selected_id is not None:
+                yield format_sse({"recommended_products": [top_products[selected_id]]}, event="product")
+            if text:
+                chunks.append(text)
+                yield format_sse({"token": text}, event="token")
+
+        try:
+            async with aclosing(llm_service.generate_response_stream(
+                message=context["message"],
+                role_type="recommendation",
+                context=context,
+                session_id=query.session_id,
+                priority="recommendation"
+            )) as tokens:
+                async for token in tokens:
+                    for event in emit(*parser.feed(token)):
+                        yield event
+
+            for event in emit(*parser.finish()):
+                yield event
+            yield format_sse({"llm_response": "".join(chunks).strip()}, event="done")
+        except (asyncio.CancelledError, GeneratorExit):
+            get_cancellation_tracker().record("recommendation_stream")
+            raise
+        except Exception as e:
+            print("[ERROR] ❌ Empfehlung fehlgeschlagen:", str(e))
+            yield format_sse({"error": str(e)}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
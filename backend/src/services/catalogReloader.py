@@ -0,0 +1,237 @@
+from typing import Dict, Any, Optional
+from pathlib import Path
+import logging
+import os
+import threading
+import time
+import uuid
+try:
+    import fcntl
+except ImportError:  # Windows: keine Dateisperren, Überwachung läuft in jedem Prozess
+    fcntl = None
+from src.config.config import settings
+from src.database.chromadbClient import ChromaDBClient, hnsw_metadata, read_active_collection, write_active_collection
+from src.database.productRecords import ProductRecordStore
+
+class CatalogReloadInProgressError(Exception):
+    """Wird ausgelöst, wenn bereits ein Katalog-Reload läuft"""
+
+    def __init__(self):
+        super().__init__("A catalog reload is already running")
+
+class CatalogReloader:
+    """
+    Blue/Green-Reload des Produktkatalogs ohne Ausfallzeit.
+
+    Der Import baut eine neue, versionierte Collection samt Datensatzdatei auf, während die Suche
+    weiter die aktive Collection verwendet. Erst nach erfolgreicher Validierung wird der Zeiger auf
+    die aktive Version atomar ersetzt und der ChromaDBClient umgeschaltet. Andere Prozesse
+    übernehmen die Umschaltung über ChromaDBClient.sync_active_collection().
+    """
+
+    def __init__(self, db_client: Optional[ChromaDBClient] = None, model=None):
+        self.db_client = db_client or ChromaDBClient()
+        self.model = model  # Bereits geladenes Embedding-Modell wiederverwenden
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watcher = threading.Event()
+        self._watcher_lock_file = None
+        self.status: Dict[str, Any] = {"state": "idle"}
+        self.reloads = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def reload(self, csv_path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Baut eine neue Collection-Version auf, validiert sie und schaltet darauf um.
+
+        :param csv_path: CSV-Datei, standardmässig PRODUCT_DATA_PATH.
+        :return: Zusammenfassung des Imports inkl. Name der neuen Collection.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise CatalogReloadInProgressError()
+
+        # Importfunktion erst hier laden, das Skript lädt sonst beim Start pandas/CUDA-Einstellungen
+        from src.database.scripts.importData import import_csv_to_chromadb
+
+        # Zeitstempel für die Sortierung, Suffix gegen Kollisionen bei mehreren Reloads pro Sekunde
+        version = f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        name = f"{settings.COLLECTION_NAME}_v{version}"
+        records_path = settings.DB_DIR / f"product_records_{name}.json"
+        started = time.perf_counter()
+        self.status = {"state": "building", "collection": name, "started_at": time.time()}
+        try:
+            collection = self.db_client.client.create_collection(name=name, metadata=hnsw_metadata())
+            record_store = ProductRecordStore(records_path)
+            try:
+                summary = import_csv_to_chromadb(
+                    csv_path,
+                    db_client=self.db_client,
+                    model=self.model,
+                    target_collection=collection,
+                    target_record_store=record_store
+                )
+                self._validate(collection, record_store, summary)
+            except Exception:
+                # Unfertige Version verwerfen, die aktive Collection bleibt unverändert
+                self._drop_version(name)
+                raise
+
+            previous = self.db_client.collection_name
+            write_active_collection({"collection": name, "records_path": str(records_path), "version": version})
+            self.db_client.activate(name, records_path)
+            self._cleanup_old_versions()
+
+            summary.update({"collection": name, "previous_collection": previous})
+            self.reloads += 1
+            self.status = {
+                "state": "done",
+                "collection": name,
+                "finished_at": time.time(),
+                "seconds": round(time.perf_counter() - started, 3),
+                "summary": summary
+            }
+            logging.info(f"Katalog neu geladen: {previous} -> {name}")
+            return summary
+        except Exception as e:
+            self.failures += 1
+            self.status = {"state": "failed", "collection": name, "error": str(e), "finished_at": time.time()}
+            logging.error(f"Katalog-Reload fehlgeschlagen: {e}")
+            raise
+        finally:
+            self._lock.release()
+
+    def reload_in_background(self, csv_path: Optional[Path] = None) -> None:
+        """Startet den Reload in einem Hintergrund-Thread"""
+        if self.running:
+            raise CatalogReloadInProgressError()
+
+        def run():
+            try:
+                self.reload(csv_path)
+            except CatalogReloadInProgressError:
+                pass
+            except Exception:
+                pass  # Fehler ist bereits im Status festgehalten
+
+        self._thread = threading.Thread(target=run, name="catalog-reload", daemon=True)
+        self._thread.start()
+
+    def _validate(self, collection, record_store: ProductRecordStore, summary: Dict[str, Any]) -> None:
+        """Prüft die neue Version, bevor sie aktiv wird"""
+        count = collection.count()
+        if count == 0 or count != summary["imported"]:
+            raise ValueError(f"Neue Collection enthält {count} statt {summary['imported']} Produkte")
+        if len(record_store) != count:
+            raise ValueError(f"{len(record_store)} Produktdatensätze für {count} Produkte")
+
+        # Stichprobe: ein Produkt muss über sein eigenes Embedding gefunden werden
+        sample = collection.get(limit=1, include=["embeddings"])
+        result = collection.query(query_embeddings=[list(sample["embeddings"][0])], n_results=1)
+        if result["ids"][0][:1] != sample["ids"][:1]:
+            raise ValueError("Stichprobensuche in der neuen Collection fehlgeschlagen")
+
+    def _drop_version(self, name: str) -> None:
+        """Löscht eine Collection-Version samt Datensatzdatei"""
+        try:
+            self.db_client.client.delete_collection(name=name)
+        except Exception as e:
+            logging.warning(f"Collection {name} konnte nicht gelöscht werden: {e}")
+        try:
+            os.remove(settings.DB_DIR / f"product_records_{name}.json")
+        except FileNotFoundError:
+            pass
+
+    def _cleanup_old_versions(self) -> None:
+        """Behält nur die neuesten CATALOG_KEEP_VERSIONS Versionen (für ein Rollback)"""
+        prefix = f"{settings.COLLECTION_NAME}_v"
+        names = sorted(
+            (getattr(collection, "name", collection) for collection in self.db_client.client.list_collections()),
+            reverse=True
+        )
+        versions = [name for name in names if name.startswith(prefix)]
+        active = (read_active_collection() or {}).get("collection")
+        for name in versions[max(settings.CATALOG_KEEP_VERSIONS, 1):]:
+            if name != active:
+                self._drop_version(name)
+                logging.info(f"Alte Collection-Version gelöscht: {name}")
+
+    def start_watcher(
+        self,
+        path: Path = settings.PRODUCT_DATA_PATH,
+        interval: float = settings.CATALOG_WATCH_INTERVAL_SECONDS
+    ) -> None:
+        """
+        Überwacht die CSV-Datei per Polling und startet bei Änderungen einen Reload.
+
+        Ein Reload wird erst ausgelöst, wenn Grösse und Änderungszeit über zwei Abfragen gleich
+        bleiben, damit keine halb geschriebene Datei importiert wird. Bei mehreren Workern überwacht
+        nur der Prozess, der die Sperrdatei hält; die anderen übernehmen die neue Version über
+        ChromaDBClient.sync_active_collection().
+        """
+        if self._watcher is not None or not self._acquire_watcher_lock():
+            return
+
+        def signature():
+            try:
+                stat = os.stat(path)
+                return stat.st_mtime, stat.st_size
+            except FileNotFoundError:
+                return None
+
+        def watch():
+            loaded = signature()
+            last = loaded
+            while not self._stop_watcher.wait(interval):
+                current = signature()
+                if current is not None and current == last and current != loaded and not self.running:
+                    logging.info(f"Änderung an {path} erkannt, lade Katalog neu")
+                    loaded = current
+                    try:
+                        self.reload(path)
+                    except Exception:
+                        pass  # Fehler ist bereits im Status festgehalten
+                last = current
+
+        self._stop_watcher.clear()
+        self._watcher = threading.Thread(target=watch, name="catalog-watcher", daemon=True)
+        self._watcher.start()
+        logging.info(f"Katalog-Überwachung gestartet: {path} (alle {interval}s)")
+
+    def _acquire_watcher_lock(self) -> bool:
+        """Sperrdatei für die Überwachung; False, wenn ein anderer Prozess sie bereits hält"""
+        if fcntl is None:
+            return True
+        settings.WATCHER_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(settings.WATCHER_LOCK_PATH, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logging.info("Katalog-Überwachung läuft bereits in einem anderen Prozess")
+            return False
+        # Offen halten; die Sperre endet mit stop_watcher() oder dem Prozess
+        self._watcher_lock_file = lock_file
+        return True
+
+    def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._stop_watcher.set()
+            self._watcher = None
+        if self._watcher_lock_file is not None:
+            self._watcher_lock_file.close()
+            self._watcher_lock_file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_collection": self.db_client.collection_name,
+            "running": self.running,
+            "watching": self._watcher is not None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last": self.status
+        }
@@ -1,9 +1,22 @@
+from src.config.config import settings
+from src.utils.intentRouter import IntentRouter
 from src.utils.llmService import LLMService
 from src.utils.productSearch import ProductSearch
+from src.utils.resultCache import create_recommendation_cache
+from src.utils.recommendationSelector import RecommendationSelector
+from src.services.catalogReloader import CatalogReloader
 
 # Erstelle Service-Instanzen als Singletons, um sie wiederzuverwenden
-llm_service = LLMService()  # Instanz des LLM-Dienstes
 product_search = ProductSearch()  # Instanz des Produktsuchdienstes
+# Absichtserkennung, ohne Regeltreffer optional über das Embedding-Modell der Suche
+intent_router = IntentRouter(embedder=product_search.text_analyzer.get_embedding if settings.INTENT_EMBEDDING_FALLBACK else None)
+llm_service = LLMService(intent_router=intent_router)  # Instanz des LLM-Dienstes
+# Blue/Green-Reload des Katalogs, teilt Datenbank-Client und Embedding-Modell mit der Suche
+catalog_reloader = CatalogReloader(product_search.db_client, product_search.text_analyzer.model)
+# Fertige Empfehlungen, gültig bis zum nächsten Import
+recommendation_cache = create_recommendation_cache()
+# Auswahl ohne LLM, wenn ein Produkt eindeutig am besten passt
+recommendation_selector = RecommendationSelector(llm_service)
 
 # Getter-Funktion fuer den LLM-Service (fuer Dependency Injection)
 def get_llm_service():
@@ -11,4 +24,16 @@ def get_llm_service():
 
 # Getter-Funktion fuer den Produktsuchdienst (fuer Dependency Injection)
 def get_product_search():
-    return product_search
\ No newline at end of file
+    return product_search
+
+# Getter-Funktion fuer den Katalog-Reload
+def get_catalog_reloader():
+    return catalog_reloader
+
+# Getter-Funktion fuer den Empfehlungs-Cache
+def get_recommendation_cache():
+    return recommendation_cache
+
+# Getter-Funktion fuer die Produktauswahl ohne LLM
+def get_recommendation_selector():
+    return recommendation_selector
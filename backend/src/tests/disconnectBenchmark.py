@@ -0,0 +1,72 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from contextlib import aclosing
+from src.utils.conversationStore import InMemoryConversationStore
+from src.utils.llmPool import create_llm_pool
+from src.utils.llmScheduler import LLMScheduler
+from src.utils.llmService import LLMService
+from src.tests.stubOllamaServer import StubOllamaServer
+# Benchmark: Ein Teil der Nutzer verlässt den Chat während der Antwort; läuft die Generierung weiter (bisher)
+# oder wird sie abgebrochen? Gemessen wird die Wartezeit der verbleibenden Nutzer und die erzeugten Tokens
+
+
+async def run_users(url: str, abandons: list, concurrency: int, abandon_after: float, cancel: bool):
+    pool = create_llm_pool(spec=url)
+    llm_service = LLMService(
+        pool=pool,
+        conversation_store=InMemoryConversationStore(),
+        scheduler=LLMScheduler(max_in_flight=concurrency, max_queue=len(abandons), deadline_seconds=3600)
+    )
+    latencies = []
+
+    async def user(index: int, abandons_early: bool):
+        start = time.perf_counter()
+        async with aclosing(llm_service.generate_response_stream(f"Frage {index}", session_id=f"s{index}")) as tokens:
+            async for _ in tokens:
+                if abandons_early and cancel and time.perf_counter() - start > abandon_after:
+                    return  # Verbindungsabbruch: Stream schliessen
+        if not abandons_early:
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(user(i, abandons_early) for i, abandons_early in enumerate(abandons)))
+    finally:
+        await pool.aclose()
+    return sorted(latencies), llm_service.scheduler.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Abbruch der Generierung bei Verbindungsabbruch des Clients")
+    parser.add_argument("--users", type=int, default=24, help="Gleichzeitige Nutzer")
+    parser.add_argument("--abandon-share", type=float, default=0.5, help="Anteil Nutzer, die vorzeitig gehen")
+    parser.add_argument("--abandon-after", type=float, default=0.3, help="Sekunden bis zum Verlassen")
+    parser.add_argument("--delay", type=float, default=1.5, help="Stub: Dauer einer vollständigen Antwort in Sekunden")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallele Generierungen")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    abandons = [rng.random() < args.abandon_share for _ in range(args.users)]
+    answer = " ".join(["token"] * 60)
+
+    print(f"{args.users} Nutzer, davon {sum(abandons)} nach {args.abandon_after:.1f}s weg, "
+          f"Antwort {args.delay:.1f}s, {args.concurrency} parallel")
+    print(f"{'Variante':<20}{'p50 (s)':>9}{'p95 (s)':>9}{'Tokens':>9}{'abgebrochen':>13}")
+    for name, cancel in (("weiter generieren", False), ("abbrechen", True)):
+        with StubOllamaServer(delay=args.delay, response_text=answer) as server:
+            latencies, stats = asyncio.run(run_users(server.url, abandons, args.concurrency, args.abandon_after, cancel))
+            time.sleep(0.2)  # Stub-Threads bemerken den Abbruch beim nächsten Schreiben
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+            print(f"{name:<20}{statistics.median(latencies):>9.2f}{p95:>9.2f}{server.tokens_sent:>9}{stats['aborted']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import threading
+import time
+from sentence_transformers import SentenceTransformer
+from src.utils.embeddingScheduler import EmbeddingBatcher
+# Lasttest: Durchsatz und p99-Latenz der Embedding-Berechnung mit und ohne Micro-Batching
+
+
+QUERIES = [
+    "laptop for developers", "monitor 27 zoll", "leichter Laptop für Reisen",
+    "Workstation für CAD", "Mac für Grafikdesign", "Linux Laptop mit viel RAM",
+    "günstiger Office Laptop", "Tablet für Präsentationen"
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(encode, clients: int, requests_per_client: int):
+    """Startet gleichzeitige Clients, die jeweils nacheinander Anfragen senden"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(client_id: int):
+        local = []
+        for i in range(requests_per_client):
+            # Eindeutiger Text je Anfrage, damit kein Cache-Effekt entsteht
+            text = f"{QUERIES[(client_id + i) % len(QUERIES)]} #{client_id}-{i}"
+            start = time.perf_counter()
+            encode(text)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest fuer Embedding-Micro-Batching")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64], help="Anzahl gleichzeitiger Clients")
+    parser.add_argument("--requests", type=int, default=20, help="Anfragen pro Client")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="Sammelfenster in Millisekunden")
+    parser.add_argument("--max-batch", type=int, default=32, help="Maximale Batchgrösse")
+    args = parser.parse_args()
+
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model.encode(QUERIES)  # Aufwärmen
+
+    batcher = EmbeddingBatcher(
+        lambda texts: model.encode(texts, batch_size=len(texts)),
+        max_batch_size=args.max_batch,
+        batch_window_ms=args.window_ms
+    )
+    unbatched = lambda text: model.encode(text).tolist()
+
+    print(f"{'Clients':>8}{'Modus':>12}{'Durchsatz (req/s)':>20}{'p99 (ms)':>12}")
+    for clients in args.clients:
+        for mode, encode in (("ungebatcht", unbatched), ("gebatcht", batcher.encode)):
+            throughput, p99 = run_load(encode, clients, args.requests)
+            print(f"{clients:>8}{mode:>12}{throughput:>20.1f}{p99:>12.1f}")
+    print(f"Batcher: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import itertools
+import json
+import time
+import uuid
+import chromadb
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from src.config.config import settings
+from src.database.chromadbClient import hnsw_metadata, max_batch_size
+from src.database.scripts.importData import read_csv_file, prepare_rows
+# Tuning: HNSW-Parameter (Metrik, M, construction_ef, search_ef) über einen gelabelten Anfragesatz
+# vergleichen; berichtet recall@k gegenüber den Labels und gegenüber der exakten Suche sowie die Latenz.
+
+
+LABELED_QUERIES_PATH = settings.DATA_DIR / "labeledQueries.json"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def add_distractors(ids, embeddings, count: int, seed: int = 42):
+    """Ergänzt verrauschte Kopien der Katalogvektoren, um einen grösseren Katalog zu simulieren"""
+    if count <= 0:
+        return ids, embeddings
+    rng = np.random.default_rng(seed)
+    base = embeddings[rng.integers(0, len(embeddings), count)]
+    noisy = base + 0.08 * rng.standard_normal(base.shape).astype(np.float32)
+    noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+    return ids + [f"distractor-{i}" for i in range(count)], np.vstack([embeddings, noisy])
+
+
+def label_recall(results, labels, k: int) -> float:
+    """Anteil der relevanten Produkte unter den ersten k Treffern (höchstens k erreichbar)"""
+    scores = [len(set(result[:k]) & set(relevant)) / min(len(relevant), k) for result, relevant in zip(results, labels)]
+    return float(np.mean(scores))
+
+
+def exact_recall(results, exact, k: int) -> float:
+    """Überschneidung mit der exakten Nächste-Nachbarn-Suche (Qualität der Approximation)"""
+    return float(np.mean([len(set(result[:k]) & set(truth[:k])) / k for result, truth in zip(results, exact)]))
+
+
+def evaluate(client, config, ids, embeddings, query_embeddings, labels, exact, k: int, repeats: int):
+    space, m, construction_ef, search_ef = config
+    name = f"tuning_{uuid.uuid4().hex[:8]}"
+    start = time.perf_counter()
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(space, construction_ef, search_ef, m))
+    chunk = max_batch_size(client)
+    for offset in range(0, len(ids), chunk):
+        collection.add(ids=ids[offset:offset + chunk], embeddings=embeddings[offset:offset + chunk].tolist())
+    build_seconds = time.perf_counter() - start
+
+    latencies, results = [], []
+    for repeat in range(repeats):
+        for query in query_embeddings:
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+            latencies.append(time.perf_counter() - start)
+            if repeat == 0:
+                results.append(result["ids"][0])
+    client.delete_collection(name=name)
+
+    return {
+        "space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef,
+        "build_s": build_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "recall_labels": label_recall(results, labels, k),
+        "recall_exact": exact_recall(results, exact, k)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW-Parameter über einen gelabelten Anfragesatz abstimmen")
+    parser.add_argument("--queries", type=Path, default=LABELED_QUERIES_PATH, help="JSON mit query/relevant")
+    parser.add_argument("--spaces", nargs="+", default=["cosine", "l2", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--distractors", type=int, default=0, help="Zusätzliche synthetische Produkte")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20, help="Wiederholungen für die Latenzmessung")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Mindest-recall gegenüber der exakten Suche")
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+    ids, documents, _, _ = prepare_rows(read_csv_file(settings.PRODUCT_DATA_PATH))
+
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    embeddings = np.asarray(model.encode(documents, batch_size=settings.IMPORT_ENCODE_BATCH_SIZE), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids, embeddings = add_distractors(ids, embeddings, args.distractors)
+    query_embeddings = np.asarray(model.encode([item["query"] for item in labeled]), dtype=np.float32)
+    query_embeddings /= np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+    labels = [item["relevant"] for item in labeled]
+
+    # Exakte Referenz per Brute Force (Kosinus; bei normalisierten Vektoren identisch für l2/ip)
+    exact = [[ids[i] for i in np.argsort(-(embeddings @ query))[:args.k]] for query in query_embeddings]
+    print(f"{len(ids)} Produkte, {len(labeled)} Anfragen; exakte Suche recall@{args.k} (Labels): {label_recall(exact, labels, args.k):.3f}")
+
+    client = chromadb.EphemeralClient()
+    rows = []
+    print(f"{'Metrik':>8}{'M':>5}{'c_ef':>6}{'s_ef':>6}{'Aufbau (s)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'recall Labels':>15}{'recall exakt':>14}")
+    for config in itertools.product(args.spaces, args.m, args.construction_ef, args.search_ef):
+        row = evaluate(client, config, ids, embeddings, query_embeddings, labels, exact, args.k, args.repeats)
+        rows.append(row)
+        print(f"{row['space']:>8}{row['M']:>5}{row['construction_ef']:>6}{row['search_ef']:>6}{row['build_s']:>12.2f}"
+              f"{row['p50_ms']:>10.3f}{row['p99_ms']:>10.3f}{row['recall_labels']:>15.3f}{row['recall_exact']:>14.3f}")
+
+    # Schnellste Konfiguration, die die Mindestqualität hält
+    eligible = [row for row in rows if row["recall_exact"] >= args.min_recall]
+    if not eligible:
+        print(f"\nKeine Konfiguration erreicht recall {args.min_recall} gegenüber der exakten Suche")
+        return
+    best = min(eligible, key=lambda row: row["p50_ms"])
+    print("\nEmpfohlene Einstellungen:")
+    print(f"APP_HNSW_SPACE={best['space']}")
+    print(f"APP_HNSW_M={best['M']}")
+    print(f"APP_HNSW_CONSTRUCTION_EF={best['construction_ef']}")
+    print(f"APP_HNSW_SEARCH_EF={best['search_ef']}")
+
+
+if __name__ == "__main__":
+    main()
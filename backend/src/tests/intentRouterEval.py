@@ -0,0 +1,88 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import json
+import timeit
+from collections import Counter
+from src.config.config import settings
+from src.utils.intentRouter import INTENTS, IntentRouter
+# Auswertung der Absichtserkennung auf einem gelabelten Anfragesatz: Genauigkeit je Absicht, Erkennung von
+# Bestellanfragen gegenüber der bisherigen Teilstring-Suche und Laufzeit pro Nachricht
+
+
+LABELED_INTENTS_PATH = settings.DATA_DIR / "labeledIntents.json"
+
+# Bisherige Schlüsselwörter aus LLMService._is_order_related_query
+LEGACY_ORDER_KEYWORDS = [
+    "order", "purchase", "buy", "get", "acquire", "request",
+    "availability", "stock", "place an order", "delivery",
+    "shipping", "lead time", "bestellen", "kaufen", "erwerben",
+    "verfügbarkeit", "lieferung", "bestellung", "einkaufen",
+    "where can i get", "wie kann ich kaufen", "wie bestelle ich"
+]
+
+
+def legacy_is_order(message: str) -> bool:
+    lower_message = message.lower()
+    return any(keyword in lower_message for keyword in LEGACY_ORDER_KEYWORDS)
+
+
+def order_scores(labels: list, predicted: list) -> tuple:
+    """Precision und Recall der Erkennung von Bestellanfragen"""
+    true_positive = sum(1 for label, guess in zip(labels, predicted) if label and guess)
+    precision = true_positive / max(sum(predicted), 1)
+    recall = true_positive / max(sum(labels), 1)
+    return precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Absichtserkennung auf einem gelabelten Anfragesatz auswerten")
+    parser.add_argument("--queries", type=Path, default=LABELED_INTENTS_PATH, help="JSON mit query/intent")
+    parser.add_argument("--embeddings", action="store_true", help="Zentroid-Rückfall mit dem Embedding-Modell auswerten")
+    parser.add_argument("--iterations", type=int, default=2000, help="Durchläufe für die Zeitmessung")
+    parser.add_argument("--errors", action="store_true", help="Falsch erkannte Anfragen ausgeben")
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+    queries = [entry["query"] for entry in labeled]
+    labels = [entry["intent"] for entry in labeled]
+
+    variants = {"Regeln": IntentRouter()}
+    if args.embeddings:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+        variants["Regeln + Zentroid"] = IntentRouter(embedder=lambda text: model.encode(text).tolist())
+
+    print(f"{len(labeled)} Anfragen: " + ", ".join(f"{intent} {count}" for intent, count in Counter(labels).items()))
+    print(f"{'Variante':<20}{'Genauigkeit':>12}" + "".join(f"{intent[:16]:>18}" for intent in INTENTS))
+    for name, router in variants.items():
+        predicted = [router.classify(query)[0] for query in queries]
+        accuracy = sum(guess == label for guess, label in zip(predicted, labels)) / len(labels)
+        per_intent = []
+        for intent in INTENTS:
+            hits = [guess == label for guess, label in zip(predicted, labels) if label == intent]
+            per_intent.append(f"{sum(hits)}/{len(hits)}")
+        print(f"{name:<20}{accuracy:>12.1%}" + "".join(f"{cell:>18}" for cell in per_intent))
+        if args.errors:
+            for query, label, guess in zip(queries, labels, predicted):
+                if guess != label:
+                    print(f"    {label:>18} -> {guess:<18} {query}")
+
+    # Bestellanfragen: bisherige Teilstring-Suche gegenüber den Regeln mit Wortgrenzen
+    router = variants["Regeln"]
+    is_order = [label == "orderInstructions" for label in labels]
+    print()
+    print(f"{'Bestellanfragen':<20}{'Precision':>12}{'Recall':>10}{'µs/Nachricht':>15}")
+    for name, detect in (("Teilstring (alt)", legacy_is_order), ("Regeln", lambda query: router.match(query) == "orderInstructions")):
+        precision, recall = order_scores(is_order, [detect(query) for query in queries])
+        seconds = timeit.timeit(lambda: [detect(query) for query in queries], number=args.iterations)
+        print(f"{name:<20}{precision:>12.1%}{recall:>10.1%}{seconds / (args.iterations * len(queries)) * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from src.config.config import settings
+from src.utils.conversationStore import InMemoryConversationStore
+from src.utils.httpClient import AsyncHTTPClient
+from src.utils.llmPool import create_llm_pool
+from src.utils.llmScheduler import LLMScheduler, LLMOverloadedError
+from src.utils.llmService import LLMService
+from src.tests.stubOllamaServer import StubOllamaServer
+# Benchmark: Lastspitze aus Chat- und Empfehlungsanfragen gegen einen Stub-Ollama-Server, unbegrenzte
+# Warteschlange gegenüber Zulassungskontrolle mit Prioritäten, Frist und Lastabwurf
+
+
+async def timed_request(llm_service: LLMService, index: int, priority: str, results: dict):
+    start = time.perf_counter()
+    try:
+        result = await llm_service.generate_response(f"Frage {index}", session_id=f"s{index}", priority=priority)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        results[priority].append(time.perf_counter() - start)
+    except LLMOverloadedError as e:
+        results[f"{priority}_{e.status_code}"] = results.get(f"{priority}_{e.status_code}", 0) + 1
+
+
+async def run_burst(url: str, priorities: list, scheduler: LLMScheduler, spread: float) -> dict:
+    http_client = AsyncHTTPClient(max_concurrency=scheduler.max_in_flight)
+    llm_service = LLMService(
+        pool=create_llm_pool(http_client, spec=url), conversation_store=InMemoryConversationStore(), scheduler=scheduler
+    )
+    results = {"interactive": [], "recommendation": []}
+
+    async def delayed(index: int, priority: str):
+        await asyncio.sleep(spread * index / len(priorities))  # Anfragen über das Zeitfenster verteilen
+        await timed_request(llm_service, index, priority, results)
+
+    try:
+        await asyncio.gather(*(delayed(i, priority) for i, priority in enumerate(priorities)))
+    finally:
+        await http_client.aclose()
+    return results
+
+
+def summarize(name: str, results: dict):
+    for priority in ("interactive", "recommendation"):
+        latencies = sorted(results[priority])
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        refused = ", ".join(f"{code}: {results.get(f'{priority}_{code}', 0)}" for code in (429, 503))
+        print(f"{name:<12}{priority:<16}{len(latencies):>8}{p50:>10.2f}{p95:>10.2f}   abgelehnt ({refused})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lastspitze mit und ohne Zulassungskontrolle für LLM-Anfragen")
+    parser.add_argument("--requests", type=int, default=120, help="Anzahl Anfragen der Lastspitze")
+    parser.add_argument("--spread", type=float, default=2.0, help="Zeitfenster der Lastspitze in Sekunden")
+    parser.add_argument("--delay", type=float, default=0.3, help="Stub: Generierungszeit in Sekunden")
+    parser.add_argument("--share", type=float, default=0.4, help="Anteil der Empfehlungsanfragen")
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY, help="Parallele Generierungen")
+    parser.add_argument("--deadline", type=float, default=3.0, help="Frist für die Wartezeit in Sekunden")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    priorities = ["recommendation" if rng.random() < args.share else "interactive" for _ in range(args.requests)]
+
+    with StubOllamaServer(delay=args.delay) as server:
+        unbounded = LLMScheduler(max_in_flight=args.concurrency, max_queue=args.requests, deadline_seconds=3600, low_priority_share=1.0)
+        controlled = LLMScheduler(max_in_flight=args.concurrency, deadline_seconds=args.deadline)
+        controlled._service_time = args.delay  # Wie nach einer Aufwärmphase
+        baseline = asyncio.run(run_burst(server.url, priorities, unbounded, args.spread))
+        admitted = asyncio.run(run_burst(server.url, priorities, controlled, args.spread))
+
+    print(f"{args.requests} Anfragen in {args.spread:.1f}s, Generierung {args.delay:.2f}s, "
+          f"{args.concurrency} parallel, Frist {args.deadline:.1f}s, Warteschlange {controlled.max_queue}")
+    print(f"{'Variante':<12}{'Priorität':<16}{'bedient':>8}{'p50 (s)':>10}{'p95 (s)':>10}")
+    summarize("unbegrenzt", baseline)
+    summarize("Zulassung", admitted)
+
+
+if __name__ == "__main__":
+    main()
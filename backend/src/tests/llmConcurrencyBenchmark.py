@@ -0,0 +1,76 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import asyncio
+import time
+import requests
+from src.utils.httpClient import AsyncHTTPClient
+from src.utils.llmPool import create_llm_pool
+from src.utils.llmScheduler import LLMScheduler
+from src.utils.llmService import LLMService
+from src.tests.stubOllamaServer import StubOllamaServer
+# Benchmark: Laufen viele gleichzeitige Chats gegen einen Stub-Ollama-Server parallel oder nacheinander?
+
+
+async def blocking_chat(url: str, message: str) -> float:
+    """Bisheriges Verhalten: synchrones requests.post blockiert den Event-Loop"""
+    start = time.perf_counter()
+    requests.post(url, json={"model": "stub", "prompt": message, "stream": False})
+    return time.perf_counter() - start
+
+
+async def pooled_chat(llm_service: LLMService, message: str) -> float:
+    """Neues Verhalten: asynchroner Aufruf ueber den gemeinsamen Verbindungspool"""
+    start = time.perf_counter()
+    result = await llm_service.generate_response(message)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return time.perf_counter() - start
+
+
+async def run_blocking(url: str, requests_count: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(blocking_chat(url, f"Frage {i}") for i in range(requests_count)))
+    return time.perf_counter() - start
+
+
+async def run_pooled(url: str, requests_count: int, concurrency: int) -> float:
+    http_client = AsyncHTTPClient(max_concurrency=concurrency)
+    llm_service = LLMService(
+        pool=create_llm_pool(http_client, spec=url),
+        scheduler=LLMScheduler(max_in_flight=concurrency, max_queue=requests_count)
+    )
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(pooled_chat(llm_service, f"Frage {i}") for i in range(requests_count)))
+        return time.perf_counter() - start
+    finally:
+        await http_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nebenlaeufigkeits-Benchmark fuer LLMService")
+    parser.add_argument("--requests", type=int, default=20, help="Anzahl gleichzeitiger Chats")
+    parser.add_argument("--delay", type=float, default=0.5, help="Simulierte Generierungszeit in Sekunden")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximale parallele LLM-Anfragen")
+    args = parser.parse_args()
+
+    with StubOllamaServer(delay=args.delay) as server:
+        sequential = args.requests * args.delay
+        blocking = asyncio.run(run_blocking(server.url, args.requests))
+        pooled = asyncio.run(run_pooled(server.url, args.requests, args.concurrency))
+
+        print(f"Chats: {args.requests}, Generierungszeit: {args.delay:.2f}s, Parallelitaetsgrenze: {args.concurrency}")
+        print(f"Theoretisch sequentiell:      {sequential:.2f}s")
+        print(f"Blockierend (requests.post):  {blocking:.2f}s")
+        print(f"Asynchron mit Pool (httpx):   {pooled:.2f}s")
+        print(f"Ueberlappungsfaktor:          {blocking / pooled:.1f}x")
+        print(f"Anfragen am Stub-Server:      {server.request_count}")
+
+
+if __name__ == "__main__":
+    main()
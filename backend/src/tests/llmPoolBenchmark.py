@@ -0,0 +1,103 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from src.config.config import settings
+from src.utils.conversationStore import InMemoryConversationStore
+from src.utils.llmPool import create_llm_pool
+from src.utils.llmScheduler import LLMScheduler
+from src.utils.llmService import LLMService
+from src.tests.stubOllamaServer import StubOllamaServer
+# Benchmark: Verteilung auf mehrere Stub-Ollama-Server (zwei grosse Modelle, davon eines langsamer, und ein
+# kleines Modell) gegenüber einem einzelnen Backend, danach Ausfall eines Backends während der Last
+
+
+SHORT_MESSAGE = "Thanks, that helps!"
+LONG_MESSAGE = "I am looking for a laptop for data analysis with Python and Excel. " * 4
+
+
+async def run_load(spec: str, messages: list, spread: float, routing: str, fail_server=None, fail_after: float = None):
+    settings.LLM_ROUTING = routing
+    pool = create_llm_pool(spec=spec)
+    # Warteschlange ohne Lastabwurf, damit nur die Verteilung verglichen wird
+    scheduler = LLMScheduler(
+        max_in_flight=settings.LLM_MAX_CONCURRENCY * len(pool.backends), max_queue=len(messages), deadline_seconds=3600
+    )
+    llm_service = LLMService(pool=pool, conversation_store=InMemoryConversationStore(), scheduler=scheduler)
+    latencies, errors = [], 0
+
+    async def one(index: int, message: str):
+        nonlocal errors
+        await asyncio.sleep(spread * index / len(messages))
+        start = time.perf_counter()
+        result = await llm_service.generate_response(message, session_id=f"s{index}")
+        if "error" in result:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+
+    async def fail_later():
+        await asyncio.sleep(fail_after)
+        fail_server.failing = True
+        await pool.check_health()  # Sonst erst beim nächsten periodischen Health-Check
+
+    start = time.perf_counter()
+    tasks = [one(i, message) for i, message in enumerate(messages)]
+    if fail_server is not None:
+        tasks.append(fail_later())
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await pool.aclose()
+        if fail_server is not None:
+            fail_server.failing = False
+    return time.perf_counter() - start, sorted(latencies), errors, pool.stats()
+
+
+def report(name: str, total: float, latencies: list, errors: int, stats: dict):
+    p50 = statistics.median(latencies) if latencies else 0.0
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    spread = ", ".join(
+        f"{backend['tier']}:{backend['requests']}" + (f" ({backend['state']}, {backend['trips']}x getrennt)" if backend["trips"] else "")
+        for backend in stats["backends"]
+    )
+    print(f"{name:<22}{total:>8.2f}{p50:>9.2f}{p95:>9.2f}{errors:>8}{stats['failovers']:>11}   {spread}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lastverteilung und Umschalten bei Ausfall über mehrere LLM-Backends")
+    parser.add_argument("--requests", type=int, default=80, help="Anzahl Anfragen")
+    parser.add_argument("--spread", type=float, default=2.0, help="Zeitfenster der Anfragen in Sekunden")
+    parser.add_argument("--delay", type=float, default=0.4, help="Generierungszeit des grossen Modells in Sekunden")
+    parser.add_argument("--short-share", type=float, default=0.5, help="Anteil kurzer Nachrichten (kleines Modell)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    messages = [SHORT_MESSAGE if rng.random() < args.short_share else LONG_MESSAGE for _ in range(args.requests)]
+
+    with StubOllamaServer(delay=args.delay) as large_a, \
+            StubOllamaServer(delay=args.delay * 2) as large_b, \
+            StubOllamaServer(delay=args.delay / 4) as small:
+        single = f"{large_a.url}|large-model|large"
+        pool = f"{single},{large_b.url}|large-model|large,{small.url}|small-model|small"
+
+        print(f"{args.requests} Anfragen in {args.spread:.1f}s, grosses Modell {args.delay:.2f}s "
+              f"(zweiter Server {args.delay * 2:.2f}s), kleines Modell {args.delay / 4:.2f}s")
+        print(f"{'Variante':<22}{'Summe':>8}{'p50 (s)':>9}{'p95 (s)':>9}{'Fehler':>8}{'Umschalten':>11}   Anfragen je Backend")
+        report("einzelnes Backend", *asyncio.run(run_load(single, messages, args.spread, "least_outstanding")))
+        report("least_outstanding", *asyncio.run(run_load(pool, messages, args.spread, "least_outstanding")))
+        report("latency", *asyncio.run(run_load(pool, messages, args.spread, "latency")))
+        report("latency, Ausfall", *asyncio.run(
+            run_load(pool, messages, args.spread, "latency", fail_server=large_a, fail_after=args.spread / 2)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import asyncio
+import statistics
+import time
+from src.config.config import settings
+from src.utils.conversationStore import InMemoryConversationStore
+from src.utils.httpClient import AsyncHTTPClient
+from src.utils.llmPool import create_llm_pool
+from src.utils.llmService import LLMService
+from src.utils.promptBuilder import PromptBuilder, estimate_tokens
+from src.tests.stubOllamaServer import StubOllamaServer
+# Benchmark: Promptlänge und Latenz über ein 30-Runden-Gespräch, bisheriger Verlauf (letzte 4 Einträge)
+# gegenüber dem Token-Budget mit fortlaufender Zusammenfassung
+
+
+SPEC_SHEET = (
+    "Here is the spec sheet from the vendor: Lenovo ThinkPad P16s Gen 2, Intel Core i7-1370P, 32 GB LPDDR5x-6400, "
+    "1 TB PCIe Gen4 SSD, NVIDIA RTX A500 4 GB, 16 inch WUXGA IPS 400 nits, Wi-Fi 6E, Bluetooth 5.3, "
+    "2x Thunderbolt 4, 1x USB-A 3.2, HDMI 2.1, 57 Wh battery, 1.77 kg, Windows 11 Pro, MIL-STD-810H tested. "
+) * 8
+
+# Vorgegebener Gesprächsverlauf: kurze Folgefragen, dazwischen eingefügte lange Produktbeschreibungen
+SCRIPT = [
+    "I need a new laptop for work.",
+    "Mostly Excel, Teams and some Python scripts.",
+    "Budget is around 1500 CHF.",
+    "Is 16 GB RAM enough?",
+    "What about battery life?",
+    "Do you have anything lighter than 1.5 kg?",
+    SPEC_SHEET + "Would this one work for me?",
+    "Which one is cheaper?",
+    "Can I connect two external monitors?",
+    "What docking station fits?",
+    "Does it support Linux?",
+    "I also need a monitor.",
+    "27 inch, for spreadsheets.",
+    "Is USB-C power delivery important?",
+    SPEC_SHEET + "How does this compare to the first laptop?",
+    "What about warranty?",
+    "Can I get a privacy filter?",
+    "Which keyboard layout is available?",
+    "Swiss German please.",
+    "How long is the delivery?",
+    "Do I need approval from my manager?",
+    "What is the qualification level of the laptop?",
+    "Could a developer use it for Docker?",
+    "Would 32 GB make a difference?",
+    "Summarize what we discussed so far.",
+    "Which laptop do you recommend in the end?",
+    "And which monitor?",
+    "How do I order both?",
+    "Can I order a headset too?",
+    "Thanks, that's all."
+]
+
+
+# Die Vorlage für Produktfragen enthält den Gesprächsverlauf (die allgemeine nicht)
+PRODUCT = {
+    "header": {"manufacturer": "Lenovo", "model": "Thinkpad T 14s", "type": "Laptop", "price": 900},
+    "specifications": {"system": {"ram": "16GB", "cpu": "Intel Core i7", "storage": "512GB SSD"}, "os": "Win11"},
+    "target_audience": {"users": ["Office workers"], "ideal_for": ["Office"], "not_recommended": []},
+    "link": "https://www.google.com/"
+}
+
+
+class RecordingLLMService(LLMService):
+    """Merkt sich den zuletzt gesendeten Prompt"""
+
+    async def _complete(self, full_prompt, *args, **kwargs):
+        self.last_prompt = full_prompt
+        return await super()._complete(full_prompt, *args, **kwargs)
+
+
+async def run_conversation(url: str, budget: int):
+    http_client = AsyncHTTPClient()
+    llm_service = RecordingLLMService(pool=create_llm_pool(http_client, spec=url), conversation_store=InMemoryConversationStore())
+    llm_service.prompt_builder = PromptBuilder(budget=budget)
+    rows = []
+    try:
+        for message in SCRIPT:
+            start = time.perf_counter()
+            result = await llm_service.generate_response(
+                message, role_type="product_specific", context={"product": PRODUCT}, session_id="benchmark"
+            )
+            latency = time.perf_counter() - start
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            rows.append((len(llm_service.last_prompt), estimate_tokens(llm_service.last_prompt), latency))
+    finally:
+        await http_client.aclose()
+    return rows
+
+
+def summarize(name: str, rows):
+    chars = [row[0] for row in rows]
+    tokens = [row[1] for row in rows]
+    latencies = [row[2] for row in rows]
+    print(f"{name:<14}{statistics.mean(tokens):>14.0f}{max(tokens):>12}{statistics.mean(chars):>14.0f}"
+          f"{statistics.median(latencies) * 1000:>12.1f}{max(latencies) * 1000:>12.1f}{sum(latencies):>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Promptlänge und Latenz über ein 30-Runden-Gespräch")
+    parser.add_argument("--url", help="Ollama-URL (/api/generate); ohne Angabe ein lokaler Stub-Server")
+    parser.add_argument("--budget", type=int, default=settings.PROMPT_TOKEN_BUDGET, help="Token-Budget des Prompts")
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub: feste Generierungszeit in Sekunden")
+    parser.add_argument("--prompt-delay", type=float, default=0.02, help="Stub: Sekunden Prompt-Auswertung pro 1000 Zeichen")
+    parser.add_argument("--per-turn", action="store_true", help="Werte jeder Runde ausgeben")
+    args = parser.parse_args()
+
+    # Kontext-Wiederverwendung würde die Promptlänge der Folgefragen verdecken
+    settings.LLM_CONTEXT_REUSE = False
+    answer = "Sure. " + "That model has a good balance of performance, weight and battery life for office work. " * 4
+
+    if args.url:
+        legacy = asyncio.run(run_conversation(args.url, 0))
+        budgeted = asyncio.run(run_conversation(args.url, args.budget))
+    else:
+        with StubOllamaServer(delay=args.delay, response_text=answer, prompt_delay_per_kchar=args.prompt_delay) as server:
+            legacy = asyncio.run(run_conversation(server.url, 0))
+            budgeted = asyncio.run(run_conversation(server.url, args.budget))
+
+    if args.per_turn:
+        print(f"{'Runde':>6}{'Tokens (alt)':>14}{'Tokens (Budget)':>17}{'ms (alt)':>10}{'ms (Budget)':>13}")
+        for turn, (old, new) in enumerate(zip(legacy, budgeted), 1):
+            print(f"{turn:>6}{old[1]:>14}{new[1]:>17}{old[2] * 1000:>10.1f}{new[2] * 1000:>13.1f}")
+        print()
+
+    print(f"{len(SCRIPT)} Runden, Budget {args.budget} Tokens ({settings.PROMPT_CHARS_PER_TOKEN} Zeichen/Token)")
+    print(f"{'Variante':<14}{'Tokens Ø':>14}{'Tokens max':>12}{'Zeichen Ø':>14}{'p50 (ms)':>12}{'max (ms)':>12}{'Summe (s)':>12}")
+    summarize("letzte 4", legacy)
+    summarize("Budget", budgeted)
+
+
+if __name__ == "__main__":
+    main()
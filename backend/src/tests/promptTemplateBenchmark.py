@@ -0,0 +1,77 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import timeit
+from jinja2 import Template
+from src.utils.llmService import LLMService
+# Micro-Benchmark: _get_prompt mit kompiliertem Vorlagen-Cache gegenüber Template(...) pro Anfrage
+
+
+class LegacyLLMService(LLMService):
+    """Bisheriges Verhalten: Vorlagenquelle bei jeder Anfrage neu parsen und kompilieren"""
+
+    def _initialize_templates(self):
+        super()._initialize_templates()
+        self.template_sources = {
+            name: (self.template_dir / file_name).read_text(encoding="utf-8")
+            for name, file_name in self.template_files.items()
+        }
+
+    def _render_template(self, template_name, context):
+        template = self.template_sources.get(template_name, self.template_sources["general"])
+        return Template(template).render(**context)
+
+
+SAMPLE_PRODUCT = {
+    "header": {"manufacturer": "Lenovo", "model": "Thinkpad T 14s", "type": "Laptop", "price": 900},
+    "specifications": {"system": {"ram": "16GB", "cpu": "Intel Core i7", "storage": "512GB SSD"}, "os": "Win11"},
+    "target_audience": {"users": ["Office workers"], "ideal_for": ["Office"], "not_recommended": []},
+    "link": "https://www.google.com/"
+}
+
+HISTORY = [
+    {"type": "user", "content": "Ich brauche einen Laptop"},
+    {"type": "assistant", "content": "Gerne, wofür möchten Sie ihn verwenden?"}
+]
+
+# (Rollentyp, Nachricht, Kontext) pro Vorlage
+CASES = {
+    "general": ("general", "Was ist der Unterschied zwischen HDD und SSD?", lambda: {}),
+    "productSpecific": ("product_specific", "Wie viel RAM hat das Gerät?", lambda: {"product": SAMPLE_PRODUCT}),
+    "productRecommendation": ("recommendation", "Which product would you recommend?", lambda: {
+        "user_requirements": "Laptop für Entwickler",
+        "available_products": "Product 0: Lenovo Thinkpad T 14s - 16GB, Intel Core i7, 512GB SSD | 900€, Laptop",
+        "single_product": True
+    }),
+    "orderInstructions": ("product_specific", "How can I order this product?", lambda: {"product": SAMPLE_PRODUCT, "history": list(HISTORY)}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-Benchmark fuer _get_prompt")
+    parser.add_argument("--iterations", type=int, default=2000, help="Aufrufe pro Rollentyp")
+    args = parser.parse_args()
+
+    cached = LLMService()
+    legacy = LegacyLLMService()
+
+    print(f"{'Vorlage':<24}{'pro Anfrage (alt)':>20}{'pro Anfrage (Cache)':>22}{'Faktor':>10}")
+    for name, (role_type, message, make_context) in CASES.items():
+        # Beide Varianten müssen denselben Prompt erzeugen
+        assert cached._get_prompt(role_type, message, make_context(), HISTORY) == \
+            legacy._get_prompt(role_type, message, make_context(), HISTORY)
+
+        legacy_time = timeit.timeit(lambda: legacy._get_prompt(role_type, message, make_context(), HISTORY), number=args.iterations)
+        cached_time = timeit.timeit(lambda: cached._get_prompt(role_type, message, make_context(), HISTORY), number=args.iterations)
+
+        legacy_us = legacy_time / args.iterations * 1e6
+        cached_us = cached_time / args.iterations * 1e6
+        print(f"{name:<24}{legacy_us:>17.1f} µs{cached_us:>19.1f} µs{legacy_us / cached_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
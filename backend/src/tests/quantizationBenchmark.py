@@ -0,0 +1,76 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import time
+import numpy as np
+from src.database.vectorStore import NumpyVectorIndex
+# Bericht: recall@k, Speicherbedarf und Latenz der int8-Quantisierung gegenüber der float32-Suche
+
+
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+
+
+def clustered_embeddings(size: int, clusters: int = 50, spread: float = 0.35, seed: int = 42) -> np.ndarray:
+    """Embeddings um wenige Zentren verteilt, ähnlich wie Produkte derselben Kategorie"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSIONS)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size)
+    embeddings = centers[assignment] + spread * rng.standard_normal((size, DIMENSIONS)).astype(np.float32)
+    return NumpyVectorIndex.normalize(embeddings)
+
+
+def measure(index: NumpyVectorIndex, queries: np.ndarray, k: int):
+    """Top-k je Anfrage und mittlere Latenz in ms"""
+    results, latencies = [], []
+    index.search_batch(queries[:1], k)  # Aufwärmen
+    for query in queries:
+        start = time.perf_counter()
+        result = index.search_batch(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        results.append(result["ids"][0])
+    return results, float(np.median(latencies) * 1000)
+
+
+def recall(exact, approximate) -> float:
+    hits = sum(len(set(a) & set(e)) for e, a in zip(exact, approximate))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="recall@k vs. Speicher und Latenz der int8-Quantisierung")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Kataloggrössen")
+    parser.add_argument("--queries", type=int, default=100, help="Anzahl Anfragen")
+    parser.add_argument("--k", type=int, default=5, help="Anzahl Treffer (recall@k)")
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[1, 2, 4, 10], help="Kandidaten je Treffer für die float32-Nachsortierung")
+    args = parser.parse_args()
+
+    print(f"{'Produkte':>9}{'Variante':>18}{'recall@' + str(args.k):>11}{'Speicher (MB)':>15}{'p50 (ms)':>10}")
+    for size in args.sizes:
+        embeddings = clustered_embeddings(size)
+        ids = [str(i) for i in range(size)]
+        metadatas = [{} for _ in range(size)]
+        # Anfragen: leicht verrauschte Katalogvektoren
+        rng = np.random.default_rng(7)
+        queries = NumpyVectorIndex.normalize(
+            embeddings[rng.integers(0, size, args.queries)] + 0.5 * rng.standard_normal((args.queries, DIMENSIONS)).astype(np.float32) / np.sqrt(DIMENSIONS)
+        )
+
+        full = NumpyVectorIndex(ids, embeddings, metadatas)
+        exact, latency = measure(full, queries, args.k)
+        print(f"{size:>9}{'float32':>18}{1.0:>11.3f}{full.nbytes / 2**20:>15.2f}{latency:>10.3f}")
+
+        quantized = NumpyVectorIndex.quantize(embeddings)
+        for factor in args.rerank_factors:
+            index = NumpyVectorIndex(ids, embeddings, metadatas, quantized=quantized, rerank_factor=factor)
+            approximate, latency = measure(index, queries, args.k)
+            # Faktor 1: Treffermenge allein aus der int8-Rangfolge
+            label = "int8" if factor == 1 else f"int8 + rerank x{factor}"
+            print(f"{size:>9}{label:>18}{recall(exact, approximate):>11.3f}{index.nbytes / 2**20:>15.2f}{latency:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
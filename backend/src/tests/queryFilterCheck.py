@@ -0,0 +1,52 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import json
+from collections import Counter
+from types import SimpleNamespace
+from src.config.config import settings
+from src.database.catalogIndex import FACET_FIELDS
+from src.database.scripts.importData import read_csv_file, prepare_rows
+from src.utils.queryFilters import QueryFilterBuilder
+# Prüfung der Filtererkennung: gelabelte Anfragen mit erwarteten Preisgrenzen und Kategoriefiltern
+# (Zoll, GB, kg usw. sind keine Preise, Markennamen wie "Apple" kein Betriebssystem)
+
+
+LABELED_QUERY_FILTERS_PATH = settings.DATA_DIR / "labeledQueryFilters.json"
+
+
+def catalog_facets(csv_path: Path) -> dict:
+    """Facetten (Wert -> Anzahl) wie im CatalogIndex, direkt aus der Produkt-CSV"""
+    _, _, metadatas, _ = prepare_rows(read_csv_file(csv_path))
+    return {field: dict(Counter(metadata[field] for metadata in metadatas if metadata.get(field))) for field in FACET_FIELDS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erkannte Filter gelabelter Anfragen vergleichen")
+    parser.add_argument("--queries", type=Path, default=LABELED_QUERY_FILTERS_PATH, help="JSON mit query und erwarteten Filtern")
+    parser.add_argument("--csv", type=Path, default=settings.PRODUCT_DATA_PATH, help="Produkt-CSV für die Katalogwerte")
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+    builder = QueryFilterBuilder(SimpleNamespace(facets=catalog_facets(args.csv)))
+
+    failures = 0
+    for entry in labeled:
+        expected = {key: float(value) if key.endswith("_price") else value for key, value in entry.items() if key != "query"}
+        extracted = builder.extract(entry["query"])
+        if extracted != expected:
+            failures += 1
+            print(f"FEHLER  {entry['query']!r}: erwartet {expected}, erkannt {extracted}")
+
+    with_price = sum(1 for entry in labeled if "min_price" in entry or "max_price" in entry)
+    print(f"{len(labeled) - failures}/{len(labeled)} korrekt ({with_price} mit Preis, {len(labeled) - with_price} ohne)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
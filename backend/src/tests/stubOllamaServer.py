@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lokaler Stub-Server, der die Ollama-API /api/generate mit einer festen Verzoegerung nachbildet
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive-Verbindungen erlauben
+
+    def do_GET(self):
+        # Health-Check wie Ollama /api/tags
+        if self.server.failing:
+            self._send_error()
+            return
+        body = json.dumps({"models": [{"name": "stub"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.request_count += 1
+
+        if self.server.failing:
+            self._send_error()
+            return
+
+        if payload.get("stream"):
+            self._send_stream(payload)
+            return
+
+        # Generierungszeit simulieren (zusätzlich Prompt-Auswertung proportional zur Promptlänge)
+        time.sleep(self.server.delay + len(payload.get("prompt", "")) / 1000 * self.server.prompt_delay_per_kchar)
+
+        body = json.dumps({
+            "model": payload.get("model", "stub"),
+            "response": self.server.response_text,
+            "done": True
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, payload):
+        """NDJSON-Stream wie bei Ollama: ein JSON-Objekt pro Token, zuletzt done=true"""
+        tokens = self.server.response_text.split(" ")
+        token_delay = self.server.delay / max(len(tokens), 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for i, token in enumerate(tokens):
+                time.sleep(token_delay)
+                text = token if i == 0 else f" {token}"
+                self._write_chunk(json.dumps({"model": payload.get("model", "stub"), "response": text, "done": False}) + "\n")
+                self.server.tokens_sent += 1
+            self._write_chunk(json.dumps({"model": payload.get("model", "stub"), "response": "", "done": True}) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hat die Verbindung geschlossen: wie Ollama die Generierung beenden
+            self.server.aborted += 1
+            self.close_connection = True
+
+    def _send_error(self):
+        """Ausgefallenes Backend nachbilden (z.B. Modell entladen, GPU-Fehler)"""
+        body = json.dumps({"error": "stub backend failing"}).encode("utf-8")
+        self.send_response(500)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: str):
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):X}\r\n".encode("ascii") + encoded + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Keine Zugriffslogs auf der Konsole
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128  # Grosser Backlog, damit viele gleichzeitige Verbindungen nicht warten
+    daemon_threads = True
+
+
+class StubOllamaServer:
+    """Startet einen Stub-Ollama-Server in einem Hintergrund-Thread"""
+
+    def __init__(self, delay: float = 0.5, response_text: str = "Stub-Antwort", port: int = 0, prompt_delay_per_kchar: float = 0.0):
+        self.httpd = _StubHTTPServer(("127.0.0.1", port), StubOllamaHandler)
+        self.httpd.delay = delay
+        self.httpd.prompt_delay_per_kchar = prompt_delay_per_kchar
+        self.httpd.response_text = response_text
+        self.httpd.request_count = 0
+        self.httpd.failing = False  # True: alle Anfragen mit 500 beantworten
+        self.httpd.aborted = 0  # Streams, die der Client vor dem Ende geschlossen hat
+        self.httpd.tokens_sent = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def aborted(self) -> int:
+        return self.httpd.aborted
+
+    @property
+    def tokens_sent(self) -> int:
+        return self.httpd.tokens_sent
+
+    @property
+    def failing(self) -> bool:
+        return self.httpd.failing
+
+    @failing.setter
+    def failing(self, value: bool):
+        self.httpd.failing = value
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
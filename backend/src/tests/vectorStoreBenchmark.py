@@ -0,0 +1,136 @@
+from pathlib import Path
+import sys
+# Projektroot zum Python-Pfad hinzufügen
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+import numpy as np
+# Benchmark: Latenz und Speicherbedarf (RSS) der Vektorsuche mit ChromaDB und der NumPy-Matrix
+# Jede Messung läuft in einem eigenen Prozess, damit der RSS nicht vom Aufbau der Daten verfälscht wird.
+
+
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+TYPES = ["Laptop", "Monitor", "Desktop", "Tablet"]
+MANUFACTURERS = ["Lenovo", "Dell", "HP", "Apple", "Microsoft"]
+FILTER = {"$and": [{"type": {"$in": ["Laptop"]}}, {"price_chf": {"$lte": 1500.0}}]}
+
+
+def synthetic_catalog(size: int, seed: int = 42):
+    """Zufällige, normalisierte Embeddings mit einfachen Metadaten"""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((size, DIMENSIONS)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    metadatas = [
+        {
+            "type": TYPES[i % len(TYPES)],
+            "manufacturer": MANUFACTURERS[i % len(MANUFACTURERS)],
+            "price_chf": float(200 + (i * 37) % 3000)
+        }
+        for i in range(size)
+    ]
+    return [str(i) for i in range(size)], embeddings, metadatas
+
+
+def rss_mb() -> float:
+    """Aktueller Resident Set Size des Prozesses in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build(directory: Path, size: int) -> None:
+    """Legt beide Indizes einmal auf der Festplatte an"""
+    import chromadb
+    from src.database.chromadbClient import max_batch_size
+    from src.database.vectorStore import NumpyVectorIndex
+
+    ids, embeddings, metadatas = synthetic_catalog(size)
+    client = chromadb.PersistentClient(path=str(directory / "chroma"))
+    collection = client.get_or_create_collection(name="benchmark_products")
+    chunk = max_batch_size(client)
+    for start in range(0, size, chunk):
+        collection.add(
+            ids=ids[start:start + chunk],
+            embeddings=embeddings[start:start + chunk].tolist(),
+            metadatas=metadatas[start:start + chunk]
+        )
+    for dtype in ("float32", "float16"):
+        NumpyVectorIndex(ids, embeddings, metadatas).save(directory / f"benchmark.{dtype}", dtype)
+
+
+def measure(directory: Path, engine: str, queries: int) -> dict:
+    """Lädt einen Index und misst Latenz und RSS (läuft im eigenen Prozess)"""
+    from src.database.vectorStore import ChromaVectorStore, NumpyVectorIndex
+
+    baseline = rss_mb()
+    if engine == "chroma":
+        import chromadb
+        client = chromadb.PersistentClient(path=str(directory / "chroma"))
+        store = ChromaVectorStore(SimpleNamespace(collection=client.get_collection(name="benchmark_products")))
+        search = store.search
+    else:
+        index = NumpyVectorIndex.load(directory / f"benchmark.{engine.split('-')[1]}")
+        search = lambda embedding, limit, where: index.search_batch([embedding], limit, where)
+
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((queries, DIMENSIONS)).astype(np.float32).tolist()
+    search(vectors[0], 5, None)  # Aufwärmen (Index laden, Seiten einblenden)
+
+    result = {"engine": engine}
+    for label, where in (("ohne Filter", None), ("mit Filter", FILTER)):
+        latencies = []
+        for vector in vectors:
+            start = time.perf_counter()
+            search(vector, 5, where)
+            latencies.append(time.perf_counter() - start)
+        result[label] = (percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000)
+    result["rss_mb"] = rss_mb() - baseline
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Vektorsuche: ChromaDB vs. NumPy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Kataloggrössen")
+    parser.add_argument("--queries", type=int, default=200, help="Anfragen pro Messung")
+    parser.add_argument("--worker", nargs=2, metavar=("DIR", "ENGINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(Path(args.worker[0]), args.worker[1], args.queries)))
+        return
+
+    engines = ["chroma", "numpy-float32", "numpy-float16"]
+    print(f"{'Produkte':>9}{'Engine':>15}{'p50 (ms)':>10}{'p99 (ms)':>10}{'p50 Filter':>12}{'p99 Filter':>12}{'RSS (MB)':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            build(Path(directory), size)
+            for engine in engines:
+                output = subprocess.run(
+                    [sys.executable, __file__, "--worker", directory, engine, "--queries", str(args.queries)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                plain, filtered = result["ohne Filter"], result["mit Filter"]
+                print(f"{size:>9}{engine:>15}{plain[0]:>10.3f}{plain[1]:>10.3f}{filtered[0]:>12.3f}{filtered[1]:>12.3f}{result['rss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
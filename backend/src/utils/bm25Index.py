@@ -0,0 +1,133 @@
+from typing import Dict, List, Optional, Tuple, Iterable
+from collections import Counter
+import heapq
+import math
+import re
+import threading
+from ..config.config import settings
+
+# Kleinbuchstaben und Ziffern; Modellnummern wie "i7-1365U" werden zu "i7" und "1365u",
+# genau wie im Dokumenttext, in dem clean_text Bindestriche mit Leerzeichen umgibt
+_TOKEN_PATTERN = re.compile(r"[a-z0-9äöüéèß]+")
+
+def tokenize(text: str) -> List[str]:
+    """Zerlegt einen Text in Suchbegriffe"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = settings.SEARCH_RRF_K) -> List[Tuple[str, float]]:
+    """
+    Führt mehrere Ranglisten per Reciprocal Rank Fusion zusammen.
+
+    :param rankings: Listen von Produkt-IDs, jeweils nach Relevanz sortiert.
+    :param k: Dämpfungskonstante; grössere Werte gewichten hintere Ränge stärker.
+    :return: (ID, Score) absteigend nach Score.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class BM25Index:
+    """
+    Invertierter In-Memory-Index mit BM25-Ranking über die Produktdokumente.
+
+    Ergänzt die Vektorsuche bei exakten Begriffen wie Modellnummern. Der Index wird inkrementell
+    gepflegt: sync() indiziert nur neue oder geänderte Dokumente und entfernt gelöschte.
+    """
+
+    def __init__(self, k1: float = settings.BM25_K1, b: float = settings.BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}  # Begriff -> {Dokument-ID: Häufigkeit}
+        self.doc_lengths: Dict[str, int] = {}
+        self.documents: Dict[str, str] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def _add(self, doc_id: str, text: str) -> None:
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.documents[doc_id] = text
+        self.total_length += length
+
+    def _remove(self, doc_id: str) -> None:
+        text = self.documents.pop(doc_id, None)
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Fügt ein Dokument hinzu oder ersetzt es"""
+        with self._lock:
+            self._remove(doc_id)
+            self._add(doc_id, text)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def sync(self, documents: Dict[str, str]) -> Dict[str, int]:
+        """
+        Gleicht den Index mit dem aktuellen Dokumentbestand ab.
+
+        :param documents: Dokumenttext nach Produkt-ID.
+        :return: Anzahl hinzugefügter, geänderter und entfernter Dokumente.
+        """
+        with self._lock:
+            removed = [doc_id for doc_id in self.documents if doc_id not in documents]
+            for doc_id in removed:
+                self._remove(doc_id)
+
+            added = updated = 0
+            for doc_id, text in documents.items():
+                current = self.documents.get(doc_id)
+                if current == text:
+                    continue
+                if current is None:
+                    added += 1
+                else:
+                    updated += 1
+                    self._remove(doc_id)
+                self._add(doc_id, text)
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def search(self, query: str, limit: int = 10, allowed_ids: Optional[set] = None) -> List[Tuple[str, float]]:
+        """
+        Sucht die besten Dokumente für die Anfrage.
+
+        :param query: Die Suchanfrage.
+        :param limit: Maximale Anzahl Treffer.
+        :param allowed_ids: Optional nur diese Produkt-IDs berücksichtigen (Metadatenfilter).
+        :return: (ID, BM25-Score) absteigend nach Score.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self.doc_lengths)
+            if not count or not terms:
+                return []
+            avg_length = self.total_length / count
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed_ids is not None and doc_id not in allowed_ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
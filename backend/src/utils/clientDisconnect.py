@@ -0,0 +1,63 @@
+from typing import Any, Awaitable, Dict, Optional
+import asyncio
+import contextlib
+import logging
+from fastapi import Request
+from ..config.config import settings
+
+# Statuscode für vom Client abgebrochene Anfragen (wie nginx), erscheint nur im Zugriffslog
+CLIENT_CLOSED_REQUEST = 499
+
+class ClientDisconnectedError(Exception):
+    """Der Client hat die Verbindung getrennt, bevor die Antwort fertig war"""
+
+class CancellationTracker:
+    """Zählt Anfragen, die wegen eines Verbindungsabbruchs des Clients abgebrochen wurden (je Endpunkt)"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def record(self, endpoint: str) -> None:
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        logging.info(f"Client hat die Verbindung getrennt, {endpoint} abgebrochen")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"total": sum(self.counts.values()), "by_endpoint": dict(self.counts)}
+
+async def cancel_on_disconnect(
+    request: Request,
+    awaitable: Awaitable[Any],
+    endpoint: str,
+    poll_interval: float = settings.CLIENT_DISCONNECT_POLL_SECONDS
+) -> Any:
+    """
+    Führt awaitable aus und bricht es ab, sobald der Client die Verbindung trennt.
+
+    Der Abbruch erreicht die laufende LLM-Anfrage (die HTTP-Verbindung zu Ollama wird geschlossen,
+    Ollama beendet dann die Generierung) bzw. entfernt sie aus der Warteschlange des LLMScheduler.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                get_cancellation_tracker().record(endpoint)
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+                raise ClientDisconnectedError()
+    finally:
+        # Auch wenn der Server selbst die Anfrage abbricht, nicht weiterrechnen
+        task.cancel()
+
+# Gemeinsame Instanz für alle Endpunkte im Prozess
+_cancellation_tracker: Optional[CancellationTracker] = None
+
+def get_cancellation_tracker() -> CancellationTracker:
+    """Gibt den gemeinsamen Zähler für Verbindungsabbrüche zurück (Singleton)"""
+    global _cancellation_tracker
+    if _cancellation_tracker is None:
+        _cancellation_tracker = CancellationTracker()
+    return _cancellation_tracker
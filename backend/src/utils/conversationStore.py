@@ -0,0 +1,189 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+import json
+import logging
+import sqlite3
+import threading
+import time
+from ..config.config import settings
+
+# Sitzung, die verwendet wird, wenn der Client keine Session-ID mitsendet
+DEFAULT_SESSION_ID = "default"
+
+def _empty_session() -> Dict[str, Any]:
+    return {"history": []}
+
+class ConversationStore(ABC):
+    """Basisklasse fuer sitzungsbezogene Gesprächsspeicher"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Dict[str, Any]:
+        """Lade die Sitzungsdaten (mindestens {"history": [...]})"""
+        pass
+
+    @abstractmethod
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        """Speichere die Sitzungsdaten"""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Entferne eine Sitzung"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Gib Kennzahlen zum Speicher zurück"""
+        pass
+
+class InMemoryConversationStore(ConversationStore):
+    """Prozessinterner LRU-Speicher mit TTL und Speicherobergrenze"""
+
+    def __init__(
+        self,
+        max_sessions: int = settings.CONVERSATION_MAX_SESSIONS,
+        max_bytes: int = settings.CONVERSATION_MAX_BYTES,
+        ttl_seconds: float = settings.CONVERSATION_TTL_SECONDS
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # session_id -> (Zeitstempel, serialisierte Daten)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def load(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return _empty_session()
+
+            timestamp, data = entry
+            if time.monotonic() - timestamp > self.ttl_seconds:
+                self._remove(session_id)
+                return _empty_session()
+
+            # Zugriff verlängert die Lebensdauer und markiert die Sitzung als zuletzt verwendet
+            self._sessions[session_id] = (time.monotonic(), data)
+            self._sessions.move_to_end(session_id)
+            return json.loads(data)
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        # Serialisiert ablegen: begrenzt den Speicher messbar und schützt vor späteren Änderungen
+        data = json.dumps(session, ensure_ascii=False)
+        with self._lock:
+            self._remove(session_id)
+            self._sessions[session_id] = (time.monotonic(), data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[1])
+
+    def _evict(self) -> None:
+        """Entferne abgelaufene und anschliessend die am längsten unbenutzten Sitzungen"""
+        now = time.monotonic()
+        # Die ältesten Einträge stehen vorne, daher reicht es, von vorne zu prüfen
+        while self._sessions:
+            session_id, (timestamp, _) = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+            if not over_limit and now - timestamp <= self.ttl_seconds:
+                break
+            self._remove(session_id)
+            self.evictions += 1
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite-basierter Speicher, den mehrere Uvicorn-Worker gemeinsam nutzen können"""
+
+    def __init__(
+        self,
+        db_path: Path = settings.CONVERSATION_DB_PATH,
+        ttl_seconds: float = settings.CONVERSATION_TTL_SECONDS
+    ):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()  # Eine Verbindung pro Thread
+        self._writes = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")  # Gleichzeitiges Lesen während Schreibvorgängen
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT data, updated_at FROM conversations WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return _empty_session()
+        return json.loads(row[0])
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO conversations (session_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (session_id, json.dumps(session, ensure_ascii=False), time.time())
+            )
+
+        # Abgelaufene Sitzungen gelegentlich aufräumen
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._purge_expired()
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        count = self._connection().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return {"backend": "sqlite", "sessions": count, "path": str(self.db_path)}
+
+    def _purge_expired(self) -> None:
+        with self._connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM conversations WHERE updated_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if deleted:
+            logging.info(f"{deleted} abgelaufene Sitzungen entfernt")
+
+def create_conversation_store(backend: Optional[str] = None) -> ConversationStore:
+    """Erstelle den konfigurierten Gesprächsspeicher"""
+    backend = backend or settings.CONVERSATION_STORE_BACKEND
+    if backend == "sqlite":
+        return SQLiteConversationStore()
+    if backend == "memory":
+        return InMemoryConversationStore()
+    raise ValueError(f"Unbekannter Gesprächsspeicher: {backend}")
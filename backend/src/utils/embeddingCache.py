@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import unicodedata
+import numpy as np
+from ..config.config import settings
+
+def normalize_text(text: str) -> str:
+    """Normalisiere eine Anfrage für den Cache-Schlüssel (Unicode, Kleinschreibung, Leerzeichen)"""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+class PersistentEmbeddingStore:
+    """
+    Memory-mapped float32-Speicher für Embeddings, der Neustarts überdauert.
+
+    Zu jeder Zeile wird ein Hash aus Modellname und Schlüssel gespeichert und beim Lesen geprüft.
+    Mehrere Worker teilen sich die Dateien; überschreibt ein anderer Prozess eine Zeile, ist das
+    ein Cache-Miss und liefert nie das Embedding einer anderen Anfrage.
+    """
+
+    def __init__(self, path: Path, capacity: int, model_name: str = settings.EMBEDDING_MODEL):
+        self.vectors_path = Path(f"{path}.f32")
+        self.hashes_path = Path(f"{path}.keys")
+        self.index_path = Path(f"{path}.json")
+        self.capacity = capacity
+        self.model_name = model_name
+        self.dimension: Optional[int] = None
+        self.slots: Dict[str, int] = {}  # Schlüssel -> Zeile in der Matrix
+        self.next_slot = 0  # Ringpuffer: bei voller Kapazität wird die älteste Zeile überschrieben
+        self._keys_by_slot: Dict[int, str] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._hashes: Optional[np.memmap] = None  # Schlüssel-Hash je Zeile, 0 = leer oder wird geschrieben
+        self._dirty = 0
+        self._load()
+
+    def _key_hash(self, key: str) -> int:
+        """64-Bit-Hash aus Modellname und Schlüssel (nie 0)"""
+        digest = hashlib.blake2b(f"{self.model_name}\0{key}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") | 1
+
+    def _load(self) -> None:
+        if not (self.index_path.exists() and self.vectors_path.exists() and self.hashes_path.exists()):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("model") != self.model_name:
+                logging.info(f"Persistenter Embedding-Cache stammt von einem anderen Modell ({index.get('model')}), wird neu angelegt")
+                return
+            self.dimension = index["dimension"]
+            self.capacity = index["capacity"]
+            self.next_slot = index["next_slot"]
+            self.slots = index["slots"]
+            self._keys_by_slot = {slot: key for key, slot in self.slots.items()}
+            self._open(mode="r+")
+            logging.info(f"{len(self.slots)} Embeddings aus {self.vectors_path} geladen")
+        except Exception as e:
+            logging.warning(f"Persistenter Embedding-Cache konnte nicht geladen werden: {e}")
+            self.dimension, self.slots, self._keys_by_slot, self._vectors, self._hashes = None, {}, {}, None, None
+
+    def _open(self, mode: str) -> None:
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dimension))
+        self._hashes = np.memmap(self.hashes_path, dtype=np.uint64, mode=mode, shape=(self.capacity,))
+
+    def _create(self, dimension: int) -> None:
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        # Hat ein anderer Worker die Dateien schon passend angelegt, mitbenutzen statt abschneiden
+        shared = (
+            self.vectors_path.exists() and self.hashes_path.exists()
+            and self.vectors_path.stat().st_size == self.capacity * dimension * 4
+            and self.hashes_path.stat().st_size == self.capacity * 8
+        )
+        self._open(mode="r+" if shared else "w+")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self.slots.get(key)
+        if slot is None or self._vectors is None:
+            return None
+        expected = self._key_hash(key)
+        if int(self._hashes[slot]) != expected:
+            # Zeile wurde inzwischen (auch von einem anderen Prozess) neu belegt
+            del self.slots[key]
+            self._keys_by_slot.pop(slot, None)
+            return None
+        embedding = np.array(self._vectors[slot])
+        # Während des Kopierens überschrieben: lieber ein Miss als ein gemischter Vektor
+        return embedding if int(self._hashes[slot]) == expected else None
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        if self._vectors is None:
+            self._create(len(embedding))
+        if len(embedding) != self.dimension or key in self.slots:
+            return
+
+        slot = self.next_slot
+        old_key = self._keys_by_slot.pop(slot, None)
+        if old_key is not None:
+            del self.slots[old_key]
+
+        # Hash erst nach dem Vektor setzen, damit Leser nie eine halb geschriebene Zeile akzeptieren
+        self._hashes[slot] = 0
+        self._vectors[slot] = embedding
+        self._hashes[slot] = self._key_hash(key)
+        self.slots[key] = slot
+        self._keys_by_slot[slot] = key
+        self.next_slot = (slot + 1) % self.capacity
+
+        # Index nur gelegentlich schreiben, nicht bei jedem Eintrag
+        self._dirty += 1
+        if self._dirty >= 100:
+            self.flush()
+
+    def flush(self) -> None:
+        """Schreibe Matrix, Zeilen-Hashes und Schlüsselindex auf die Festplatte"""
+        if self._vectors is None or not self._dirty:
+            return
+        self._vectors.flush()
+        self._hashes.flush()
+        tmp_path = Path(f"{self.index_path}.{os.getpid()}.tmp")  # Je Prozess, damit Worker sich nicht in die Quere kommen
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_name,
+                "dimension": self.dimension,
+                "capacity": self.capacity,
+                "next_slot": self.next_slot,
+                "slots": self.slots
+            }, f)
+        os.replace(tmp_path, self.index_path)  # Atomar ersetzen, damit der Index nie halb geschrieben ist
+        self._dirty = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+class EmbeddingCache:
+    """LRU-Cache für Anfrage-Embeddings mit optionaler persistenter Stufe"""
+
+    def __init__(self, max_entries: int = 10000, persistent_store: Optional[PersistentEmbeddingStore] = None):
+        self.max_entries = max_entries
+        self.persistent_store = persistent_store
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_text(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding.tolist()
+
+            if self.persistent_store is not None:
+                embedding = self.persistent_store.get(key)
+                if embedding is not None:
+                    self._remember(key, embedding)
+                    self.disk_hits += 1
+                    return embedding.tolist()
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        key = normalize_text(text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self.persistent_store is not None:
+                self.persistent_store.put(key, vector)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def flush(self) -> None:
+        """Persistente Stufe auf die Festplatte schreiben"""
+        with self._lock:
+            if self.persistent_store is not None:
+                self.persistent_store.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "persistent_entries": len(self.persistent_store) if self.persistent_store is not None else 0,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+# Gemeinsame Instanz, damit Suche, Beratung und Empfehlung denselben Cache nutzen
+_embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Gibt den gemeinsamen Embedding-Cache zurück (Singleton)"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        persistent_store = None
+        if settings.EMBEDDING_CACHE_PERSIST:
+            persistent_store = PersistentEmbeddingStore(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_DISK_ENTRIES)
+        _embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_SIZE, persistent_store)
+    return _embedding_cache
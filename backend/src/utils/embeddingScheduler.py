@@ -0,0 +1,95 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Sequence
+import logging
+import queue
+import threading
+import time
+from ..config.config import settings
+
+class EmbeddingBatcher:
+    """
+    Sammelt gleichzeitig eintreffende Embedding-Anfragen und berechnet sie in einem einzigen encode([...])-Aufruf.
+
+    Anfragen, die innerhalb des Zeitfensters eintreffen, werden bis zur maximalen Batchgrösse
+    zusammengefasst und auf einem eigenen Worker-Thread kodiert. Jeder Aufrufer erhält ein Future.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Sequence],
+        max_batch_size: int = settings.EMBEDDING_MAX_BATCH_SIZE,
+        batch_window_ms: float = settings.EMBEDDING_BATCH_WINDOW_MS
+    ):
+        self.encode_fn = encode_fn  # Kodiert eine Liste von Texten und liefert eine Zeile pro Text
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Reihe einen Text zur Kodierung ein und gib ein Future auf das Embedding zurück"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> List[float]:
+        """Blockierende Variante: wartet auf das Embedding eines Textes"""
+        return self.submit(text).result()
+
+    def _collect_batch(self) -> List[tuple]:
+        """Warte auf die erste Anfrage und sammle weitere bis Zeitfenster oder Batchgrösse erreicht sind"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            # Identische Texte im selben Batch nur einmal kodieren
+            unique_texts = list(dict.fromkeys(text for text, _ in pending))
+            try:
+                embeddings = self.encode_fn(unique_texts)
+                by_text = {text: embeddings[i].tolist() for i, text in enumerate(unique_texts)}
+            except Exception as e:
+                logging.error(f"Fehler bei der Batch-Kodierung: {e}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            for text, future in pending:
+                future.set_result(by_text[text])
+
+            self.batches += 1
+            self.items += len(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queue_depth": self._queue.qsize()
+        }
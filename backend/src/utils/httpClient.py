@@ -0,0 +1,75 @@
+from typing import Dict, Any, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import httpx
+from ..config.config import settings
+
+class AsyncHTTPClient:
+    """Gemeinsamer asynchroner HTTP-Client mit Keep-Alive-Verbindungspool und Parallelitaetsgrenze"""
+
+    def __init__(
+        self,
+        max_connections: int = settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.LLM_KEEPALIVE_EXPIRY,
+        timeout: float = settings.LLM_REQUEST_TIMEOUT,
+        connect_timeout: float = settings.LLM_CONNECT_TIMEOUT,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Erstelle den Client erst bei der ersten Verwendung (innerhalb des Event-Loops)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Begrenzt die Anzahl gleichzeitiger Anfragen an das Backend"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def post_json(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """Sende eine JSON-POST-Anfrage ueber den gemeinsamen Verbindungspool"""
+        async with self.semaphore:
+            return await self.client.post(url, json=payload)
+
+    async def get(self, url: str, timeout: float = settings.LLM_HEALTH_CHECK_TIMEOUT) -> httpx.Response:
+        """GET-Anfrage ohne Parallelitaetsgrenze (z.B. Health-Checks, die nicht hinter Generierungen warten sollen)"""
+        return await self.client.get(url, timeout=timeout)
+
+    @asynccontextmanager
+    async def stream_json(self, url: str, payload: Dict[str, Any]) -> AsyncIterator[httpx.Response]:
+        """Sende eine JSON-POST-Anfrage und lese die Antwort als Stream"""
+        async with self.semaphore:
+            async with self.client.stream("POST", url, json=payload) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        """Schliesse alle offenen Verbindungen des Pools"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logging.info("HTTP-Client geschlossen")
+        self._client = None
+
+# Gemeinsame Instanz fuer alle LLM-Aufrufe im Prozess
+_http_client: Optional[AsyncHTTPClient] = None
+
+def get_http_client() -> AsyncHTTPClient:
+    """Gibt den gemeinsamen HTTP-Client zurueck (Singleton)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = AsyncHTTPClient()
+    return _http_client
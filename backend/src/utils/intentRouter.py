@@ -0,0 +1,136 @@
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import re
+from pathlib import Path
+import numpy as np
+from ..config.config import settings
+
+# Absichten entsprechen den Prompt-Vorlagen des LLMService
+INTENTS = ("general", "product_specific", "recommendation", "orderInstructions")
+
+# Muster je Absicht, mit Wortgrenzen; bei mehreren Treffern gewinnt die frühere Absicht
+# (z.B. "Which laptop should I buy?" ist eine Empfehlung, keine Bestellung)
+INTENT_PATTERNS: Dict[str, List[str]] = {
+    "recommendation": [
+        r"recommend\w*", r"suggest\w*", r"advi[cs]e", r"alternatives?",
+        r"which (?:one|\w+) (?:should|would|do you|is best|is better)", r"what (?:\w+ )?should i (?:choose|pick|get|buy|take)",
+        r"help me (?:pick|choose|decide)",
+        r"best (?:option|choice|fit|one|laptop|notebook|desktop|monitor|device)",
+        r"empfehl\w*", r"empfiehlst", r"vorschlag\w*", r"welche[srnm]? \w+ soll(?:te)?", r"am besten geeignet"
+    ],
+    "orderInstructions": [
+        r"(?<!\bin )order(?:s|ed|ing)?(?! to\b)", r"purchas\w*", r"buy(?:ing)?", r"acquire", r"procure\w*",
+        r"deliver(?:y|ed)?", r"shipp?(?:ing|ed)?", r"lead times?", r"availability", r"(?:in|out of) stock",
+        r"where can i get", r"how (?:do|can) i get (?:one|it|this|that|a|an|the)", r"request (?:one|it|this|a new)",
+        r"bestell\w*", r"kaufen", r"erwerben", r"verfügbar\w*", r"liefer\w*", r"einkauf\w*", r"wo bekomme ich"
+    ],
+    "product_specific": [
+        r"(?:this|that|the selected) (?:laptop|notebook|device|model|monitor|one|product|computer|pc|tablet|headset|dock(?:ing station)?)",
+        r"(?:does|can|will) (?:it|this)", r"is this", r"is it (?:good|suitable|compatible|enough|worth)", r"its",
+        r"specs?", r"specifications?", r"battery", r"ram", r"memory", r"cpu", r"processor", r"storage", r"ssd", r"gpu",
+        r"graphics", r"display", r"screen", r"resolution", r"weigh(?:t|s)?", r"ports?", r"usb(?:-c)?", r"thunderbolt",
+        r"hdmi", r"warranty", r"webcam", r"dimensions", r"keyboard", r"fingerprint\w*",
+        r"diese[snm]? (?:gerät|laptop|modell|notebook|monitor)", r"akku\w*", r"arbeitsspeicher", r"prozessor",
+        r"gewicht", r"anschlüsse", r"garantie", r"bildschirm", r"tastatur", r"fingerabdruck\w*"
+    ]
+}
+
+def _compile(patterns: Dict[str, List[str]]) -> re.Pattern:
+    """Ein regulärer Ausdruck mit einer benannten Gruppe je Absicht"""
+    groups = "|".join(f"(?P<{intent}>{'|'.join(alternatives)})" for intent, alternatives in patterns.items())
+    return re.compile(rf"\b(?:{groups})\b", re.IGNORECASE)
+
+INTENT_PATTERN = _compile(INTENT_PATTERNS)
+_PRIORITY = {intent: rank for rank, intent in enumerate(INTENT_PATTERNS)}
+
+class IntentRouter:
+    """
+    Ordnet eine Nachricht einer Absicht zu (general, product_specific, recommendation, orderInstructions).
+
+    Zuerst ein einziger kompilierter Ausdruck mit Wortgrenzen (wenige Mikrosekunden). Passt keine
+    Regel und ist ein Embedding-Modell gesetzt, entscheidet der nächste Zentroid der
+    Beispielanfragen aus INTENT_EXAMPLES_PATH, sofern die Ähnlichkeit hoch genug ist.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Callable[[str], List[float]]] = None,
+        examples_path: Path = settings.INTENT_EXAMPLES_PATH,
+        min_similarity: float = settings.INTENT_CENTROID_MIN_SIMILARITY
+    ):
+        self.embedder = embedder  # z.B. TextAnalyzer.get_embedding (mit Embedding-Cache)
+        self.examples_path = examples_path
+        self.min_similarity = min_similarity
+        self._centroids: Optional[Tuple[List[str], np.ndarray]] = None
+        self.counts: Dict[str, int] = {"rule": 0, "centroid": 0, "default": 0}
+
+    def match(self, message: str) -> Optional[str]:
+        """Absicht nach den Regeln, None ohne Treffer"""
+        best = None
+        for found in INTENT_PATTERN.finditer(message):
+            intent = found.lastgroup
+            if best is None or _PRIORITY[intent] < _PRIORITY[best]:
+                best = intent
+                if _PRIORITY[best] == 0:
+                    break
+        return best
+
+    def _load_centroids(self) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Mittelwert der normierten Embeddings der Beispielanfragen je Absicht (einmalig berechnet)"""
+        if self._centroids is None and self.embedder is not None:
+            try:
+                with open(self.examples_path, "r", encoding="utf-8") as f:
+                    examples: Dict[str, List[str]] = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Beispielanfragen für die Absichtserkennung nicht lesbar: {str(e)}")
+                examples = {}
+            intents, rows = [], []
+            for intent, queries in examples.items():
+                if intent not in INTENTS or not queries:
+                    continue
+                vectors = np.array([self.embedder(query) for query in queries], dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                centroid = vectors.mean(axis=0)
+                intents.append(intent)
+                rows.append(centroid / np.linalg.norm(centroid))
+            self._centroids = (intents, np.array(rows)) if rows else ([], np.empty((0, 0)))
+        return self._centroids
+
+    def nearest(self, message: str, embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Absicht des nächsten Zentroids, None ohne Modell oder bei zu geringer Ähnlichkeit"""
+        centroids = self._load_centroids()
+        if not centroids or not centroids[0]:
+            return None
+        intents, matrix = centroids
+        vector = np.asarray(embedding if embedding is not None else self.embedder(message), dtype=np.float32)
+        scores = matrix @ (vector / np.linalg.norm(vector))
+        best = int(np.argmax(scores))
+        return intents[best] if scores[best] >= self.min_similarity else None
+
+    def classify(self, message: str, embedding: Optional[List[float]] = None) -> Tuple[str, str]:
+        """Absicht und Quelle ("rule", "centroid" oder "default")"""
+        intent = self.match(message)
+        source = "rule"
+        if intent is None:
+            intent = self.nearest(message, embedding)
+            source = "centroid"
+        if intent is None:
+            intent, source = "general", "default"
+        self.counts[source] += 1
+        return intent, source
+
+    async def aclassify(self, message: str) -> Tuple[str, str]:
+        """Wie classify; das Embedding für den Zentroid-Vergleich wird ausserhalb des Event-Loops berechnet"""
+        if self.embedder is None or self.match(message) is not None:
+            return self.classify(message)
+        return await asyncio.to_thread(self.classify, message)
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        return {
+            **self.counts,
+            "embedding_fallback": self.embedder is not None,
+            "rule_rate": round(self.counts["rule"] / total, 4) if total else 0.0
+        }
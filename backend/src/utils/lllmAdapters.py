@@ -1,62 +1,166 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-import requests
+from typing import Dict, Any, List, Optional, AsyncIterator
 import json
 import logging
+import httpx
 from ..config.config import settings
+from .httpClient import AsyncHTTPClient, get_http_client
 
 class LLMAdapter(ABC):
     """Basisklasse fuer LLM-Adapter"""
-    
+
+    name: str = "llm"  # Bezeichnung in Logs und Kennzahlen
+    model: str = ""  # Verwendetes Modell (Kontext-Tokens gelten nur für dasselbe Modell)
+
     @abstractmethod
-    async def generate(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None) -> Dict[str, Any]:
-        """Generiere eine Antwort vom LLM"""
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = settings.LLM_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Generiere eine Antwort vom LLM ({"response", "context", "status"} oder {"error", "status"})"""
+        pass
+
+    @abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        state: Dict[str, Any],
+        temperature: float = settings.LLM_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None
+    ) -> AsyncIterator[str]:
+        """Gib die Tokens der Antwort laufend weiter; Fehler als RuntimeError, neuer Kontext in state["context"]"""
+        pass
+
+    async def health_check(self) -> bool:
+        """Prüfe, ob das Backend erreichbar ist"""
+        return True
+
+    async def aclose(self) -> None:
+        """Gib Verbindungen frei, die der Adapter selbst hält"""
         pass
 
 class OllamaAdapter(LLMAdapter):
     """Adapter fuer die Ollama-API"""
-    
-    def __init__(self, api_url: str, model: str):
+
+    def __init__(
+        self,
+        api_url: str,
+        model: str,
+        http_client: Optional[AsyncHTTPClient] = None,
+        owns_client: bool = False
+    ):
         self.api_url = api_url  # URL der Ollama-API
         self.model = model  # Verwendetes Modell
-        
-    async def generate(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        self.http_client = http_client or get_http_client()  # Gemeinsamer Verbindungspool
+        self.owns_client = owns_client  # Eigener Pool je Backend wird mit dem Adapter geschlossen
+        self.name = f"{httpx.URL(api_url).netloc.decode('ascii')}/{model}"
+
+    def build_payload(
+        self,
+        prompt: str,
+        stream: bool,
+        temperature: float = settings.LLM_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Erstelle die Nutzlast fuer die Ollama-API (context: Tokens einer früheren Antwort derselben Sitzung)"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": settings.LLM_KEEP_ALIVE,  # Modell zwischen den Anfragen geladen halten
+            "options": {
+                "temperature": temperature,  # Temperatur fuer die Generierung
+                "top_p": 0.9,  # Wahrscheinlichkeitsgrenze
+                "num_predict": max_tokens or settings.LLM_MAX_TOKENS  # Maximale Tokenanzahl festlegen
+            }
+        }
+        if context:
+            payload["context"] = context
+        return payload
+
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = settings.LLM_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
         """Generiere eine Antwort mit der Ollama-API"""
         try:
-            # Erstelle die Nutzlast fuer die Anfrage
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,  # Temperatur fuer die Generierung
-                    "top_p": 0.9  # Wahrscheinlichkeitsgrenze
-                }
-            }
-            
-            if max_tokens:
-                payload["options"]["num_predict"] = max_tokens  # Maximale Tokenanzahl festlegen
-                
             # Sende die Anfrage an die API
-            response = requests.post(self.api_url, json=payload)
-            
+            response = await self.http_client.post_json(
+                self.api_url, self.build_payload(prompt, False, temperature, max_tokens, context)
+            )
+
             if response.status_code == 200:
                 # Erfolgreiche Antwort verarbeiten
+                data = response.json()
                 return {
-                    "response": response.json()["response"].strip(),  # Generierte Antwort
+                    "response": data["response"].strip(),  # Generierte Antwort
+                    "context": data.get("context"),  # Kontext-Tokens für Folgefragen
                     "status": "success"  # Status der Anfrage
                 }
-            
+
             # Fehlerhafte Antwort verarbeiten
             return {
-                "error": f"Anfrage fehlgeschlagen mit Status {response.status_code}",
+                "error": f"LLM request failed with status {response.status_code}",
                 "status": "error"
             }
-            
+
         except Exception as e:
             # Fehler protokollieren und zurueckgeben
-            logging.error(f"Fehler im OllamaAdapter: {str(e)}")
+            logging.error(f"Fehler im OllamaAdapter ({self.name}): {str(e)}")
             return {
                 "error": str(e),
                 "status": "error"
-            }
\ No newline at end of file
+            }
+
+    async def stream(
+        self,
+        prompt: str,
+        state: Dict[str, Any],
+        temperature: float = settings.LLM_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None
+    ) -> AsyncIterator[str]:
+        """Tokens eines Ollama-NDJSON-Streams"""
+        try:
+            async with self.http_client.stream_json(
+                self.api_url, self.build_payload(prompt, True, temperature, max_tokens, context)
+            ) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"LLM request failed with status {response.status_code}")
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(chunk["error"])
+
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        state["context"] = chunk.get("context")
+                        break
+        except httpx.HTTPError as e:
+            # Verbindungsfehler wie Fehlerantworten behandeln, damit der Aufrufer umschalten kann
+            raise RuntimeError(f"LLM request failed: {str(e) or type(e).__name__}") from e
+
+    async def health_check(self) -> bool:
+        """Ollama antwortet auf /api/tags, sobald der Server läuft"""
+        try:
+            response = await self.http_client.get(str(httpx.URL(self.api_url).copy_with(path="/api/tags")))
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def aclose(self) -> None:
+        if self.owns_client:
+            await self.http_client.aclose()
@@ -0,0 +1,333 @@
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+import asyncio
+import logging
+import time
+from ..config.config import settings
+from .httpClient import AsyncHTTPClient
+from .lllmAdapters import LLMAdapter, OllamaAdapter
+
+# Modellstufen: "large" für Empfehlungen und Produktfragen, "small" für kurze, einfache Anfragen
+TIERS = ("large", "small")
+
+class CircuitBreaker:
+    """
+    Schliesst ein Backend nach wiederholten Fehlern aus.
+
+    closed: normaler Betrieb. open: keine Anfragen bis zum Ablauf der Abkühlzeit (oder bis ein
+    Health-Check wieder erfolgreich ist). half_open: genau eine Probeanfrage; Erfolg schliesst den
+    Schalter wieder, ein Fehler öffnet ihn erneut.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.LLM_BREAKER_FAILURES,
+        cooldown_seconds: float = settings.LLM_BREAKER_COOLDOWN_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0  # Aufeinanderfolgende Fehler
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def available(self) -> bool:
+        """Darf das Backend jetzt eine Anfrage erhalten? (ohne den Zustand zu ändern)"""
+        if self.state == "closed":
+            return True
+        if self._probing:
+            return False
+        return self.state == "half_open" or time.monotonic() - self.opened_at >= self.cooldown_seconds
+
+    def on_dispatch(self) -> None:
+        if self.state != "closed":
+            self.state = "half_open"
+            self._probing = True
+
+    def record_success(self) -> None:
+        # Erfolg einer Anfrage von vor dem Öffnen schliesst den Schalter nicht wieder
+        if self.state != "open":
+            self.state = "closed"
+            self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def abandon(self) -> None:
+        """Anfrage ohne Ergebnis beendet (abgebrochen); zählt weder als Erfolg noch als Fehler"""
+        self._probing = False
+
+    def trip(self) -> None:
+        if self.state != "open":
+            self.trips += 1
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self._probing = False
+
+    def on_health_ok(self) -> None:
+        # Server wieder erreichbar: die nächste Anfrage prüft, ob er auch generieren kann
+        if self.state == "open":
+            self.state = "half_open"
+
+class LLMBackend:
+    """Ein LLM-Backend im Pool: Adapter, Modellstufe, offene Anfragen, Latenz und Circuit Breaker"""
+
+    def __init__(self, adapter: LLMAdapter, tier: str = "large", breaker: Optional[CircuitBreaker] = None):
+        if tier not in TIERS:
+            raise ValueError(f"Unbekannte Modellstufe: {tier}")
+        self.adapter = adapter
+        self.tier = tier
+        self.breaker = breaker or CircuitBreaker()
+        self.outstanding = 0  # Laufende Anfragen
+        self.latency: Optional[float] = None  # Gleitender Mittelwert der Antwortzeit in Sekunden
+        self.healthy = True  # Ergebnis des letzten Health-Checks
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def name(self) -> str:
+        return self.adapter.name
+
+    @property
+    def model(self) -> str:
+        return self.adapter.model
+
+    def expected_completion(self) -> float:
+        """Geschätzte Zeit bis eine neue Anfrage fertig ist; ohne Messwert 0, damit neue Backends Anfragen erhalten"""
+        return (self.outstanding + 1) * (self.latency or 0.0)
+
+    def finish(self, outcome: Optional[bool], elapsed: float, count_failure: bool = True) -> None:
+        """Ergebnis einer Anfrage verbuchen (outcome None: abgebrochen)"""
+        self.outstanding -= 1
+        if outcome:
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+            self.breaker.record_success()
+        elif outcome is False and count_failure:
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.abandon()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "tier": self.tier,
+            "state": self.breaker.state,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "trips": self.breaker.trips
+        }
+
+class LLMPool:
+    """
+    Verteilt LLM-Anfragen auf mehrere Backends.
+
+    Bevorzugt werden Backends der gewünschten Modellstufe; unter ihnen das mit den wenigsten
+    offenen Anfragen ("least_outstanding") oder der kürzesten erwarteten Fertigstellung
+    ("latency"). Schlägt eine Anfrage fehl, wird das nächste Backend versucht (bei Streams nur
+    vor dem ersten Token). Backends mit geöffnetem Circuit Breaker werden übersprungen; sind alle
+    ausgeschlossen, werden trotzdem alle versucht, statt jede Anfrage sofort abzulehnen.
+    """
+
+    def __init__(self, backends: List[LLMBackend], routing: str = settings.LLM_ROUTING):
+        if not backends:
+            raise ValueError("Mindestens ein LLM-Backend erforderlich")
+        if routing not in ("least_outstanding", "latency"):
+            raise ValueError(f"Unbekannte Verteilung: {routing}")
+        self.backends = backends
+        self.routing = routing
+        self.failovers = 0  # Anfragen, die auf einem weiteren Backend wiederholt wurden
+        self.all_ejected = 0  # Anfragen, bei denen kein Backend verfügbar war
+        self._health_task: Optional[asyncio.Task] = None
+
+    def has_tier(self, tier: str) -> bool:
+        return any(backend.tier == tier for backend in self.backends)
+
+    def model_for(self, tier: str) -> str:
+        """Modell der Stufe (bzw. des ersten Backends, wenn es die Stufe nicht gibt)"""
+        return next((backend.model for backend in self.backends if backend.tier == tier), self.backends[0].model)
+
+    def _rank(self, backend: LLMBackend):
+        if self.routing == "latency":
+            return (backend.expected_completion(), backend.outstanding)
+        return (backend.outstanding, backend.latency or 0.0)
+
+    def candidates(self, tier: str = "large", model: Optional[str] = None) -> List[LLMBackend]:
+        """Backends in der Reihenfolge, in der sie versucht werden: zuerst die Stufe, dann die übrigen"""
+        backends = [backend for backend in self.backends if model is None or backend.model == model]
+        available = [backend for backend in backends if backend.breaker.available()]
+        if backends and not available:
+            self.all_ejected += 1
+            available = backends
+        preferred = sorted((b for b in available if b.tier == tier), key=self._rank)
+        others = sorted((b for b in available if b.tier != tier), key=self._rank)
+        return preferred + others
+
+    def _dispatch(self, backend: LLMBackend) -> float:
+        backend.breaker.on_dispatch()
+        backend.outstanding += 1
+        backend.requests += 1
+        return time.monotonic()
+
+    async def _attempt(self, backend: LLMBackend, call: Callable[[], Awaitable[Dict[str, Any]]], count_failure: bool) -> Dict[str, Any]:
+        started = self._dispatch(backend)
+        outcome = None
+        try:
+            result = await call()
+            outcome = result.get("status") == "success"
+            return result
+        finally:
+            backend.finish(outcome, time.monotonic() - started, count_failure)
+
+    async def generate(
+        self,
+        prompt: str,
+        tier: str = "large",
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None,
+        temperature: float = settings.LLM_TEMPERATURE
+    ) -> Dict[str, Any]:
+        """
+        Antwort vom ersten Backend, das erfolgreich generiert.
+
+        Mit context nur ein Versuch auf einem Backend desselben Modells; ein Fehler zählt dann nicht
+        für den Circuit Breaker, weil meist der Kontext ungültig ist und der Aufrufer ohnehin mit
+        vollem Prompt neu beginnt.
+        """
+        candidates = self.candidates(tier, self.model_for(tier) if context else None)
+        if context:
+            candidates = candidates[:1]
+
+        result: Dict[str, Any] = {"error": "No LLM backend available", "status": "error"}
+        for attempt, backend in enumerate(candidates):
+            if attempt:
+                self.failovers += 1
+                logging.warning(f"LLM-Backend fehlgeschlagen, versuche {backend.name}")
+            result = await self._attempt(
+                backend,
+                lambda: backend.adapter.generate(prompt, temperature, max_tokens, context),
+                count_failure=not context
+            )
+            if result.get("status") == "success":
+                return {**result, "backend": backend.name}
+        return result
+
+    async def stream(
+        self,
+        prompt: str,
+        state: Dict[str, Any],
+        tier: str = "large",
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None,
+        temperature: float = settings.LLM_TEMPERATURE
+    ) -> AsyncIterator[str]:
+        """Tokens vom ersten Backend, das einen Stream liefert; nach dem ersten Token kein Umschalten mehr"""
+        candidates = self.candidates(tier, self.model_for(tier) if context else None)
+        if context:
+            candidates = candidates[:1]
+        if not candidates:
+            raise RuntimeError("No LLM backend available")
+
+        last_error: Optional[Exception] = None
+        for attempt, backend in enumerate(candidates):
+            if attempt:
+                self.failovers += 1
+                logging.warning(f"LLM-Backend fehlgeschlagen, versuche {backend.name}")
+            started = self._dispatch(backend)
+            outcome = None
+            yielded = False
+            try:
+                async with aclosing(backend.adapter.stream(prompt, state, temperature, max_tokens, context)) as tokens:
+                    async for token in tokens:
+                        yielded = True
+                        yield token
+                outcome = True
+            except RuntimeError as e:
+                outcome = False
+                last_error = e
+                if yielded:
+                    raise
+            finally:
+                backend.finish(outcome, time.monotonic() - started, count_failure=not context)
+            if outcome:
+                state["backend"] = backend.name
+                return
+        raise RuntimeError(str(last_error))
+
+    async def check_health(self) -> None:
+        """Alle Backends prüfen: nicht erreichbare ausschliessen, wieder erreichbare zur Probe freigeben"""
+        results = await asyncio.gather(*(backend.adapter.health_check() for backend in self.backends), return_exceptions=True)
+        for backend, ok in zip(self.backends, results):
+            backend.healthy = ok is True
+            if backend.healthy:
+                backend.breaker.on_health_ok()
+            elif backend.breaker.state != "open":
+                logging.warning(f"LLM-Backend {backend.name} antwortet nicht, wird ausgeschlossen")
+                backend.breaker.trip()
+
+    def start_health_checks(self, interval: float = settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS) -> None:
+        """Startet die periodischen Health-Checks im laufenden Event-Loop"""
+        if interval <= 0 or self._health_task is not None:
+            return
+
+        async def run():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.check_health()
+                except Exception as e:
+                    logging.error(f"Health-Check der LLM-Backends fehlgeschlagen: {str(e)}")
+
+        self._health_task = asyncio.create_task(run())
+        logging.info(f"Health-Checks für {len(self.backends)} LLM-Backend(s) gestartet (alle {interval}s)")
+
+    async def aclose(self) -> None:
+        """Beendet die Health-Checks und schliesst die eigenen Verbindungspools der Backends"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for backend in self.backends:
+            await backend.adapter.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routing": self.routing,
+            "failovers": self.failovers,
+            "all_ejected": self.all_ejected,
+            "backends": [backend.stats() for backend in self.backends]
+        }
+
+def create_llm_pool(http_client: Optional[AsyncHTTPClient] = None, spec: Optional[str] = None) -> LLMPool:
+    """
+    Erstellt den Pool aus LLM_BACKENDS ("url|modell|stufe", kommagetrennt).
+
+    Ohne Angabe ein einzelnes Backend aus LLM_API_URL und LLM_MODEL. Bei mehreren Backends
+    erhält jedes einen eigenen Verbindungspool mit eigener Parallelitätsgrenze, sofern kein
+    http_client übergeben wird.
+    """
+    spec = settings.LLM_BACKENDS if spec is None else spec
+    entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+    if not entries:
+        entries = [f"{settings.LLM_API_URL}|{settings.LLM_MODEL}|large"]
+
+    backends = []
+    for entry in entries:
+        url, model, tier = (entry.split("|") + ["", ""])[:3]
+        owns_client = http_client is None and len(entries) > 1
+        adapter = OllamaAdapter(
+            url.strip(),
+            model.strip() or settings.LLM_MODEL,
+            AsyncHTTPClient() if owns_client else http_client,
+            owns_client=owns_client
+        )
+        backends.append(LLMBackend(adapter, tier.strip() or "large"))
+    return LLMPool(backends)
@@ -0,0 +1,168 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Optional
+import asyncio
+import heapq
+import itertools
+import time
+from ..config.config import settings
+
+# Prioritätsklassen, kleinere Zahl = wird zuerst bedient
+PRIORITIES = {"interactive": 0, "recommendation": 1, "background": 2}
+
+class LLMOverloadedError(Exception):
+    """
+    Wird ausgelöst, wenn eine LLM-Anfrage nicht angenommen oder nicht rechtzeitig gestartet werden kann.
+
+    status_code 503: Warteschlange voll oder Frist nicht einhaltbar; 429: Anfrage niedriger
+    Priorität abgewiesen, damit Platz für interaktive Anfragen bleibt.
+    """
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = settings.LLM_RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class LLMScheduler:
+    """
+    Zulassungskontrolle für LLM-Anfragen.
+
+    Höchstens max_in_flight Generierungen laufen gleichzeitig, weitere warten in einer begrenzten
+    Warteschlange, die nach Priorität und danach in Ankunftsreihenfolge abgearbeitet wird. Jede
+    Anfrage hat eine Frist für die Wartezeit; ist absehbar, dass sie nicht eingehalten werden kann,
+    wird sofort abgelehnt statt erst nach Ablauf. Anfragen niedriger Priorität dürfen nur einen
+    Teil der Warteschlange belegen.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = settings.LLM_MAX_CONCURRENCY,
+        max_queue: int = settings.LLM_MAX_QUEUE,
+        deadline_seconds: float = settings.LLM_QUEUE_DEADLINE_SECONDS,
+        low_priority_share: float = settings.LLM_LOW_PRIORITY_QUEUE_SHARE
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline_seconds = deadline_seconds
+        self.low_priority_share = low_priority_share
+        self.in_flight = 0
+        self._queue: list = []  # Heap aus (Priorität, Laufnummer, Future)
+        self._sequence = itertools.count()
+        self._waiting: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._wait_times: deque = deque(maxlen=1000)
+        self._service_time = 5.0  # Gleitender Mittelwert der Generierungsdauer in Sekunden
+        self.admitted = 0
+        self.rejected = 0  # Warteschlange voll oder Frist nicht einhaltbar (503)
+        self.shed = 0  # Niedrige Priorität abgewiesen (429)
+        self.expired = 0  # Frist beim Warten abgelaufen (503)
+        self.cancelled = 0  # Client hat abgebrochen, während die Anfrage wartete
+        self.aborted = 0  # Client hat abgebrochen, während die Generierung lief
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._waiting.values())
+
+    def estimated_wait(self, priority: str = "interactive") -> float:
+        """Geschätzte Wartezeit einer neuen Anfrage dieser Priorität in Sekunden"""
+        if self.in_flight < self.max_in_flight and not self.queue_depth:
+            return 0.0
+        level = PRIORITIES[priority]
+        ahead = sum(count for name, count in self._waiting.items() if PRIORITIES[name] <= level)
+        return (ahead + 1) * self._service_time / max(self.max_in_flight, 1)
+
+    def ensure_capacity(self, priority: str = "interactive", deadline: Optional[float] = None) -> None:
+        """
+        Prüft ohne Reservierung, ob eine Anfrage angenommen würde, und löst sonst LLMOverloadedError aus.
+
+        Für Streaming-Endpunkte, die vor dem Start der Antwort mit 503/429 ablehnen müssen.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unbekannte Priorität: {priority}")
+        if self.in_flight < self.max_in_flight and not self.queue_depth:
+            return
+
+        depth = self.queue_depth
+        if depth >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError("LLM queue is full, please retry later")
+        if PRIORITIES[priority] > 0 and depth >= self.max_queue * self.low_priority_share:
+            self.shed += 1
+            raise LLMOverloadedError("LLM is busy with interactive requests, please retry later", status_code=429)
+        deadline = self.deadline_seconds if deadline is None else deadline
+        if self.estimated_wait(priority) > deadline:
+            self.rejected += 1
+            raise LLMOverloadedError("LLM cannot start this request before its deadline")
+
+    async def acquire(self, priority: str = "interactive", deadline: Optional[float] = None) -> None:
+        """Wartet auf einen freien Platz (höchstens deadline Sekunden)"""
+        self.ensure_capacity(priority, deadline)
+        started = time.monotonic()
+        if self.in_flight < self.max_in_flight and not self.queue_depth:
+            self._admit(started)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (PRIORITIES[priority], next(self._sequence), future))
+        self._waiting[priority] += 1
+        try:
+            await asyncio.wait_for(future, timeout=self.deadline_seconds if deadline is None else deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                self.release()  # Platz wurde im selben Moment zugeteilt
+            if isinstance(e, asyncio.TimeoutError):
+                self.expired += 1
+                raise LLMOverloadedError("LLM request waited longer than its deadline") from None
+            self.cancelled += 1
+            raise
+        finally:
+            self._waiting[priority] -= 1
+        self._wait_times.append(time.monotonic() - started)
+
+    def _admit(self, started: float) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        self._wait_times.append(time.monotonic() - started)
+
+    def release(self) -> None:
+        """Gibt einen Platz frei und startet die nächste wartende Anfrage"""
+        self.in_flight -= 1
+        while self._queue and self.in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue  # Abgebrochen oder Frist abgelaufen
+            self.in_flight += 1
+            self.admitted += 1
+            future.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive", deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hält einen Platz für die Dauer einer Generierung"""
+        await self.acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            self.aborted += 1  # Generierung abgebrochen, der Platz wird sofort frei
+            raise
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "waiting": dict(self._waiting),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "aborted": self.aborted,
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+            "service_time_s": round(self._service_time, 3)
+        }
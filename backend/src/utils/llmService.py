@@ -1,95 +1,385 @@
-from typing import Dict, Any, List, Optional
-import requests
+from typing import Dict, Any, List, Optional, AsyncIterator
+from contextlib import aclosing
+import hashlib
+import json
 import logging
 from pathlib import Path
-import os
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template, TemplateNotFound
 from ..config.config import settings
+from .httpClient import AsyncHTTPClient
+from .conversationStore import ConversationStore, DEFAULT_SESSION_ID, create_conversation_store
+from .singleFlight import SingleFlight
+from .promptBuilder import PromptBuilder
+from .llmScheduler import LLMScheduler, LLMOverloadedError
+from .llmPool import LLMPool, create_llm_pool
+from .intentRouter import IntentRouter
 
 class LLMService:
-    def __init__(self):
-        self.api_url = settings.LLM_API_URL
-        self.model = settings.LLM_MODEL
-        self.conversation_history = []
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        conversation_store: Optional[ConversationStore] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        pool: Optional[LLMPool] = None,
+        intent_router: Optional[IntentRouter] = None
+    ):
+        # Backends hinter Adaptern (LLM_BACKENDS), ohne Angabe nur LLM_API_URL mit LLM_MODEL
+        self.pool = pool or create_llm_pool(http_client)
+        self.conversation_store = conversation_store or create_conversation_store()  # Verlauf pro Sitzung
+        # Begrenzte Parallelität je Backend, Warteschlange mit Prioritäten
+        self.scheduler = scheduler or LLMScheduler(max_in_flight=settings.LLM_MAX_CONCURRENCY * len(self.pool.backends))
+        self.single_flight = SingleFlight()  # Identische gleichzeitige Prompts nur einmal an das LLM senden
+        self.prompt_builder = PromptBuilder()  # Verlauf und Zusammenfassung im Token-Budget
+        self.intent_router = intent_router or IntentRouter()  # Vorlage nach der Absicht der Nachricht
+        self.context_reuses = 0  # Folgefragen, die nur die neue Nachricht gesendet haben
+        self.full_prompts = 0
         self._initialize_templates()
 
     def _initialize_templates(self):
-        """Initialisiere die Vorlagen für Prompts"""
-        self.templates = {
-            "general": self._load_template_from_file("general"),
-            "productSpecific": self._load_template_from_file("product_specific"),
-            "productRecommendation": self._load_template_from_file("product_recommendation"),
-            "orderInstructions": self._load_template_from_file("order_instructions")
+        """Initialisiere die Jinja2-Umgebung für Prompts (einmal kompiliert, Neuladen bei Dateiänderung)"""
+        self.template_dir = settings.DATA_DIR / "prompts"
+        self.template_files = {
+            "general": "general.jinja2",
+            "productSpecific": "product_specific.jinja2",
+            "productRecommendation": "product_recommendation.jinja2",
+            "orderInstructions": "order_instructions.jinja2",
+            "productBlurb": "product_blurb.jinja2"
         }
 
-    def _load_template_from_file(self, template_name: str) -> str:
-        """Lade eine Vorlage aus einer Datei oder verwende eine Standardvorlage"""
-        # Prüfe, ob die Vorlagendatei existiert
-        template_path = settings.DATA_DIR / "prompts" / f"{template_name}.jinja2"
-        
-        if os.path.exists(template_path):
-            with open(template_path, "r", encoding="utf-8") as f:
-                return f.read()
-                
-        # Wenn die Vorlagendatei nicht existiert, gib eine Warnung aus und gib eine leere Vorlage zurück
-        logging.warning(f"Template file {template_name}.jinja2 not found. Please create it in {template_path}")
-        return f"Template {template_name} not found. Please create it in {template_path}"
-
-    async def generate_response(self, message: str, role_type: str = "general", context: Dict = None) -> Dict[str, str]:
-        """Generiere eine Antwort vom LLM"""
+        # Bytecode-Cache, damit auch ein Neustart die Vorlagen nicht neu kompilieren muss
+        settings.TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.template_env = Environment(
+            loader=FileSystemLoader(str(self.template_dir), encoding="utf-8"),
+            bytecode_cache=FileSystemBytecodeCache(str(settings.TEMPLATE_CACHE_DIR)),
+            auto_reload=settings.TEMPLATE_AUTO_RELOAD  # Prüft die mtime der Datei bei jedem Abruf
+        )
+        self._fallback_templates: Dict[str, Template] = {}
+
+        # Vorlagen vorab laden, damit fehlende Dateien schon beim Start auffallen
+        for template_name in self.template_files:
+            self._load_template(template_name)
+
+    def _load_template(self, template_name: str) -> Template:
+        """Lade eine kompilierte Vorlage aus dem Cache der Umgebung oder verwende eine Standardvorlage"""
+        file_name = self.template_files.get(template_name, self.template_files["general"])
         try:
-            prompt = self._get_prompt(role_type, message, context)
-            logging.info(f"Sending request to LLM: URL={self.api_url}, Model={self.model}")
+            return self.template_env.get_template(file_name)
+        except TemplateNotFound:
+            if template_name not in self._fallback_templates:
+                # Wenn die Vorlagendatei nicht existiert, gib eine Warnung aus und verwende eine Platzhaltervorlage
+                template_path = self.template_dir / file_name
+                logging.warning(f"Template file {file_name} not found. Please create it in {template_path}")
+                self._fallback_templates[template_name] = self.template_env.from_string(
+                    f"Template {template_name} not found. Please create it in {template_path}"
+                )
+            return self._fallback_templates[template_name]
 
-            # Füge Systemanweisung hinzu, die das Verhalten des LLM steuert
-            system_instruction = """You are a friendly IT hardware advisor from Novartis. Your main focus is on IT topics and products.
+    async def generate_response(
+        self,
+        message: str,
+        role_type: str = "general",
+        context: Dict = None,
+        session_id: Optional[str] = None,
+        coalesce: bool = False,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        use_history: bool = True
+    ) -> Dict[str, str]:
+        """
+        Generiere eine Antwort vom LLM.
 
-For IT product inquiries: ONLY discuss products that are in the Novartis product database.
+        Mit coalesce=True teilen sich gleichzeitige Anfragen mit identischem Prompt einen LLM-Aufruf;
+        der Gesprächsverlauf wird trotzdem für jede Sitzung einzeln fortgeschrieben. Folgefragen
+        derselben Sitzung senden nach Möglichkeit nur die neue Nachricht samt Ollama-"context".
+        Mit use_history=False hängt der Prompt nicht von der Sitzung ab (Verlauf, Zusammenfassung und
+        Ollama-"context" bleiben aussen vor), etwa für Antworten, die sitzungsübergreifend gecacht werden.
 
-For general questions: You may politely and competently answer non-IT related questions, but indicate at the end of your response that you're primarily available for IT-related matters."""
-            
-            is_first_message = len(self.conversation_history) == 0
-            system_instruction += f"\nNOTE: This is {'the first' if is_first_message else 'NOT the first'} message in the conversation. {'You may greet the user once.' if is_first_message else 'DO NOT start with a greeting.'}"
-            
-            full_prompt = f"{system_instruction}\n\n{prompt}"
-
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model,
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": settings.LLM_TEMPERATURE,
-                        "top_p": 0.9,
-                        "num_predict": settings.LLM_MAX_TOKENS
-                    }
-                }
-            )
+        Priorität und Frist (Sekunden bis zum Start der Generierung) steuern die Warteschlange;
+        kann die Anfrage nicht angenommen werden, wird LLMOverloadedError ausgelöst.
+        """
+        session_id = session_id or DEFAULT_SESSION_ID
+        try:
+            role_type = await self._route_intent(message, role_type, context)
+            session = self.conversation_store.load(session_id)
+            tier = self._select_tier(message, role_type, context)
+            signature = self._context_signature(message, role_type, context, tier)
+            llm_context = self._reusable_context(session, signature) if use_history else None
+            logging.info(f"Sending request to LLM: Tier={tier}, Model={self.pool.model_for(tier)}")
 
-            if response.status_code == 200:
-                llm_response = response.json()["response"].strip()
-                self._update_conversation_history(message, llm_response)
-                return {"response": llm_response}
-            
-            error_msg = f"LLM request failed with status {response.status_code}"
+            result = None
+            if llm_context is not None:
+                result = await self._complete(
+                    self._build_follow_up_prompt(message), context=llm_context, priority=priority, deadline=deadline, tier=tier
+                )
+                if "response" in result:
+                    self.context_reuses += 1
+                else:
+                    logging.warning("LLM-Anfrage mit gespeichertem Kontext fehlgeschlagen, sende vollständigen Prompt")
+                    result = None
+
+            if result is None:
+                self.full_prompts += 1
+                history, summary = (session["history"], session.get("summary", "")) if use_history else ([], "")
+                full_prompt = self._build_full_prompt(message, role_type, context, history, summary)
+                if coalesce:
+                    key = hashlib.sha1(full_prompt.encode("utf-8")).hexdigest()
+                    result = await self.single_flight.run(
+                        key, lambda: self._complete(full_prompt, priority=priority, deadline=deadline, tier=tier)
+                    )
+                else:
+                    result = await self._complete(full_prompt, priority=priority, deadline=deadline, tier=tier)
+
+            if "response" in result:
+                # Ohne Verlauf erzeugter Ollama-Kontext taugt nicht für Folgefragen der Sitzung
+                llm_context = self._context_entry(signature, result.get("context")) if use_history else None
+                self._update_conversation_history(session_id, message, result["response"], llm_context)
+            return {key: value for key, value in result.items() if key != "context"}
+
+        except LLMOverloadedError:
+            raise  # Die Route antwortet mit 503/429 und Retry-After
+        except Exception as e:
+            error_msg = f"Error generating response: {str(e)}"
             logging.error(error_msg)
             return {"error": error_msg}
 
+    async def _route_intent(self, message: str, role_type: str, context: Optional[Dict]) -> str:
+        """
+        Wähle die Vorlage nach der Absicht der Nachricht, soweit der Kontext sie zulässt:
+        Bestellhinweise und Produktdetails brauchen ein Produkt, Empfehlungen eine Produktliste.
+        """
+        context = context or {}
+        has_product = "product" in context
+        has_products = "available_products" in context or "products" in context
+        if not settings.INTENT_ROUTING or not (has_product or has_products):
+            return role_type  # Ohne Produktbezug gibt es keine andere passende Vorlage
+
+        intent, source = await self.intent_router.aclassify(message)
+        if (intent in ("orderInstructions", "product_specific") and has_product) or (intent == "recommendation" and has_products):
+            if intent != role_type:
+                logging.debug(f"Absicht {intent} ({source}) statt {role_type}")
+            return intent
+        return role_type
+
+    def _select_tier(self, message: str, role_type: str, context: Optional[Dict]) -> str:
+        """
+        Modellstufe für eine Anfrage: kurze allgemeine Chat-Nachrichten ohne Produktbezug an das
+        kleine Modell (falls konfiguriert), alles andere an das grosse.
+        """
+        if (
+            self.pool.has_tier("small")
+            and role_type == "general"
+            and not (context or {}).get("product")
+            and len(message) <= settings.LLM_SMALL_MODEL_MAX_CHARS
+        ):
+            return "small"
+        return "large"
+
+    def _context_signature(self, message: str, role_type: str, context: Optional[Dict], tier: str = "large") -> str:
+        """
+        Kennung des Prompt-Präfixes: Modell, tatsächlich verwendete Vorlage und Kontext ohne Verlauf.
+
+        Nur wenn sie sich seit der letzten Antwort nicht geändert hat, darf der gespeicherte
+        Ollama-Kontext weiterverwendet werden.
+        """
+        context = context or {}
+        if (role_type == "orderInstructions" or self._is_order_related_query(message)) and "product" in context:
+            role_type = "orderInstructions"  # Siehe _get_prompt
+        stable = {key: value for key, value in context.items() if key not in ("history", "message", "user_query")}
+        data = json.dumps([self.pool.model_for(tier), role_type, stable], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _reusable_context(session: Dict[str, Any], signature: str) -> Optional[List[int]]:
+        """Gespeicherter Ollama-Kontext der Sitzung, falls er zum aktuellen Präfix und Verlauf passt"""
+        if not settings.LLM_CONTEXT_REUSE:
+            return None
+        saved = session.get("llm_context")
+        if not saved or saved.get("signature") != signature:
+            return None
+        # Jede Änderung am Verlauf ausserhalb des LLM (Cache, Auswahl ohne LLM) macht den Kontext ungültig
+        if saved.get("turns") != session.get("turns", 0):
+            return None
+        if len(saved["tokens"]) > settings.LLM_CONTEXT_MAX_TOKENS:
+            return None  # Neu beginnen, bevor Ollama den Kontext abschneidet
+        return saved["tokens"]
+
+    @staticmethod
+    def _context_entry(signature: str, tokens: Optional[List[int]]) -> Optional[Dict[str, Any]]:
+        if not settings.LLM_CONTEXT_REUSE or not tokens:
+            return None
+        return {"signature": signature, "tokens": tokens}
+
+    def _build_follow_up_prompt(self, message: str) -> str:
+        """Prompt für eine Folgefrage: Systemanweisung, Vorlage und Verlauf liegen bereits im Kontext"""
+        return f"NOTE: This is NOT the first message in the conversation. DO NOT start with a greeting.\n\nUser asked:\n{message}"
+
+    async def generate_product_blurb(self, product: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Kurze, anfrageunabhängige Beschreibung eines Produkts (wenige Tokens, ohne Gesprächsverlauf).
+
+        Wird verwendet, wenn das Produkt ohne LLM ausgewählt wurde; das Ergebnis kann je Produkt
+        zwischengespeichert werden.
+        """
+        header = product.get("header", {})
+        target = product.get("target_audience", {})
+        specs = product.get("specifications", {}).get("system", {})
+        prompt = self._render_template("productBlurb", {
+            "manufacturer": header.get("manufacturer", ""),
+            "model": header.get("model", ""),
+            "type": header.get("type", ""),
+            "price": header.get("price", ""),
+            "specifications": ", ".join(f"{key}: {value}" for key, value in specs.items() if value and value != "N/A"),
+            "ideal_for": ", ".join(target.get("ideal_for", [])),
+            "not_recommended": ", ".join(target.get("not_recommended", []))
+        })
+        try:
+            key = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+            result = await self.single_flight.run(
+                key,
+                lambda: self._complete(
+                    prompt, max_tokens=settings.RECOMMENDATION_EXPLANATION_MAX_TOKENS, priority="recommendation", tier="small"
+                )
+            )
+            return {key: value for key, value in result.items() if key != "context"}
         except Exception as e:
-            error_msg = f"Error generating response: {str(e)}"
+            error_msg = f"Error generating product blurb: {str(e)}"
             logging.error(error_msg)
             return {"error": error_msg}
 
-    def _get_prompt(self, role_type: str, message: str, context: Dict = None) -> str:
-        """Erstelle einen Prompt basierend auf Rolle und Kontext"""
+    async def _complete(
+        self,
+        full_prompt: str,
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        tier: str = "large"
+    ) -> Dict[str, Any]:
+        """Sende einen Prompt an das LLM (ohne Streaming); liefert auch den neuen Ollama-Kontext"""
+        async with self.scheduler.slot(priority, deadline):
+            result = await self.pool.generate(full_prompt, tier=tier, max_tokens=max_tokens, context=context)
+
+        if result.get("status") == "success":
+            return {"response": result["response"], "context": result.get("context")}
+
+        logging.error(result["error"])
+        return {"error": result["error"]}
+
+    async def generate_response_stream(
+        self,
+        message: str,
+        role_type: str = "general",
+        context: Dict = None,
+        session_id: Optional[str] = None,
+        priority: str = "interactive",
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Generiere eine Antwort vom LLM und gib die Tokens laufend weiter (Ollama NDJSON-Stream)"""
+        session_id = session_id or DEFAULT_SESSION_ID
+        role_type = await self._route_intent(message, role_type, context)
+        session = self.conversation_store.load(session_id)
+        tier = self._select_tier(message, role_type, context)
+        signature = self._context_signature(message, role_type, context, tier)
+        llm_context = self._reusable_context(session, signature)
+        logging.info(f"Sending streaming request to LLM: Tier={tier}, Model={self.pool.model_for(tier)}")
+
+        # Zuerst mit gespeichertem Kontext, bei einem Fehler vor dem ersten Token mit vollem Prompt
+        attempts = [(self._build_follow_up_prompt(message), llm_context)] if llm_context is not None else []
+        attempts.append((None, None))
+
+        chunks = []
+        state: Dict[str, Any] = {}
+        for prompt, attempt_context in attempts:
+            if prompt is None:
+                self.full_prompts += 1
+                prompt = self._build_full_prompt(message, role_type, context, session["history"], session.get("summary", ""))
+            try:
+                # aclosing: bricht der Client ab, wird der Stream zu Ollama sofort geschlossen
+                async with aclosing(self._stream_tokens(prompt, attempt_context, state, priority, deadline, tier)) as tokens:
+                    async for token in tokens:
+                        chunks.append(token)
+                        yield token
+            except RuntimeError:
+                if attempt_context is None or chunks:
+                    raise
+                logging.warning("LLM-Anfrage mit gespeichertem Kontext fehlgeschlagen, sende vollständigen Prompt")
+                continue
+            if attempt_context is not None:
+                self.context_reuses += 1
+            break
+
+        # Gesprächsverlauf erst nach vollständigem Stream aktualisieren
+        self._update_conversation_history(
+            session_id, message, "".join(chunks).strip(), self._context_entry(signature, state.get("context"))
+        )
+
+    async def _stream_tokens(
+        self,
+        prompt: str,
+        context: Optional[List[int]],
+        state: Dict[str, Any],
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+        tier: str = "large"
+    ) -> AsyncIterator[str]:
+        """Tokens eines Ollama-Streams; der neue Kontext der letzten Nachricht landet in state["context"]"""
+        async with self.scheduler.slot(priority, deadline):
+            try:
+                async with aclosing(self.pool.stream(prompt, state, tier=tier, context=context)) as tokens:
+                    async for token in tokens:
+                        yield token
+            except RuntimeError as e:
+                logging.error(str(e))
+                raise
+
+    def _build_full_prompt(
+        self,
+        message: str,
+        role_type: str,
+        context: Dict = None,
+        history: List[Dict] = None,
+        summary: str = ""
+    ) -> str:
+        """Erstelle den vollständigen Prompt inklusive Systemanweisung (Verlauf im Token-Budget)"""
+        history = history or []
+
+        # Füge Systemanweisung hinzu, die das Verhalten des LLM steuert
+        system_instruction = """You are a friendly IT hardware advisor from Novartis. Your main focus is on IT topics and products.
+
+For IT product inquiries: ONLY discuss products that are in the Novartis product database.
+
+For general questions: You may politely and competently answer non-IT related questions, but indicate at the end of your response that you're primarily available for IT-related matters."""
+        
+        is_first_message = len(history) == 0 and not summary
+        system_instruction += f"\nNOTE: This is {'the first' if is_first_message else 'NOT the first'} message in the conversation. {'You may greet the user once.' if is_first_message else 'DO NOT start with a greeting.'}"
+
+        if not self.prompt_builder.enabled:
+            prompt = self._get_prompt(role_type, message, context, history)
+        else:
+            # Vorlage zuerst ohne Verlauf messen; der Rest des Budgets steht dem Verlauf zur Verfügung
+            base = self._get_prompt(role_type, message, dict(context or {}), history, history_text="")
+            available = self.prompt_builder.budget - self.prompt_builder.tokens(system_instruction) - self.prompt_builder.tokens(base)
+            history_text = self.prompt_builder.history_block(history, summary, available)
+            prompt = self._get_prompt(role_type, message, dict(context or {}), history, history_text=history_text)
+        
+        return f"{system_instruction}\n\n{prompt}"
+
+    def _get_prompt(
+        self,
+        role_type: str,
+        message: str,
+        context: Dict = None,
+        history: List[Dict] = None,
+        history_text: Optional[str] = None
+    ) -> str:
+        """Erstelle einen Prompt basierend auf Rolle und Kontext (history_text: bereits formatierter Verlauf)"""
         context = context or {}
         
         # Prüfe, ob es sich um eine bestellungsbezogene Anfrage handelt
         is_order_query = self._is_order_related_query(message)
         
-        # Überschreibe den Rollentyp für bestellungsbezogene Anfragen
-        if is_order_query and "product" in context:
+        # Überschreibe den Rollentyp für bestellungsbezogene Anfragen (oder bereits von _route_intent gewählt)
+        if (is_order_query or role_type == "orderInstructions") and "product" in context:
             role_type = "orderInstructions"
             context["user_query"] = message
             
@@ -106,7 +396,9 @@ For general questions: You may politely and competently answer non-IT related qu
             return self._render_template("orderInstructions", context)
         
         # Formatiere den Gesprächsverlauf
-        recent_history = self._format_history(self.conversation_history[-4:]) if self.conversation_history else ""
+        if history_text is None:
+            history_text = self._format_history(history[-4:]) if history else ""
+        recent_history = history_text
         
         # Behandle verschiedene Rollentypen
         if role_type == "product_specific" and context and "product" in context:
@@ -173,21 +465,11 @@ For general questions: You may politely and competently answer non-IT related qu
     
     def _render_template(self, template_name: str, context: Dict[str, Any]) -> str:
         """Rendere eine Vorlage mit dem gegebenen Kontext"""
-        template = self.templates.get(template_name, self.templates["general"])
-        return Template(template).render(**context)
+        return self._load_template(template_name).render(**context)
     
     def _is_order_related_query(self, message: str) -> bool:
-        """Ermittle, ob eine Nachricht mit einer Bestellung zusammenhängt"""
-        order_keywords = [
-            "order", "purchase", "buy", "get", "acquire", "request", 
-            "availability", "stock", "place an order", "delivery", 
-            "shipping", "lead time", "bestellen", "kaufen", "erwerben",
-            "verfügbarkeit", "lieferung", "bestellung", "einkaufen",
-            "where can i get", "wie kann ich kaufen", "wie bestelle ich"
-        ]
-        
-        lower_message = message.lower()
-        return any(keyword in lower_message for keyword in order_keywords)
+        """Ermittle, ob eine Nachricht mit einer Bestellung zusammenhängt (Regeln des IntentRouter, mit Wortgrenzen)"""
+        return self.intent_router.match(message) == "orderInstructions"
         
     def _format_history(self, history) -> str:
         """Formatiere den Gesprächsverlauf für Prompts"""
@@ -208,17 +490,49 @@ For general questions: You may politely and competently answer non-IT related qu
                     
         return formatted
         
-    def _update_conversation_history(self, user_message: str, assistant_response: str) -> None:
-        """Aktualisiere den Gesprächsverlauf mit neuen Nachrichten"""
+    def add_to_history(self, session_id: Optional[str], user_message: str, assistant_response: str) -> None:
+        """Nimm eine Antwort in den Verlauf auf, die nicht direkt vom LLM kam (z.B. aus dem Ergebnis-Cache)"""
+        self._update_conversation_history(session_id or DEFAULT_SESSION_ID, user_message, assistant_response)
+
+    def _update_conversation_history(
+        self,
+        session_id: str,
+        user_message: str,
+        assistant_response: str,
+        llm_context: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Aktualisiere den Gesprächsverlauf der Sitzung mit neuen Nachrichten (und dem Ollama-Kontext der Antwort)"""
+        session = self.conversation_store.load(session_id)
+        history = session["history"]
+
         # Verwende das neue Format
-        self.conversation_history.append({"type": "user", "content": user_message})
-        self.conversation_history.append({"type": "assistant", "content": assistant_response})
+        history.append({"type": "user", "content": user_message})
+        history.append({"type": "assistant", "content": assistant_response})
         
-        # Begrenze die Verlaufslänge
-        if len(self.conversation_history) > 10:
-            self.conversation_history = self.conversation_history[-10:]
+        # Begrenze die Verlaufslänge; ältere Einträge in die Zusammenfassung übernehmen statt sie zu verwerfen
+        overflow = history[:-settings.CONVERSATION_MAX_ENTRIES]
+        if overflow and self.prompt_builder.enabled:
+            session["summary"] = self.prompt_builder.fold_into_summary(session.get("summary", ""), overflow)
+        session["history"] = history[-settings.CONVERSATION_MAX_ENTRIES:]
+        # Zähler statt Verlaufslänge: die Länge bleibt nach dem Kürzen gleich
+        session["turns"] = session.get("turns", 0) + 1
+        if llm_context is not None:
+            session["llm_context"] = {**llm_context, "turns": session["turns"]}
+        else:
+            session.pop("llm_context", None)
+        self.conversation_store.save(session_id, session)
             
-    def reset_conversation(self) -> Dict[str, str]:
-        """Setze den Gesprächsverlauf zurück"""
-        self.conversation_history = []
+    def context_stats(self) -> Dict[str, Any]:
+        """Anteil der Anfragen, die den gespeicherten Ollama-Kontext wiederverwendet haben"""
+        total = self.context_reuses + self.full_prompts
+        return {
+            "enabled": settings.LLM_CONTEXT_REUSE,
+            "reused": self.context_reuses,
+            "full_prompts": self.full_prompts,
+            "reuse_rate": round(self.context_reuses / total, 4) if total else 0.0
+        }
+
+    def reset_conversation(self, session_id: Optional[str] = None) -> Dict[str, str]:
+        """Setze den Gesprächsverlauf der Sitzung zurück"""
+        self.conversation_store.delete(session_id or DEFAULT_SESSION_ID)
         return {"response": "Conversation has been reset."}
\ No newline at end of file
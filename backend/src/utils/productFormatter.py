@@ -2,8 +2,8 @@ from typing import Dict, Any, List
 
 class ProductFormatter:
     @staticmethod
-    def _parse_tech_specs(tech_specs: str) -> Dict[str, str]:
-        """Parsiere technische Spezifikationen in ein strukturiertes Format"""
+    def parse_tech_specs(tech_specs: str) -> Dict[str, str]:
+        """Parsiere technische Spezifikationen in ein strukturiertes Format (Schlüssel in Kleinbuchstaben)"""
         specs_dict = {}
         if not tech_specs:
             return specs_dict
@@ -32,7 +32,8 @@ class ProductFormatter:
         for spec in specs_list:
             if ':' in spec:
                 key, value = spec.split(':', 1)
-                specs_dict[key.strip()] = value.strip()
+                # Kanonische Schlüssel: Import und Suche verwenden dieselben Namen ('ram', 'cpu', ...)
+                specs_dict[key.strip().lower()] = value.strip()
 
         return specs_dict
 
@@ -69,7 +70,7 @@ class ProductFormatter:
                 "qualification": metadata.get('qualification', 'N/A')
             },
             "specifications": {
-                "system": ProductFormatter._parse_tech_specs(metadata.get('tech_specs', '')),
+                "system": ProductFormatter.parse_tech_specs(metadata.get('tech_specs', '')),
                 "os": metadata.get('os', 'N/A').strip()
             },
             "metadata": {
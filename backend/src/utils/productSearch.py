@@ -1,33 +1,189 @@
-from typing import Dict, Any, List
-from ..database.chromadbClient import ChromaDBClient
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+from ..database.chromadbClient import CatalogState, ChromaDBClient
 from .textAnalyzer import TextAnalyzer
 from .productFormatter import ProductFormatter
+from .searchWorkerPool import SearchWorkerPool
+from .queryFilters import QueryFilterBuilder
+from .bm25Index import reciprocal_rank_fusion
+from .singleFlight import SingleFlight, flight_key
+from ..config.config import settings
+
+# Auswählbare Suchverfahren
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
 
 class ProductSearch:
-    def __init__(self):
+    def __init__(self, use_worker_pool: bool = True):
         self.db_client = ChromaDBClient()  # Datenbank-Client für Produktsuche
         self.text_analyzer = TextAnalyzer()  # Textanalyse-Tool
         self.formatter = ProductFormatter()  # Formatter für Produktdaten
+        # Pool, der die Suche ausserhalb des Event-Loops ausführt
+        self.worker_pool = SearchWorkerPool(self) if use_worker_pool else None
+        # Gleichzeitige identische Suchen teilen sich eine Berechnung
+        self.single_flight = SingleFlight()
+
+    async def _run(self, method: str, *args) -> Dict[str, Any]:
+        """Führe eine Suchmethode im Worker-Pool aus (ohne Pool direkt)"""
+        if self.worker_pool is None:
+            return getattr(self, method)(*args)
+        return await self.worker_pool.run(method, *args)
+
+    async def asearch(self, query: str, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
+        """Asynchrone Produktsuche im Worker-Pool, blockiert den Event-Loop nicht"""
+        key = flight_key("search", query, filters, retrieval)
+        return await self.single_flight.run(key, lambda: self._run("search", query, filters, retrieval))
+
+    async def asearch_with_advice(self, query: str, single_product: bool = True, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
+        """Asynchrone Produktsuche mit Empfehlungen im Worker-Pool"""
+        key = flight_key("search_with_advice", query, single_product, filters, retrieval)
+        return await self.single_flight.run(key, lambda: self._run("search_with_advice", query, single_product, filters, retrieval))
+
+    async def asearch_ranked(self, query: str, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
+        """Asynchrone Suche mit Distanzen und angewendeten Filtern (für die Auswahl ohne LLM)"""
+        key = flight_key("search_ranked", query, filters, retrieval)
+        return await self.single_flight.run(key, lambda: self._run("search_ranked", query, filters, retrieval))
+
+    def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Einzelnes Produkt per ID aus dem Katalogindex"""
+        return self.db_client.get_product(product_id)
+
+    def get_facets(self) -> Dict[str, Any]:
+        """Facetten (Wert -> Anzahl) und Preisspanne für die Filteroberfläche"""
+        catalog_index = self._current_state().catalog_index
+        catalog_index.refresh()
+        return catalog_index.describe()
+
+    def _current_state(self) -> CatalogState:
+        """
+        Aktiver Katalogstand (Collection, Produktdatensätze, Katalogindex) für eine Anfrage.
+
+        Eine Suche verwendet durchgehend denselben Stand, damit Filter, BM25 und die Zuordnung der
+        Treffer nicht über eine gleichzeitige Blue/Green-Umschaltung hinweg gemischt werden.
+        """
+        self.db_client.sync_active_collection()
+        return self.db_client.state
+
+    def _get_products(self, results: Dict[str, Any], state: CatalogState) -> List[Dict[str, Any]]:
+        """Ordne die Suchtreffer den vorberechneten Datensätzen zu (Fallback: Metadaten formatieren)"""
+        return [record for _, record in self._resolve_hits(results, state)]
+
+    def _resolve_hits(self, results: Dict[str, Any], state: CatalogState) -> List[Tuple[int, Dict[str, Any]]]:
+        """Datensätze der Treffer zusammen mit ihrer Position im Suchergebnis"""
+        state.catalog_index.refresh()
+        hits = []
+        for idx, product_id in enumerate(results["ids"][0]):
+            record = state.record_store.get(product_id)
+            if record is None:
+                metadata = results["metadatas"][0][idx]
+                if metadata is None:
+                    continue  # Reiner BM25-Treffer, dessen Datensatz inzwischen entfernt wurde
+                # Datenbestand wurde vor Einführung der Datensätze importiert
+                record = self.formatter.format_product(metadata, product_id)
+            hits.append((idx, record))
+        return hits
+
+    def _build_filters(
+        self, query: str, filters: Optional[Dict[str, Any]], state: CatalogState, extract: bool = settings.SEARCH_EXTRACT_FILTERS
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Strukturierte und (optional) aus der Anfrage erkannte Filter, zusätzlich als where-Klausel"""
+        state.catalog_index.refresh()
+        # Kategoriewerte gegen den Katalogindex desselben Stands auflösen
+        applied, where = QueryFilterBuilder(state.catalog_index).build(query, filters, extract=extract)
+        if applied:
+            logging.debug(f"Angewendete Filter: {applied}")
+        return applied, where
+
+    def _retrieve(self, query: str, filters: Optional[Dict[str, Any]], retrieval: Optional[str], state: CatalogState) -> Dict[str, Any]:
+        """
+        Sucht Kandidaten per Vektorsuche, BM25 oder beidem und gibt sie im ChromaDB-Ergebnisformat
+        zurück, ergänzt um die angewendeten Filter unter "filters".
+
+        Im Hybridmodus werden beide Ranglisten per Reciprocal Rank Fusion zusammengeführt; BM25
+        findet exakte Begriffe wie Modellnummern, die Vektorsuche die inhaltliche Ähnlichkeit.
+        """
+        retrieval = retrieval or settings.SEARCH_RETRIEVAL
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unbekanntes Suchverfahren: {retrieval}")
+        applied, where = self._build_filters(query, filters, state)
+        results = self._retrieve_filtered(query, applied, where, retrieval, state)
+        if results["ids"][0] or not settings.SEARCH_EXTRACT_FILTERS:
+            return results
+
+        # Erkannte Filter sind nur Vermutungen: ohne Treffer nur mit den explizit übergebenen Filtern suchen
+        explicit, explicit_where = self._build_filters(query, filters, state, extract=False)
+        if explicit == applied:
+            return results
+        logging.info(f"Keine Treffer mit erkannten Filtern {applied}, suche nur mit {explicit or 'keinen Filtern'}")
+        return self._retrieve_filtered(query, explicit, explicit_where, retrieval, state)
+
+    def _retrieve_filtered(
+        self, query: str, applied: Dict[str, Any], where: Optional[Dict[str, Any]], retrieval: str, state: CatalogState
+    ) -> Dict[str, Any]:
+        """Eine Suche mit festen Filtern (siehe _retrieve)"""
+        lexical_index = state.catalog_index.lexical
+        if retrieval != "vector" and not len(lexical_index):
+            retrieval = "vector"  # Datenbestand wurde vor Einführung des BM25-Index importiert
+        if retrieval == "vector":
+            results = self.db_client.search_products(self.text_analyzer.get_embedding(query), limit=settings.SEARCH_LIMIT, where=where, state=state)
+            return {**results, "filters": applied}
+
+        candidates = settings.SEARCH_HYBRID_CANDIDATES
+        lexical_hits = lexical_index.search(query, candidates, state.catalog_index.filter_ids(applied))
+        logging.debug(f"BM25-Treffer: {lexical_hits[:3]}")
+
+        vector = {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+        if retrieval == "lexical":
+            ranked = lexical_hits[:settings.SEARCH_LIMIT]
+        else:
+            vector = self.db_client.search_products(self.text_analyzer.get_embedding(query), limit=candidates, where=where, state=state)
+            ranked = reciprocal_rank_fusion(
+                [vector["ids"][0], [doc_id for doc_id, _ in lexical_hits]]
+            )[:settings.SEARCH_LIMIT]
+
+        # Metadaten und Distanzen liegen nur für Treffer der Vektorsuche vor
+        metadatas = dict(zip(vector["ids"][0], vector["metadatas"][0]))
+        distances = dict(zip(vector["ids"][0], (vector.get("distances") or [[]])[0]))
+        ids = [doc_id for doc_id, _ in ranked]
+        return {
+            "ids": [ids],
+            "metadatas": [[metadatas.get(doc_id) for doc_id in ids]],
+            "distances": [[distances.get(doc_id) for doc_id in ids]],
+            "scores": [[score for _, score in ranked]],
+            "filters": applied
+        }
+
+    def search_ranked(self, query: str, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Produktsuche, die zusätzlich Distanzen, Distanzmetrik und angewendete Filter zurückgibt.
+
+        :return: {"products", "distances" (je Produkt, None bei reinen BM25-Treffern), "space", "filters"}
+        """
+        state = self._current_state()
+        results = self._retrieve(query, filters, retrieval, state)
+        distances = (results.get("distances") or [[]])[0]
+        hits = self._resolve_hits(results, state)
+        return {
+            "products": [record for _, record in hits],
+            "distances": [distances[idx] if idx < len(distances) else None for idx, _ in hits],
+            "space": (state.collection.metadata or {}).get("hnsw:space", "l2"),
+            "filters": results["filters"]
+        }
 
-    def search(self, query: str) -> Dict[str, Any]:
+    def search(self, query: str, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
         """Einfache Produktsuche mit Debug-Ausgabe"""
         try:
             print(f"[DEBUG] 🔍 Anfrage erhalten: {query}")
-            # Erstelle Embedding für die Anfrage
-            query_embedding = self.text_analyzer.get_embedding(query)
-            # Suche Produkte in der Datenbank
-            results = self.db_client.search_products(query_embedding)
+            # Suche Produkte in der Datenbank (Filter schränken die Kandidaten vorab ein)
+            state = self._current_state()
+            results = self._retrieve(query, filters, retrieval, state)
 
             # Debug: Anzahl der Ergebnisse und Beispiel-Metadaten
             print(f"[DEBUG] ✅ ChromaDB Ergebnisanzahl: {len(results['metadatas'][0])}")
             for idx, meta in enumerate(results["metadatas"][0][:3]):
                 print(f"[DEBUG] ➤ Metadaten {idx+1}:", meta)
 
-            # Formatiere die gefundenen Produkte
-            products = [
-                self.formatter.format_product(metadata, results["ids"][0][idx])
-                for idx, metadata in enumerate(results["metadatas"][0])
-            ]
+            # Vorberechnete Produktdatensätze abrufen
+            products = self._get_products(results, state)
 
             print(f"[DEBUG] 📦 Formatierte Produkte (erstes 1): {products[:1]}")  # Zeigt 1 Beispielprodukt
             return self.formatter.format_search_result(products)
@@ -39,19 +195,15 @@ class ProductSearch:
                 f"Fehler bei der Suche: {str(e)}"
             )
 
-    def search_with_advice(self, query: str, single_product: bool = True) -> Dict[str, Any]:
+    def search_with_advice(self, query: str, single_product: bool = True, filters: Optional[Dict[str, Any]] = None, retrieval: Optional[str] = None) -> Dict[str, Any]:
         """Produktsuche mit Empfehlungen"""
         try:
-            # Erstelle Embedding für die Anfrage
-            query_embedding = self.text_analyzer.get_embedding(query)
-            # Suche Produkte in der Datenbank
-            results = self.db_client.search_products(query_embedding)
+            # Suche Produkte in der Datenbank (Filter schränken die Kandidaten vorab ein)
+            state = self._current_state()
+            results = self._retrieve(query, filters, retrieval, state)
 
-            # Formatiere die gefundenen Produkte
-            products = [
-                self.formatter.format_product(metadata, results["ids"][0][idx])
-                for idx, metadata in enumerate(results["metadatas"][0])
-            ]
+            # Vorberechnete Produktdatensätze abrufen
+            products = self._get_products(results, state)
 
             if not products:
                 return self.formatter.format_search_result(
@@ -80,12 +232,12 @@ class ProductSearch:
                 # Wichtige Spezifikationen hinzufügen, falls verfügbar
                 if specs:
                     key_specs = []
-                    if 'RAM' in specs:
-                        key_specs.append(f"RAM: {specs['RAM']}")
-                    if 'CPU' in specs:
-                        key_specs.append(f"CPU: {specs['CPU']}")
-                    if 'Storage' in specs:
-                        key_specs.append(f"Speicher: {specs['Storage']}")
+                    if 'ram' in specs:
+                        key_specs.append(f"RAM: {specs['ram']}")
+                    if 'cpu' in specs:
+                        key_specs.append(f"CPU: {specs['cpu']}")
+                    if 'storage' in specs:
+                        key_specs.append(f"Speicher: {specs['storage']}")
                     if key_specs:
                         message += f"\n   Spezifikationen: {', '.join(key_specs)}"
                 
@@ -0,0 +1,115 @@
+from typing import Dict, Any, List
+import math
+import re
+from ..config.config import settings
+
+HISTORY_HEADER = "\n--- CONVERSATION HISTORY ---\n"
+SUMMARY_HEADER = "\n--- SUMMARY OF EARLIER CONVERSATION ---\n"
+SUMMARY_ENTRY_CHARS = 160  # Höchstlänge eines Eintrags in der Zusammenfassung
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str, chars_per_token: float = settings.PROMPT_CHARS_PER_TOKEN) -> int:
+    """
+    Schätzt die Tokenzahl eines Textes ohne den Tokenizer des Modells.
+
+    Der Faktor Zeichen pro Token lässt sich mit src/tests/promptBudgetBenchmark.py gegen den
+    prompt_eval_count von Ollama kalibrieren.
+    """
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+def format_entry(entry: Dict[str, Any]) -> str:
+    """Eine Zeile des Gesprächsverlaufs im Format von LLMService._format_history"""
+    return f"{'User' if entry.get('type') == 'user' else 'Assistant'}: {entry.get('content', '')}\n"
+
+def compress_entry(entry: Dict[str, Any], max_chars: int = SUMMARY_ENTRY_CHARS) -> str:
+    """Kurzform eines Eintrags für die Zusammenfassung: erster Satz, bei Bedarf gekürzt"""
+    content = " ".join(str(entry.get("content", "")).split())
+    first = _SENTENCE_END.split(content, 1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars - 1].rstrip() + "…"
+    return f"{'User' if entry.get('type') == 'user' else 'Assistant'}: {first}"
+
+class PromptBuilder:
+    """
+    Setzt den Gesprächsverlauf innerhalb eines Token-Budgets zusammen.
+
+    Die neuesten Einträge werden wörtlich übernommen, solange sie ins Budget passen; einzelne
+    sehr lange Einträge (z.B. eingefügte Produktbeschreibungen) werden gekürzt. Ältere Einträge
+    gehen nicht verloren, sondern werden in eine fortlaufende, extraktive Zusammenfassung
+    übernommen, die in der Sitzung gespeichert wird und ebenfalls ein festes Budget hat.
+    """
+
+    def __init__(
+        self,
+        budget: int = settings.PROMPT_TOKEN_BUDGET,
+        history_budget: int = settings.PROMPT_HISTORY_TOKENS,
+        summary_budget: int = settings.PROMPT_SUMMARY_TOKENS,
+        chars_per_token: float = settings.PROMPT_CHARS_PER_TOKEN
+    ):
+        self.budget = budget
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.chars_per_token = chars_per_token
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def fold_into_summary(self, summary: str, entries: List[Dict[str, Any]]) -> str:
+        """
+        Ergänzt die fortlaufende Zusammenfassung um ältere Einträge.
+
+        Überschreitet sie ihr Budget, fallen die ältesten Zeilen zuerst weg.
+        """
+        lines = [line for line in summary.split("\n") if line]
+        lines += [compress_entry(entry) for entry in entries]
+        while lines and self.tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def _truncate(self, line: str, max_tokens: int) -> str:
+        max_chars = int(max_tokens * self.chars_per_token)
+        if len(line) <= max_chars:
+            return line
+        return line[:max(max_chars - 2, 0)].rstrip() + "…\n"
+
+    def _fit(self, history: List[Dict[str, Any]], budget: int) -> List[str]:
+        """Neueste Einträge (je höchstens ein halbes Budget), solange sie ins Budget passen"""
+        kept: List[str] = []
+        used = 0
+        for entry in reversed(history):
+            line = self._truncate(format_entry(entry), max(budget // 2, 1))
+            cost = self.tokens(line)
+            if used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+        return kept
+
+    def history_block(self, history: List[Dict[str, Any]], summary: str, available_tokens: int) -> str:
+        """
+        Verlauf samt Zusammenfassung für den Prompt.
+
+        :param history: Gespeicherte Einträge der Sitzung ({"type", "content"}).
+        :param summary: Gespeicherte Zusammenfassung älterer Einträge.
+        :param available_tokens: Was nach Systemanweisung und Vorlage vom Gesamtbudget übrig bleibt.
+        """
+        budget = min(self.history_budget, max(available_tokens, 0))
+        if budget <= 0 or not (history or summary):
+            return ""
+
+        kept = self._fit(history, budget)
+        if summary or len(kept) < len(history):
+            # Platz für die Zusammenfassung reservieren und den Rest erneut verteilen
+            kept = self._fit(history, max(budget - self.summary_budget, 0))
+            summary = self.fold_into_summary(summary, history[:len(history) - len(kept)])
+
+        block = f"{SUMMARY_HEADER}{summary}\n" if summary else ""
+        if kept:
+            block += HISTORY_HEADER + "".join(kept)
+        return block
@@ -0,0 +1,182 @@
+from typing import Dict, Any, List, Optional, Tuple
+import re
+from ..database.catalogIndex import CatalogIndex
+
+# Währungen und Preiswörter; nur Zahlen mit einem davon gelten als Preis
+_CURRENCY = r"(?:chf|franken|fr\.?|euro|eur|€)(?![a-zäöü])"
+_PRICE_WORD = r"(?:preis(?:e|grenze|rahmen)?|price[sd]?|budget|kostet|kosten|costs?|costing)"
+# Einheiten, nach denen eine Zahl kein Preis ist (Speicher, Gewicht, Grösse, Frequenz, Leistung, Laufzeit)
+_UNIT = r"(?:[kmgt]b|kg|g|mm|cm|zoll|inch(?:es)?|[kmg]?hz|w|wh|mah|h|std|stunden|hours?)\b|[\"”″%]"
+
+# Betragsangabe mit optionaler Währung, z.B. "1500", "1'500 CHF", "CHF 1.500", "2k Fr."
+_AMOUNT = (
+    rf"(?P<currency_before>{_CURRENCY})?\s*"
+    r"(?P<number>\d{1,3}(?:['’.,]\d{3})+|\d+(?:[.,]\d+)?)(?![.,'’]?\d)"
+    r"(?:\s?(?P<thousands>k)\b)?"
+    rf"(?!\s*(?:{_UNIT}))"
+    rf"(?:\s*(?P<currency_after>{_CURRENCY}))?"
+)
+# Verbindung zwischen Preiswort und Betrag: "Budget von 1500", "price of", "Preis: 1200"
+_LINK = r"(?:\s+(?:von|of|is|ist)\b|\s*:)?\s*"
+
+def _price_pattern(bounds: str) -> re.Pattern:
+    """Grenze und Betrag, optional mit Preiswort davor oder danach ("Preis unter 1500", "max. Budget 2000")"""
+    return re.compile(
+        rf"(?:\b(?P<price_word>{_PRICE_WORD}){_LINK})?{bounds}\s*(?:(?P<price_word_after>{_PRICE_WORD}){_LINK})?{_AMOUNT}",
+        re.IGNORECASE
+    )
+
+# Preisobergrenze: "unter 1500 CHF", "price under 1500", "max. 2000 Fr.", "Preis bis 1200", "< 1000 CHF", "budget 1500"
+_MAX_PRICE_PATTERNS = (
+    _price_pattern(r"(?:\b(?:unterhalb|unter|under|below|bis|höchstens|hoechstens|maximal|maximum|max\.?|weniger als|less than)|<=?)"),
+    re.compile(rf"\b(?P<price_word>budget){_LINK}{_AMOUNT}", re.IGNORECASE)
+)
+# Preisuntergrenze: "über 1000 CHF", "ab 800 Fr.", "Preis mindestens 500", "> 1000 CHF"
+_MIN_PRICE_PATTERNS = (
+    _price_pattern(r"(?:\b(?:über|ueber|over|above|ab|mindestens|at least|more than|mehr als)|>=?)"),
+)
+
+# Schlüsselwörter für Betriebssysteme -> Teilstring der Katalogwerte
+_OS_KEYWORDS = {
+    "windows": "win", "win10": "win10", "win11": "win11",
+    "mac": "mac", "macos": "mac",
+    "linux": "linux", "ubuntu": "linux"
+}
+
+# Synonyme für Produkttypen -> Teilstring der Katalogwerte
+_TYPE_KEYWORDS = {
+    "laptop": "laptop", "notebook": "laptop", "laptops": "laptop",
+    "monitor": "monitor", "bildschirm": "monitor", "monitore": "monitor",
+    "desktop": "desktop", "workstation": "workstation", "pc": "desktop",
+    "tablet": "tablet", "ipad": "tablet"
+}
+
+# Felder, die als Gleichheits-/Mengenfilter an ChromaDB übergeben werden
+_CATEGORICAL_FIELDS = ("type", "manufacturer", "os", "qualification")
+
+def _parse_amount(number: str, thousands: Optional[str]) -> float:
+    """Wandelt eine Betragsangabe mit Tausendertrennzeichen in eine Zahl um"""
+    if re.fullmatch(r"\d{1,3}(?:['’.,]\d{3})+", number):
+        value = float(re.sub(r"['’.,]", "", number))
+    else:
+        value = float(number.replace(",", "."))
+    return value * 1000 if thousands else value
+
+def extract_price_range(query: str) -> Dict[str, float]:
+    """
+    Erkennt Preisgrenzen (min_price/max_price) in einer Anfrage.
+
+    Eine Zahl zählt nur als Preis, wenn eine Währung oder ein Preiswort daneben steht und keine
+    Einheit folgt ("bis 27 Zoll", "mindestens 16 GB" und "unter 2 kg" sind keine Preise).
+    """
+    extracted: Dict[str, float] = {}
+    for key, patterns in (("max_price", _MAX_PRICE_PATTERNS), ("min_price", _MIN_PRICE_PATTERNS)):
+        for match in (found for pattern in patterns for found in pattern.finditer(query)):
+            groups = match.groupdict()
+            if any(groups.get(group) for group in ("price_word", "price_word_after", "currency_before", "currency_after")):
+                extracted[key] = _parse_amount(groups["number"], groups["thousands"])
+                break
+    return extracted
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9äöüéè]+", text.lower())
+
+class QueryFilterBuilder:
+    """
+    Erzeugt Metadatenfilter für die Vektorsuche.
+
+    Kombiniert strukturierte Filter aus ProductQuery.filters mit einfachen Bedingungen, die aus
+    der natürlichsprachigen Anfrage erkannt werden (Preisgrenzen, Betriebssystem, Typ, Hersteller).
+    Kategoriewerte werden auf die tatsächlich im Katalog vorhandenen Werte abgebildet.
+    """
+
+    def __init__(self, catalog_index: CatalogIndex):
+        self.catalog_index = catalog_index
+
+    def build(self, query: str, filters: Optional[Dict[str, Any]] = None, extract: bool = True) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Erstellt die anzuwendenden Filter und die passende ChromaDB-where-Klausel.
+
+        :param query: Die natürlichsprachige Suchanfrage.
+        :param filters: Strukturierte Filter (type, manufacturer, os, qualification, price_chf/min_price/max_price).
+        :param extract: Ob Bedingungen aus der Anfrage erkannt werden sollen.
+        :return: (angewendete Filter, where-Klausel oder None)
+        """
+        applied = self.extract(query) if extract else {}
+        # Explizit übergebene Filter haben Vorrang vor erkannten
+        applied.update(self.normalize(filters or {}))
+        return applied, self.to_where(applied)
+
+    def normalize(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Bringt strukturierte Filter in eine einheitliche Form"""
+        normalized: Dict[str, Any] = {}
+        for field in _CATEGORICAL_FIELDS:
+            value = filters.get(field)
+            if value:
+                requested = value if isinstance(value, list) else [value]
+                normalized[field] = self._resolve_values(field, [str(v) for v in requested])
+
+        price = filters.get("price_chf") if isinstance(filters.get("price_chf"), dict) else {}
+        min_price = filters.get("min_price", price.get("min"))
+        max_price = filters.get("max_price", price.get("max"))
+        if min_price is not None:
+            normalized["min_price"] = float(min_price)
+        if max_price is not None:
+            normalized["max_price"] = float(max_price)
+        return normalized
+
+    def extract(self, query: str) -> Dict[str, Any]:
+        """Erkennt einfache Bedingungen in der natürlichsprachigen Anfrage"""
+        extracted: Dict[str, Any] = dict(extract_price_range(query))
+
+        words = set(_words(query))
+        for field, keywords in (("os", _OS_KEYWORDS), ("type", _TYPE_KEYWORDS)):
+            fragments = [fragment for word, fragment in keywords.items() if word in words]
+            values = self._resolve_values(field, fragments) if fragments else []
+            # Nur übernehmen, wenn der Katalog passende Werte enthält
+            if values:
+                extracted[field] = values
+
+        manufacturers = [
+            value for value in self.catalog_index.facets.get("manufacturer", {})
+            if value.lower() in words
+        ]
+        if manufacturers:
+            extracted["manufacturer"] = manufacturers
+
+        return extracted
+
+    def _resolve_values(self, field: str, requested: List[str]) -> List[str]:
+        """Bildet angefragte Werte (exakt oder als Teilstring) auf Katalogwerte ab"""
+        catalog_values = list(self.catalog_index.facets.get(field, {}))
+        if not catalog_values:
+            return requested  # Ohne Katalogindex die Werte unverändert verwenden
+
+        resolved = []
+        for request in requested:
+            request_lower = _OS_KEYWORDS.get(request.lower(), request.lower()) if field == "os" else request.lower()
+            for value in catalog_values:
+                if (value.lower() == request_lower or request_lower in value.lower()) and value not in resolved:
+                    resolved.append(value)
+        return resolved
+
+    @staticmethod
+    def to_where(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Übersetzt die Filter in eine ChromaDB-where-Klausel"""
+        conditions = []
+        for field in _CATEGORICAL_FIELDS:
+            if field not in filters:
+                continue
+            values = filters[field]
+            # Leere Werteliste: kein Produkt erfüllt den Filter
+            conditions.append({field: {"$in": values}} if values else {field: {"$in": ["__none__"]}})
+        if "min_price" in filters:
+            conditions.append({"price_chf": {"$gte": filters["min_price"]}})
+        if "max_price" in filters:
+            conditions.append({"price_chf": {"$lte": filters["max_price"]}})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
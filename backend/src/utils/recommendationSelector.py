@@ -0,0 +1,137 @@
+from typing import Dict, Any, List, Optional
+import logging
+from ..config.config import settings
+from ..database.catalogIndex import filter_fit, record_price
+from .resultCache import ResultCache
+
+# Abzüge für nicht erfüllte Filterbedingungen bzw. ein überschrittenes Budget
+FILTER_PENALTY = 0.2
+PRICE_PENALTY = 0.2
+
+def similarity_from_distance(distance: Optional[float], space: str) -> Optional[float]:
+    """Rechnet eine ChromaDB-Distanz in eine Kosinus-Ähnlichkeit um (normalisierte Embeddings)"""
+    if distance is None:
+        return None
+    if space == "l2":
+        return 1.0 - distance / 2.0  # Quadrierte L2-Distanz: 2 - 2 * cos
+    return 1.0 - distance  # "cosine" und "ip"
+
+def price_fit(record: Dict[str, Any], filters: Dict[str, Any]) -> float:
+    """1.0 im gewünschten Preisbereich, sonst abnehmend mit der Abweichung (0.5 bei unbekanntem Preis)"""
+    min_price, max_price = filters.get("min_price"), filters.get("max_price")
+    if min_price is None and max_price is None:
+        return 1.0
+    price = record_price(record)
+    if price is None or price <= 0:
+        return 0.5
+    if max_price is not None and price > max_price:
+        return max(0.0, max_price / price)
+    if min_price is not None and price < min_price:
+        return max(0.0, price / min_price)
+    return 1.0
+
+class RecommendationSelector:
+    """
+    Wählt das empfohlene Produkt ohne LLM, wenn der beste Treffer eindeutig vorne liegt.
+
+    Jeder Kandidat erhält einen Score aus der Ähnlichkeit der Vektorsuche, abzüglich Strafen für
+    nicht erfüllte Filter und ein unpassendes Budget. Liegt der beste Score über der
+    Mindestähnlichkeit und mit genügend Abstand vor dem zweitbesten, wird er direkt gewählt; sonst
+    entscheidet wie bisher das LLM. Die Begründung kommt dann aus einer kurzen, je Produkt und
+    Katalogversion zwischengespeicherten Beschreibung.
+    """
+
+    def __init__(self, llm_service, blurb_cache: Optional[ResultCache] = None):
+        self.llm_service = llm_service
+        # Kurzbeschreibungen je Produkt, bis zum nächsten Import gültig
+        self.blurbs = blurb_cache or ResultCache(max_entries=1000, ttl_seconds=settings.RECOMMENDATION_CACHE_TTL_SECONDS)
+        self.fast_path = 0
+        self.llm_path = 0
+
+    def score(self, ranked: Dict[str, Any], limit: int = 3) -> List[Optional[float]]:
+        """Scores der ersten limit Kandidaten (None für Treffer ohne Distanz, z.B. reine BM25-Treffer)"""
+        scores = []
+        filters = ranked.get("filters") or {}
+        for record, distance in list(zip(ranked["products"], ranked["distances"]))[:limit]:
+            similarity = similarity_from_distance(distance, ranked.get("space", "l2"))
+            if similarity is None:
+                scores.append(None)
+                continue
+            scores.append(
+                similarity
+                - FILTER_PENALTY * (1.0 - filter_fit(record, filters))
+                - PRICE_PENALTY * (1.0 - price_fit(record, filters))
+            )
+        return scores
+
+    def select(self, ranked: Dict[str, Any], limit: int = 3) -> Optional[int]:
+        """
+        Index des eindeutig besten Kandidaten oder None, wenn das LLM entscheiden soll.
+
+        :param ranked: Ergebnis von ProductSearch.search_ranked.
+        :param limit: Anzahl Kandidaten, aus denen sonst das LLM wählt.
+        """
+        scores = self.score(ranked, limit)
+        selected = None
+        # Ohne Distanz für alle Kandidaten ist kein fairer Vergleich möglich
+        if scores and None not in scores:
+            best = max(range(len(scores)), key=scores.__getitem__)
+            runner_up = max((score for idx, score in enumerate(scores) if idx != best), default=None)
+            if scores[best] >= settings.RECOMMENDATION_FAST_PATH_MIN_SIMILARITY and (
+                runner_up is None or scores[best] - runner_up >= settings.RECOMMENDATION_FAST_PATH_MARGIN
+            ):
+                selected = best
+
+        logging.debug(f"Auswahl-Scores: {[round(score, 3) if score is not None else None for score in scores]} -> {selected}")
+        if selected is None:
+            self.llm_path += 1
+        else:
+            self.fast_path += 1
+        return selected
+
+    async def explain(self, product: Dict[str, Any], catalog_version: str) -> str:
+        """Begründung für ein ohne LLM gewähltes Produkt (gecacht je Produkt und Katalogversion)"""
+        product_id = str(product.get("id", ""))
+        cached = self.blurbs.get(product_id, catalog_version)
+        if cached is not None:
+            return cached["text"]
+
+        text = None
+        if settings.RECOMMENDATION_EXPLANATION == "llm":
+            response = await self.llm_service.generate_product_blurb(product)
+            text = response.get("response")
+            if not text:
+                # Nicht cachen, damit das nächste Mal wieder das LLM gefragt wird
+                logging.warning(f"Kurzbeschreibung für {product_id} fehlgeschlagen: {response.get('error')}")
+                return self.template_blurb(product)
+        else:
+            text = self.template_blurb(product)
+        self.blurbs.put(product_id, catalog_version, {"text": text})
+        return text
+
+    @staticmethod
+    def template_blurb(product: Dict[str, Any]) -> str:
+        """Beschreibung aus den Produktdaten, ohne LLM"""
+        header = product.get("header", {})
+        specs = product.get("specifications", {}).get("system", {})
+        ideal_for = product.get("target_audience", {}).get("ideal_for", [])
+
+        text = f"I recommend the {header.get('name') or header.get('model', 'device')}"
+        if header.get("type") and header["type"] != "N/A":
+            text += f" ({header['type']})"
+        text += "."
+        key_specs = [f"{label} {specs[key]}" for key, label in (("cpu", "CPU"), ("ram", "RAM"), ("storage", "storage")) if specs.get(key)]
+        if key_specs:
+            text += f" It comes with {', '.join(key_specs)}."
+        if ideal_for:
+            text += f" It is ideal for {', '.join(ideal_for[:2])}."
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.fast_path + self.llm_path
+        return {
+            "fast_path": self.fast_path,
+            "llm_path": self.llm_path,
+            "fast_path_rate": round(self.fast_path / total, 4) if total else 0.0,
+            "blurbs": self.blurbs.stats()
+        }
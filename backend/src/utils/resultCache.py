@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import threading
+import time
+import numpy as np
+from ..config.config import settings
+from .singleFlight import flight_key
+
+class ResultCache:
+    """
+    TTL+LRU-Cache für fertige Antworten (z.B. Empfehlungen samt LLM-Text).
+
+    Der Schlüssel enthält die normalisierte Anfrage, die Katalogversion und weitere Parameter
+    (Filter, Suchverfahren). Nach einem Import ändert sich die Katalogversion, alte Einträge
+    werden dadurch nicht mehr getroffen und fallen nach und nach aus dem LRU heraus.
+
+    Im semantischen Modus wird bei einem exakten Fehltreffer zusätzlich die Anfrage mit der
+    grössten Kosinusähnlichkeit (gleiche Katalogversion und Parameter) gesucht und verwendet,
+    wenn sie über similarity_threshold liegt.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 900,
+        semantic: bool = False,
+        similarity_threshold: float = 0.95
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        # Schlüssel -> (Ablaufzeit, Gruppe, Embedding, Antwort)
+        self._entries: OrderedDict[str, Tuple[float, str, Optional[np.ndarray], Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _group(version: str, params: tuple) -> str:
+        """Einträge derselben Gruppe dürfen sich semantisch vertreten (gleicher Katalog, gleiche Filter)"""
+        return json.dumps([version, *params], sort_keys=True, ensure_ascii=False, default=str)
+
+    def get(self, query: str, version: str, params: tuple = (), embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Sucht eine gespeicherte Antwort.
+
+        :param query: Anfrage des Benutzers (wird normalisiert).
+        :param version: Katalogversion, siehe ChromaDBClient.catalog_version().
+        :param params: Weitere Parameter, die das Ergebnis beeinflussen (JSON-serialisierbar).
+        :param embedding: Anfrage-Embedding, nur für den semantischen Modus nötig.
+        :return: Die Antwort oder None.
+        """
+        key = flight_key("result", query, version, *params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[3]
+                del self._entries[key]
+                self.expired += 1
+
+            if self.semantic and embedding is not None:
+                payload = self._nearest(self._group(version, params), embedding, now)
+                if payload is not None:
+                    self.semantic_hits += 1
+                    return payload
+
+            self.misses += 1
+            return None
+
+    def _nearest(self, group: str, embedding: List[float], now: float) -> Optional[Dict[str, Any]]:
+        """Ähnlichste gültige Anfrage derselben Gruppe (linearer Durchlauf, der Cache ist klein)"""
+        candidates = [
+            (key, entry) for key, entry in self._entries.items()
+            if entry[1] == group and entry[2] is not None and entry[0] > now
+        ]
+        if not candidates:
+            return None
+        matrix = np.stack([entry[2] for _, entry in candidates])
+        similarities = matrix @ self._unit(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        key, entry = candidates[best]
+        self._entries.move_to_end(key)
+        return entry[3]
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def put(self, query: str, version: str, payload: Dict[str, Any], params: tuple = (), embedding: Optional[List[float]] = None) -> None:
+        """Speichert eine Antwort (Parameter wie bei get)"""
+        if not self.enabled:
+            return
+        key = flight_key("result", query, version, *params)
+        vector = self._unit(embedding) if self.semantic and embedding is not None else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, self._group(version, params), vector, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "semantic": self.semantic,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0
+            }
+
+def create_recommendation_cache() -> ResultCache:
+    """Ergebnis-Cache für Empfehlungen gemäss Konfiguration"""
+    return ResultCache(
+        settings.RECOMMENDATION_CACHE_SIZE,
+        settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+        settings.RECOMMENDATION_CACHE_SEMANTIC,
+        settings.RECOMMENDATION_CACHE_SIMILARITY
+    )
@@ -0,0 +1,108 @@
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Optional
+import asyncio
+import functools
+import logging
+from ..config.config import settings
+
+class SearchOverloadedError(Exception):
+    """Wird ausgelöst, wenn der Such-Pool ausgelastet ist und keine weiteren Anfragen annimmt"""
+
+    def __init__(self, retry_after: int = settings.SEARCH_RETRY_AFTER_SECONDS):
+        super().__init__("Search workers are saturated, please retry later")
+        self.retry_after = retry_after
+
+# Produktsuche pro Prozess (nur im Prozess-Pool verwendet)
+_process_product_search = None
+
+def _init_process_worker() -> None:
+    """Initialisiert Modell und Datenbank-Client einmal pro Worker-Prozess"""
+    global _process_product_search
+    from .productSearch import ProductSearch
+    _process_product_search = ProductSearch(use_worker_pool=False)
+
+def _run_in_process(method: str, *args, **kwargs) -> Any:
+    return getattr(_process_product_search, method)(*args, **kwargs)
+
+class SearchWorkerPool:
+    """
+    Führt CPU-lastige Suchschritte (Embedding, Vektorsuche, Formatierung) ausserhalb des Event-Loops aus.
+
+    Die Anzahl gleichzeitig angenommener Aufträge (laufend und wartend) ist begrenzt; darüber hinaus
+    wird sofort mit SearchOverloadedError abgelehnt, statt unbegrenzt Arbeit aufzustauen.
+    """
+
+    def __init__(
+        self,
+        product_search,
+        kind: str = settings.SEARCH_EXECUTOR,
+        max_workers: int = settings.SEARCH_WORKERS,
+        max_pending: int = settings.SEARCH_MAX_PENDING
+    ):
+        self.product_search = product_search
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_process_worker)
+            elif self.kind == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+            else:
+                raise ValueError(f"Unbekannter Such-Executor: {self.kind}")
+            logging.info(f"Such-Pool gestartet: {self.kind}, {self.max_workers} Worker")
+        return self._executor
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """Führe eine Methode der Produktsuche im Pool aus"""
+        # Der Zähler wird nur im Event-Loop verändert und braucht daher keine Sperre
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise SearchOverloadedError()
+
+        if self.kind == "process":
+            call = functools.partial(_run_in_process, method, *args, **kwargs)
+        else:
+            call = functools.partial(getattr(self.product_search, method), *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        job = self.executor.submit(call)
+        self.pending += 1
+        # Platz erst freigeben, wenn der Auftrag im Pool fertig ist, nicht schon wenn der Aufrufer
+        # abbricht (z.B. Verbindungsabbruch), sonst nimmt der Pool mehr als max_pending an
+        job.add_done_callback(lambda done: self._release_threadsafe(loop, done))
+        return await asyncio.wrap_future(job)
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop, job: Future) -> None:
+        """Done-Callback des Auftrags (läuft im Worker-Thread); der Zähler wird im Event-Loop geändert"""
+        try:
+            loop.call_soon_threadsafe(self._release, job)
+        except RuntimeError:
+            pass  # Event-Loop bereits beendet
+
+    def _release(self, job: Future) -> None:
+        self.pending -= 1
+        if not job.cancelled():
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,65 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import json
+from .embeddingCache import normalize_text
+
+def flight_key(kind: str, query: str, *params: Any) -> str:
+    """Schlüssel aus Art, normalisierter Anfrage und weiteren Parametern (z.B. Filter)"""
+    return json.dumps([kind, normalize_text(query), *params], sort_keys=True, ensure_ascii=False, default=str)
+
+class SingleFlight:
+    """
+    Fasst gleichzeitige, identische Berechnungen zusammen.
+
+    Die erste Anfrage zu einem Schlüssel startet die Berechnung als eigenen Task; alle weiteren
+    Anfragen mit demselben Schlüssel warten auf dieses Ergebnis (oder dieselbe Ausnahme), solange
+    die Berechnung läuft. Bricht ein wartender Client ab, läuft die Berechnung für die übrigen weiter;
+    erst wenn alle Wartenden abgebrochen haben, wird auch die Berechnung abgebrochen.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.leaders = 0  # Tatsächlich ausgeführte Berechnungen
+        self.coalesced = 0  # Anfragen, die sich einer laufenden Berechnung angeschlossen haben
+        self.abandoned = 0  # Berechnungen, die abgebrochen wurden, weil niemand mehr wartet
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Führe func aus oder warte auf die bereits laufende Berechnung mit demselben Schlüssel"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # shield: der Abbruch eines Wartenden bricht die gemeinsame Berechnung nicht ab
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                self.abandoned += 1
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Als abgerufen markieren, falls alle Wartenden abgebrochen haben
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.leaders,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "coalesced_rate": self.coalesced / total if total else 0.0
+        }
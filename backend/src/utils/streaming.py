@@ -0,0 +1,70 @@
+from typing import Any, Optional, Tuple
+import json
+import re
+
+# Muster, mit dem das LLM das empfohlene Produkt markiert
+SELECTED_PRODUCT_PATTERN = re.compile(r"SELECTED_PRODUCT_ID:\s*(\d+)")
+
+# Header fuer Server-Sent Events (kein Caching, kein Puffern durch Proxies)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Formatiere ein Server-Sent Event mit JSON-Nutzlast"""
+    message = f"event: {event}\n" if event else ""
+    message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return message
+
+
+class SelectedProductParser:
+    """Erkennt das SELECTED_PRODUCT_ID-Praefix inkrementell in einem Token-Stream"""
+
+    def __init__(self, product_count: int, lookahead: int = 200):
+        self.product_count = product_count  # Anzahl waehlbarer Produkte
+        self.lookahead = lookahead  # Maximale Zeichenanzahl, die auf das Praefix gewartet wird
+        self.buffer = ""
+        self.selected_id: Optional[int] = None
+
+    @property
+    def decided(self) -> bool:
+        return self.selected_id is not None
+
+    def feed(self, token: str) -> Tuple[Optional[int], str]:
+        """
+        Verarbeite ein Token.
+
+        :return: (ausgewaehlte Produkt-ID, falls gerade entschieden, sonst None; auszugebender Text)
+        """
+        if self.decided:
+            return None, token
+
+        self.buffer += token
+        match = SELECTED_PRODUCT_PATTERN.search(self.buffer)
+
+        # Die Zahl ist erst vollstaendig, wenn danach noch weiterer Text folgt
+        if match and match.end() < len(self.buffer):
+            return self._decide(match)
+        if not match and len(self.buffer) > self.lookahead:
+            return self._decide(None)
+        return None, ""
+
+    def finish(self) -> Tuple[Optional[int], str]:
+        """Schliesse den Stream ab und gib verbleibenden Text aus"""
+        if self.decided:
+            return None, ""
+        return self._decide(SELECTED_PRODUCT_PATTERN.search(self.buffer))
+
+    def _decide(self, match: Optional[re.Match]) -> Tuple[int, str]:
+        selected_id = 0  # Standardmässig erstes Produkt
+        text = self.buffer
+
+        if match:
+            # Sicherstellen, dass es im gültigen Bereich liegt
+            selected_id = min(int(match.group(1)), self.product_count - 1)
+            text = (self.buffer[:match.start()] + self.buffer[match.end():]).lstrip()
+
+        self.selected_id = selected_id
+        self.buffer = ""
+        return selected_id, text
@@ -1,12 +1,23 @@
 # Import der SentenceTransformer-Bibliothek zur Erstellung von Text-Embeddings
 from sentence_transformers import SentenceTransformer
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import numpy as np
+from ..config.config import settings
+from .embeddingCache import EmbeddingCache, get_embedding_cache
+from .embeddingScheduler import EmbeddingBatcher
 
 class TextAnalyzer:
-    def __init__(self):
+    def __init__(self, embedding_cache: Optional[EmbeddingCache] = None):
         # Initialisierung des Modells zur Erstellung von Text-Embeddings
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        # Gemeinsamer Cache, damit wiederholte Anfragen das Modell nicht erneut ausführen
+        self.embedding_cache = embedding_cache or get_embedding_cache()
+        # Gleichzeitige Anfragen werden zu einem encode([...])-Aufruf zusammengefasst
+        self.batcher = EmbeddingBatcher(self._encode_batch) if settings.EMBEDDING_BATCHING else None
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Kodiert mehrere Texte in einem Durchlauf des Modells"""
+        return self.model.encode(texts, batch_size=len(texts))
     
     def get_embedding(self, text: str) -> List[float]:
         """
@@ -15,7 +26,16 @@ class TextAnalyzer:
         :param text: Der Text, fuer den ein Embedding erstellt werden soll.
         :return: Eine Liste von Floats, die das Embedding darstellen.
         """
-        return self.model.encode(text).tolist()
+        embedding = self.embedding_cache.get(text)
+        if embedding is not None:
+            return embedding
+
+        if self.batcher is not None:
+            embedding = self.batcher.encode(text)
+        else:
+            embedding = self.model.encode(text).tolist()
+        self.embedding_cache.put(text, embedding)
+        return embedding
 
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """
@@ -434,7 +434,12 @@ const Chat = () => {
       try {
         switch (chatMode) {
           case CHAT_MODES.GENERAL: {
-            const data = await sendChatMessage(currentQuery);
+            const data = await sendChatMessage(
+              currentQuery,
+              "general",
+              null,
+              String(activeChat)
+            );
             assistantMessage = {
               id: Date.now() + 1,
               type: "assistant",
@@ -444,7 +449,10 @@ const Chat = () => {
           }
           case CHAT_MODES.PRODUCT_SEARCH: {
             // Explizit ein einzelnes Produkt anfordern
-            const result = await fetchProductRecommendation(currentQuery);
+            const result = await fetchProductRecommendation(
+              currentQuery,
+              String(activeChat)
+            );
 
             // Sicherstellen, dass die Antwort die Produktdaten enthält, die zur LLM-Antwort passen
             assistantMessage = {
@@ -463,7 +471,8 @@ const Chat = () => {
             const data = await sendChatMessage(
               currentQuery,
               "product_specific",
-              context
+              context,
+              String(activeChat)
             );
             assistantMessage = {
               id: Date.now() + 1,
@@ -6,13 +6,15 @@ const API_URL = "http://localhost:8000";
 export const sendChatMessage = async (
   message,
   role_type = "general",
-  context = null
+  context = null,
+  session_id = null
 ) => {
   try {
     const response = await axios.post(`${API_URL}/api/chat`, {
       message,
       role_type,
       context,
+      session_id, // Trennt den Gesprächsverlauf pro Chat im Backend
     });
     return response.data;
   } catch (error) {
@@ -39,7 +41,7 @@ export const searchProducts = async (query) => {
 };
 
 // Produktempfehlung mit LLM-Unterstützung
-export const fetchProductRecommendation = async (query) => {
+export const fetchProductRecommendation = async (query, session_id = null) => {
   const response = await fetch(`${API_URL}/api/recommendation`, {
     method: "POST",
     headers: {
@@ -48,6 +50,7 @@ export const fetchProductRecommendation = async (query) => {
     body: JSON.stringify({
       query,
       single_product: true, // Immer nur ein Produkt anzeigen
+      session_id,
     }),
   });
 